@@ -0,0 +1,465 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+(V) Control level abstraction.
+Benchmarks of the game engine. Entry point.
+"""
+
+
+# System imports
+import sys
+import platform
+from argparse import ArgumentParser
+from subprocess import run
+from json import loads as json_loads, dumps as json_dumps, load as json_load
+from statistics import median
+from time import perf_counter, sleep
+import tracemalloc
+from typing import Callable, Optional
+
+# External imports
+import numpy as np
+
+# Project imports
+from structures import ACTION, GAME_STATE, START_RULE, PRESETS, GameParameters
+from logic import Logic, STORAGES
+from pool import BoardPool
+
+
+# --- Startup Benchmark -------------------------------------------------------
+
+# code measuring cold start of the headless engine in a fresh interpreter,
+# including import of numpy (the biggest part of it)
+STARTUP_CODE = '''
+import sys
+from time import perf_counter
+from json import dumps
+
+started = perf_counter()
+import numpy
+from structures import GameParameters, START_RULE, PRESETS
+from logic import Logic, STORAGES
+parameters = GameParameters(*PRESETS['expert'], START_RULE.EMPTY_CELL, SEED=0)
+logic = Logic(parameters)
+finished = perf_counter()
+
+print(dumps({
+    'startup_ms': (finished - started) * 1000,
+    'side_modules': [
+        name for name in ['pygame', 'config', 'graphics', 'demo']
+        if name in sys.modules
+    ]
+}))
+'''
+
+# maximum allowed cold start of the headless engine (numpy takes ~100 ms)
+STARTUP_BUDGET_MS = 200
+
+
+def benchmark_startup(repeats: int = 5) -> dict:
+    """
+    Measuring cold start of the headless engine: importing the engine
+    and creating new game without any configs, pygame or display.
+    """
+
+    samples = list()
+    side_modules = set()
+    for _ in range(repeats):
+        result = json_loads(run(
+            [sys.executable, '-c', STARTUP_CODE],
+            capture_output = True,
+            check = True,
+            text = True
+        ).stdout)
+        samples.append(result['startup_ms'])
+        side_modules.update(result['side_modules'])
+
+    return {
+        'startup_ms_min': min(samples),
+        'startup_ms_median': median(samples),
+        'startup_budget_ms': STARTUP_BUDGET_MS,
+        'side_modules': sorted(side_modules)
+    }
+
+
+# --- Hot Paths Benchmark -----------------------------------------------------
+
+# minefields to benchmark: predefined levels and custom boards
+# up to the biggest allowed by config_validation(), with ~20% of bombs
+BOARDS = {
+    **PRESETS,
+    'custom 64x64': (64, 64, 820),
+    'custom 128x128': (128, 128, 3277),
+    'custom 256x256': (256, 256, 13107)
+}
+
+# number of samples of the full scripted game (it is the longest one)
+FULL_GAME_REPEATS = 3
+
+
+def measure(
+        function: Callable,
+        setup: Optional[Callable] = None,
+        repeats: int = 20
+) -> dict:
+    """
+    Measuring execution time of the function, calling setup before
+    each of the samples (setup itself is not measured).
+    """
+
+    samples = list()
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        started = perf_counter()
+        function()
+        samples.append((perf_counter() - started) * 1000)
+
+    return {
+        'min_ms': min(samples),
+        'median_ms': median(samples)
+    }
+
+
+def new_logic(
+        board: str,
+        start_rule: START_RULE,
+        storage: str = 'layers'
+) -> Logic:
+    """Creating game engine for the board with reproducible bombs."""
+    return STORAGES[storage](
+        GameParameters(*BOARDS[board], start_rule, SEED=0)
+    )
+
+
+def start_game(logic: Logic):
+    """New game with the first action to open in the centre of minefield."""
+
+    logic.new_game()
+    logic.perform_action(ACTION.TO_OPEN, (logic.rows // 2, logic.cols // 2))
+
+
+def play_scripted_game(logic: Logic):
+    """
+    Playing the game till the win: first click in the centre of minefield,
+    then opening each of the remaining cells without bombs row by row.
+    """
+
+    start_game(logic)
+    logic.check_game_won()
+    for position in np.argwhere(~logic.mined):
+        if logic.game_state != GAME_STATE.GO:
+            break
+        position = (int(position[0]), int(position[1]))
+        if not logic.opened[position]:
+            logic.perform_action(ACTION.TO_OPEN, position)
+            logic.check_game_won()
+
+
+def benchmark_hot_paths(
+        board: str,
+        repeats: int = 20,
+        storage: str = 'layers'
+) -> dict:
+    """Measuring hot paths of the game engine on the board."""
+
+    logic = new_logic(board, START_RULE.EMPTY_CELL, storage)
+    centre = (logic.rows // 2, logic.cols // 2)
+    results = dict()
+
+    results['generate_bombs'] = measure(logic.generate_bombs, None, repeats)
+    results['calculate_nearby'] = measure(
+        logic.calculate_nearby, logic.generate_bombs, repeats
+    )
+
+    for start_rule in [START_RULE.NO_BOMB, START_RULE.EMPTY_CELL]:
+        rule_logic = new_logic(board, start_rule, storage)
+
+        def setup_first_click():
+            rule_logic.new_game()
+            rule_logic.click_position = centre
+
+        results[f'start_rule_{start_rule.name.lower()}'] = measure(
+            rule_logic._before_first_action_to_open,
+            setup_first_click,
+            repeats
+        )
+
+    def setup_expand():
+        start_game(logic)
+        logic.opened[:] = False
+        logic.opened[centre] = True
+
+    results['expand'] = measure(
+        lambda: logic.expand(centre), setup_expand, repeats
+    )
+
+    start_game(logic)
+
+    def setup_matrix():
+        logic.matrix_outdated = True
+
+    results['get_matrix'] = measure(logic.get_matrix, setup_matrix, repeats)
+    results['check_game_won'] = measure(logic.check_game_won, None, repeats)
+
+    results['full_game'] = measure(
+        lambda: play_scripted_game(logic),
+        None,
+        min(repeats, FULL_GAME_REPEATS)
+    )
+    return results
+
+
+# --- Storage Benchmark -------------------------------------------------------
+
+# minefields to compare ways of storing the matrix layers, with ~20% of bombs
+STORAGE_BOARDS = {
+    'custom 256x256': (256, 256, 13107),
+    'custom 2048x2048': (2048, 2048, 838861),
+    'custom 8192x8192': (8192, 8192, 13421773)
+}
+
+# the biggest minefield (in cells) to be benchmarked with storages
+# other than 'compact' (indexing of regions takes too much memory)
+LAYERS_MAX_CELLS = 2048 * 2048
+
+# visible part of the minefield exported for drawing: rows, cols
+VIEW_SIZE = (40, 60)
+
+
+def benchmark_storage(board: str, storage: str) -> dict:
+    """
+    Measuring memory and speed of the game engine on the board
+    by the way of storing matrix layers.
+    """
+
+    parameters = GameParameters(
+        *STORAGE_BOARDS[board], START_RULE.EMPTY_CELL, SEED=0
+    )
+    centre = (parameters.ROWS // 2, parameters.COLS // 2)
+
+    # peaks of allocated memory (tracing slows down, so it is separate run)
+    tracemalloc.start()
+    logic = STORAGES[storage](parameters)
+    _, new_game_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    logic.perform_action(ACTION.TO_OPEN, centre)
+    _, first_click_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del logic
+
+    # new game only allocates the layers, while bombs are placed
+    # by the start rule on the first click - so it includes generation
+    # of the minefield and numbers of bombs nearby
+    started = perf_counter()
+    logic = STORAGES[storage](parameters)
+    new_game_ms = (perf_counter() - started) * 1000
+    started = perf_counter()
+    logic.perform_action(ACTION.TO_OPEN, centre)
+    first_click_ms = (perf_counter() - started) * 1000
+
+    layers_bytes = sum(
+        layer.nbytes for layer in [
+            logic.mined, logic.opened, logic.flagged,
+            logic.marked, logic.nearby
+        ]
+    )
+
+    def setup_matrix():
+        logic.matrix_outdated = True
+
+    return {
+        'bytes_per_cell': layers_bytes / (logic.rows * logic.cols),
+        'layers_mb': layers_bytes / 2 ** 20,
+        'new_game_peak_mb': new_game_peak / 2 ** 20,
+        'first_click_peak_mb': first_click_peak / 2 ** 20,
+        'new_game_ms': new_game_ms,
+        'first_click_ms': first_click_ms,
+        'get_matrix': measure(logic.get_matrix, setup_matrix, 3),
+        'get_view': measure(
+            lambda: logic.get_matrix(*centre, *VIEW_SIZE), setup_matrix, 3
+        ),
+        'check_game_won': measure(logic.check_game_won, None, 3)
+    }
+
+
+# --- Pool Benchmark ----------------------------------------------------------
+
+# number of new games and duration of each game (pause between new games)
+POOL_GAMES = 20
+POOL_GAME_MS = 50
+
+
+def benchmark_pool(board: str, storage: str = 'layers') -> dict:
+    """
+    Measuring new game by creating new board at once
+    and by taking ready board from the pool of boards.
+    """
+
+    parameters = GameParameters(
+        *BOARDS[board], START_RULE.AS_IS, SEED=0, STORAGE=storage
+    )
+    logic = STORAGES[storage](parameters)
+    results = {'new_game': measure(logic.new_game, None, POOL_GAMES)}
+
+    pool = BoardPool(parameters)
+    samples = list()
+    for _ in range(POOL_GAMES):
+        sleep(POOL_GAME_MS / 1000)
+        started = perf_counter()
+        pool.take()
+        samples.append((perf_counter() - started) * 1000)
+    pool.stop()
+
+    results['pool_take'] = {
+        'min_ms': min(samples),
+        'median_ms': median(samples)
+    }
+    results.update(pool.get_stats())
+    return results
+
+
+# --- Comparison --------------------------------------------------------------
+
+def flatten(results: dict, prefix: str = '') -> dict[str, float]:
+    """Flattening nested results into median timings by their paths."""
+
+    timings = dict()
+    for name, value in results.items():
+        path = f'{prefix}{name}'
+        if isinstance(value, dict):
+            timings.update(flatten(value, f'{path} / '))
+        elif name in ['median_ms', 'startup_ms_median']:
+            timings[path] = value
+    return timings
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Comparing results with the baseline ones.
+    Return descriptions of the timings slower than the baseline by tolerance.
+    """
+
+    regressions = list()
+    baseline_timings = flatten(baseline)
+    for path, timing in flatten(results).items():
+        if path not in baseline_timings or baseline_timings[path] <= 0:
+            continue
+        ratio = timing / baseline_timings[path]
+        if ratio > tolerance:
+            regressions.append(
+                f'{path}: {baseline_timings[path]:.3f} -> {timing:.3f} ms '
+                f'(x{ratio:.2f})'
+            )
+    return regressions
+
+
+# --- Main Program ------------------------------------------------------------
+
+def main() -> int:
+    parser = ArgumentParser(description=(
+        "Benchmarking cold start and hot paths of the game engine."
+    ))
+    parser.add_argument(
+        '--suites', nargs='*', default=['startup', 'hot_paths'],
+        choices=['startup', 'hot_paths', 'storage', 'pool'],
+        help="suites of the benchmarks to run"
+    )
+    parser.add_argument(
+        '--boards', nargs='*', default=list(BOARDS), choices=list(BOARDS),
+        help="minefields for the hot paths and pool benchmarks"
+    )
+    parser.add_argument(
+        '--storage', default='layers', choices=list(STORAGES),
+        help="way of storing the minefield for the hot paths "
+             "and pool benchmarks"
+    )
+    parser.add_argument(
+        '--repeats', type=int, default=20,
+        help="number of samples per benchmark"
+    )
+    parser.add_argument(
+        '--json', default=None,
+        help="path to the file for the results in JSON format"
+    )
+    parser.add_argument(
+        '--compare', default=None, metavar='JSON',
+        help="path to the baseline results to compare with"
+    )
+    parser.add_argument(
+        '--tolerance', type=float, default=1.25,
+        help="allowed slowdown ratio against the baseline"
+    )
+    args = parser.parse_args()
+
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'system': platform.system()
+        }
+    }
+    if 'startup' in args.suites:
+        results['startup'] = benchmark_startup()
+    if 'hot_paths' in args.suites:
+        results['hot_paths'] = {
+            board: benchmark_hot_paths(board, args.repeats, args.storage)
+            for board in args.boards
+        }
+
+    if 'storage' in args.suites:
+        results['storage'] = {
+            board: {
+                storage: benchmark_storage(board, storage)
+                for storage in STORAGES
+                if storage == 'compact'
+                or rows * cols <= LAYERS_MAX_CELLS
+            }
+            for board, (rows, cols, _) in STORAGE_BOARDS.items()
+        }
+
+    if 'pool' in args.suites:
+        results['pool'] = {
+            board: benchmark_pool(board, args.storage)
+            for board in args.boards
+        }
+
+    print(json_dumps(results, indent=4))
+    if args.json is not None:
+        with open(args.json, 'w') as json_file:
+            json_file.write(json_dumps(results, indent=4))
+
+    status = 0
+
+    # guarding headless engine from heavy and side-effecting imports
+    if 'startup' in results:
+        startup = results['startup']
+        if startup['side_modules']:
+            print(
+                'Headless engine imports:', ', '.join(startup['side_modules'])
+            )
+            status = 1
+        if startup['startup_ms_median'] > STARTUP_BUDGET_MS:
+            print('Headless engine startup is over the budget.')
+            status = 1
+
+    # guarding hot paths from regressions against the baseline
+    if args.compare is not None:
+        with open(args.compare) as json_file:
+            regressions = compare(results, json_load(json_file), args.tolerance)
+        for regression in regressions:
+            print('Regression:', regression)
+        if regressions:
+            status = 1
+
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
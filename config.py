@@ -17,12 +17,10 @@ from dataclasses import dataclass
 from os import path
 from json import load as json_load
 from configparser import ConfigParser
-
-# External imports
-from numpy.random import randint, seed
+from random import randrange
 
 # Project imports
-from structures import START_RULE
+from structures import START_RULE, PRESETS
 
 
 # --- Config Parser -----------------------------------------------------------
@@ -43,16 +41,39 @@ def config_validation():
 
     global config
 
+    if config.has_option('Minefield', 'preset') \
+            and config.get('Minefield', 'preset') not in PRESETS:
+        raise ValueError(
+            "preset has to be " + ", ".join(f"'{p}'" for p in PRESETS) + "."
+        )
+
     if config.getint('Minefield', 'rows') < 1 \
             or config.getint('Minefield', 'columns') < 1:
         raise ValueError("Minefield dimensions could not be negative.")
     if config.getint('Minefield', 'rows') == 1 \
             and config.getint('Minefield', 'columns') == 1:
         raise ValueError("Minefield size is too small.")
-    if config.getint('Minefield', 'rows') > 256 \
+    storage = config.get('Minefield', 'storage', fallback='layers')
+    if storage not in ['layers', 'compact', 'packed', 'endless']:
+        raise ValueError("storage has to be 'layers', 'compact', 'packed' "
+                         "or 'endless'.")
+    if storage not in ['compact', 'endless'] \
+            and config.getint('Minefield', 'rows') > 256 \
             and config.getint('Minefield', 'columns') > 256:
         raise ValueError("Minefield size is too big.")
 
+    if config.getint('Game Parameters', 'undo memory', fallback=64) < 1:
+        raise ValueError("undo memory has to be positive number.")
+    if storage == 'endless' and config.getboolean(
+            'Game Parameters', 'practice mode', fallback=False
+    ):
+        raise ValueError("practice mode is not available "
+                         "for the endless minefield.")
+
+    board_pool = config.get('Game Parameters', 'board pool', fallback='auto')
+    if board_pool != 'auto' and not board_pool.isdecimal():
+        raise ValueError("board pool has to be 'auto' or non-negative number.")
+
     if config.getint('Minefield', 'bombs') < 1:
         raise ValueError("Too few bombs set for the minefield.")
     if config.getint('Minefield', 'bombs') > \
@@ -66,6 +87,33 @@ def config_validation():
             raise ValueError("bombs percentage values have to be floating/"
                              "integer value in range from 0.1 to 99.9")
 
+    graphics_name = config.get('User Interface', 'graphics name')
+    if not path.isfile(path.join('assets', graphics_name + '.png')) \
+            or not path.isfile(path.join('assets', graphics_name + '.json')):
+        raise ValueError("graphics name has to match png and json files "
+                         "in assets folder.")
+
+    if config.getint('User Interface', 'graphics scale', fallback=1) < 1:
+        raise ValueError("graphics scale has to be positive number.")
+
+    if config.get('User Interface', 'scheduler', fallback='frames') \
+            not in ['frames', 'events']:
+        raise ValueError("scheduler has to be 'frames' or 'events'.")
+
+    if config.get('User Interface', 'rendering', fallback='sprites') \
+            not in ['sprites', 'framebuffer']:
+        raise ValueError("rendering has to be 'sprites' or 'framebuffer'.")
+
+    profiler_trace = \
+        config.get('User Interface', 'profiler trace', fallback='')
+    if profiler_trace and not profiler_trace.endswith(('.csv', '.json')):
+        raise ValueError("profiler trace has to be .csv or .json file.")
+
+    if config.getint('User Interface', 'visible rows', fallback=1) < 1 \
+            or config.getint('User Interface', 'visible columns',
+                             fallback=1) < 1:
+        raise ValueError("Visible part of the minefield could not be empty.")
+
 
 config_parser()
 config_validation()
@@ -73,111 +121,235 @@ config_validation()
 
 # --- Dataclasses -------------------------------------------------------------
 
-@dataclass
-class GAME:
-    """Set of constants for Game."""
-
-    # minefield
-    if config.has_option('Minefield', 'preset'):
-        ROWS, COLS, BOMBS = {
-            'beginner': [9, 9, 10],
-            'intermediate': [16, 16, 40],
-            'expert': [16, 30, 99]
-        }.get(config.get('Minefield', 'preset'))
-
-    else:
-        ROWS = config.getint('Minefield', 'rows', fallback=8)
-        COLS = config.getint('Minefield', 'columns', fallback=8)
-        BOMBS = config.getint('Minefield', 'bombs', fallback=1)
-
-        _bombs_percentage = \
-            config.getfloat('Minefield', 'bombs percentage', fallback=None)
-        if _bombs_percentage is not None:
-            BOMBS = round(_bombs_percentage / 100 * (ROWS * COLS))
-            BOMBS = min(max(BOMBS, 1), (ROWS * COLS - 1))
-
-    # game parameters
-    START_RULE = {
-        'as is': START_RULE.AS_IS,
-        'no bomb': START_RULE.NO_BOMB,
-        'empty cell': START_RULE.EMPTY_CELL
-    }.get(config.get('Game Parameters', 'starting rule'))
-
-    MARKS_PRESENT = \
-        config.getboolean('Game Parameters', 'marks present', fallback=False)
-
-    _seed = config.get('Game Parameters', 'random seed', fallback=None)
-    if _seed in [None, '']:
-        # generating random seed and preserving it
-        _seed = randint(2_147_483_648)
-    seed(int(_seed))
-
-
-@dataclass
-class GUI:
-    """Set of constants for Graphics User Interface."""
-
-    # Actual display fullscreen resolution
-    # do not considering OS scale and layout:
-    # (thanks to solution by)
-    # https://gamedev.stackexchange.com/questions/105750/pygame-fullsreen-display-issue
-    import ctypes
-    ctypes.windll.user32.SetProcessDPIAware()
-
-    SPRITES_IMAGE = path.join(
-        'assets', config.get('User Interface', 'graphics name') + '.png'
-    )
-    SPRITES_STENCIL = path.join(
-        'assets', config.get('User Interface', 'graphics name') + '.json'
-    )
-
-    NIGHT_MODE = \
-        config.getboolean('User Interface', 'night mode', fallback=False)
-
-    FPS = config.getint('User Interface', 'frames per second', fallback=60)
-
-    INDICATE_HOVER = \
-        config.getboolean('User Interface', 'indicate hovering', fallback=True)
-
-    # reading stencil for retrieving dimensions of the sprites
-    with open(SPRITES_STENCIL, 'r') as json_file:
-        _obj = json_load(json_file)
-    _stencil = {k: v for k, v in _obj.items()}
-
-    # dimensions
-    SCALE = config.getint('User Interface', 'graphics scale', fallback=1)
-    BASE_CELL_SIZE = max(
-        _stencil['cell_empty'][2],
-        _stencil['cell_empty'][3]
-    )
-    CELL_SIZE = BASE_CELL_SIZE * SCALE
-    BORDER = SCALE * max(
-        _stencil['frame_panel_top_left_corner'][2],
-        _stencil['frame_panel_top_left_corner'][3]
-    )
-
-    if GAME.COLS >= 8:
-        PADDING = 0
-    else:
-        PADDING = int((8 - GAME.COLS) / 2 * CELL_SIZE)
-
-    DIGIT_WIDTH = SCALE * _stencil['digit_0'][2]
-
-    PANEL_HEIGHT = SCALE * _stencil['frame_panel_interior'][3]
-    FIELD_HEIGHT = CELL_SIZE * GAME.ROWS
-    SCREEN_HEIGHT = PANEL_HEIGHT + FIELD_HEIGHT + 3 * BORDER
-
-    PANEL_WIDTH = CELL_SIZE * max(GAME.COLS, 8)
-    FIELD_WIDTH = PANEL_WIDTH
-    SCREEN_WIDTH = PANEL_WIDTH + 2 * BORDER
-
-    PANEL_X_CENTER = SCREEN_WIDTH // 2
-    PANEL_Y_CENTER = PANEL_HEIGHT // 2 + BORDER
-
-    PANEL_X_TOP_LEFT = BORDER
-    PANEL_Y_TOP_LEFT = BORDER
-
-    FIELD_X_TOP_LEFT = BORDER
-    FIELD_Y_TOP_LEFT = PANEL_HEIGHT + 2 * BORDER
-
-    RESOLUTION = (SCREEN_WIDTH, SCREEN_HEIGHT)
+def read_game() -> type:
+    """Reading set of constants for Game from the configuration."""
+
+    @dataclass
+    class GAME:
+        """Set of constants for Game."""
+
+        # minefield
+        if config.has_option('Minefield', 'preset'):
+            ROWS, COLS, BOMBS = PRESETS.get(config.get('Minefield', 'preset'))
+
+        else:
+            ROWS = config.getint('Minefield', 'rows', fallback=8)
+            COLS = config.getint('Minefield', 'columns', fallback=8)
+            BOMBS = config.getint('Minefield', 'bombs', fallback=1)
+
+            _bombs_percentage = \
+                config.getfloat('Minefield', 'bombs percentage', fallback=None)
+            if _bombs_percentage is not None:
+                BOMBS = round(_bombs_percentage / 100 * (ROWS * COLS))
+                BOMBS = min(max(BOMBS, 1), (ROWS * COLS - 1))
+
+        STORAGE = config.get('Minefield', 'storage', fallback='layers')
+
+        # game parameters
+        START_RULE = {
+            'as is': START_RULE.AS_IS,
+            'no bomb': START_RULE.NO_BOMB,
+            'empty cell': START_RULE.EMPTY_CELL
+        }.get(config.get('Game Parameters', 'starting rule'))
+
+        MARKS_PRESENT = config.getboolean(
+            'Game Parameters', 'marks present', fallback=False
+        )
+
+        DEBUG = config.getboolean(
+            'Game Parameters', 'debug mode', fallback=False
+        )
+
+        PRACTICE = config.getboolean(
+            'Game Parameters', 'practice mode', fallback=False
+        )
+        # in bytes
+        UNDO_MEMORY = \
+            config.getint('Game Parameters', 'undo memory', fallback=64) << 20
+
+        # None for no recording of the games
+        REPLAYS = config.get(
+            'Game Parameters', 'replays folder', fallback=''
+        ) or None
+
+        _board_pool = \
+            config.get('Game Parameters', 'board pool', fallback='auto')
+        # None for the size of the pool according to the minefield
+        BOARD_POOL = None if _board_pool == 'auto' else int(_board_pool)
+
+        _seed = config.get('Game Parameters', 'random seed', fallback='')
+        # random one once undefined (kept by the changed settings,
+        # unless the game itself is changed - see change_settings)
+        SEED = int(_seed) if _seed != '' else randrange(2_147_483_648)
+
+    return GAME
+
+
+def read_gui(game: type) -> type:
+    """
+    Reading set of constants for Graphics User Interface
+    from the configuration (for the minefield of the game).
+    """
+
+    @dataclass
+    class GUI:
+        """Set of constants for Graphics User Interface."""
+
+        SPRITES_IMAGE = path.join(
+            'assets', config.get('User Interface', 'graphics name') + '.png'
+        )
+        SPRITES_STENCIL = path.join(
+            'assets', config.get('User Interface', 'graphics name') + '.json'
+        )
+
+        NIGHT_MODE = \
+            config.getboolean('User Interface', 'night mode', fallback=False)
+
+        FPS = config.getint('User Interface', 'frames per second', fallback=60)
+
+        SCHEDULER = \
+            config.get('User Interface', 'scheduler', fallback='frames')
+
+        INDICATE_HOVER = config.getboolean(
+            'User Interface', 'indicate hovering', fallback=True
+        )
+
+        RENDERING = \
+            config.get('User Interface', 'rendering', fallback='sprites')
+
+        PROFILER = \
+            config.getboolean('User Interface', 'profiler', fallback=False)
+        # None for no trace of the frames
+        PROFILER_TRACE = \
+            config.get('User Interface', 'profiler trace', fallback='') or None
+
+        # None for no cache of the preprocessed sprites
+        SPRITES_CACHE = config.get(
+            'User Interface', 'sprites cache folder', fallback=''
+        ) or None
+
+        # reading stencil for retrieving dimensions of the sprites
+        # (kept for clipping of the sprites as well, so it is read only once)
+        with open(SPRITES_STENCIL, 'r') as json_file:
+            _obj = json_load(json_file)
+        STENCIL = {k: v for k, v in _obj.items()}
+
+        # dimensions
+        SCALE = config.getint('User Interface', 'graphics scale', fallback=1)
+        BASE_CELL_SIZE = max(
+            STENCIL['cell_empty'][2],
+            STENCIL['cell_empty'][3]
+        )
+        CELL_SIZE = BASE_CELL_SIZE * SCALE
+        BORDER = SCALE * max(
+            STENCIL['frame_panel_top_left_corner'][2],
+            STENCIL['frame_panel_top_left_corner'][3]
+        )
+
+        # visible part of the minefield (viewport), scrolled over the minefield
+        VISIBLE_ROWS = min(
+            game.ROWS,
+            config.getint('User Interface', 'visible rows', fallback=game.ROWS)
+        )
+        VISIBLE_COLS = min(
+            game.COLS,
+            config.getint(
+                'User Interface', 'visible columns', fallback=game.COLS
+            )
+        )
+
+        if VISIBLE_COLS >= 8:
+            PADDING = 0
+        else:
+            PADDING = int((8 - VISIBLE_COLS) / 2 * CELL_SIZE)
+
+        DIGIT_WIDTH = SCALE * STENCIL['digit_0'][2]
+
+        PANEL_HEIGHT = SCALE * STENCIL['frame_panel_interior'][3]
+        FIELD_HEIGHT = CELL_SIZE * VISIBLE_ROWS
+        SCREEN_HEIGHT = PANEL_HEIGHT + FIELD_HEIGHT + 3 * BORDER
+
+        PANEL_WIDTH = CELL_SIZE * max(VISIBLE_COLS, 8)
+        FIELD_WIDTH = PANEL_WIDTH
+        SCREEN_WIDTH = PANEL_WIDTH + 2 * BORDER
+
+        PANEL_X_CENTER = SCREEN_WIDTH // 2
+        PANEL_Y_CENTER = PANEL_HEIGHT // 2 + BORDER
+
+        PANEL_X_TOP_LEFT = BORDER
+        PANEL_Y_TOP_LEFT = BORDER
+
+        FIELD_X_TOP_LEFT = BORDER
+        FIELD_Y_TOP_LEFT = PANEL_HEIGHT + 2 * BORDER
+
+        RESOLUTION = (SCREEN_WIDTH, SCREEN_HEIGHT)
+
+    return GUI
+
+
+GAME = read_game()
+GUI = read_gui(GAME)
+
+
+# --- Changing Settings -------------------------------------------------------
+
+def update_constants(target: type, source: type) -> set[str]:
+    """
+    Updating constants of the dataclass in place (as they are imported
+    by the other modules) from the newly read one.
+    Return names of the changed constants.
+    """
+
+    changed = set()
+    for name, value in vars(source).items():
+        if name.isupper() and getattr(target, name, None) != value:
+            setattr(target, name, value)
+            changed.add(name)
+    return changed
+
+
+def change_settings(changes: dict[str, dict[str, object]]) -> set[str]:
+    """
+    Changing settings while the game runs: options of the configuration
+    by sections, None for the option to be removed (e.g. preset for the
+    custom minefield). Configuration is kept as is, once it is not valid.
+    Constants of GAME and GUI are updated in place.
+    Return names of the changed constants, so only what depends on them
+    is to be rebuilt.
+    """
+
+    global config
+
+    previous = config
+    config = ConfigParser()
+    config.read_dict(previous)
+    for section, options in changes.items():
+        if not config.has_section(section):
+            config.add_section(section)
+        for option, value in options.items():
+            if value is None:
+                config.remove_option(section, option)
+            elif isinstance(value, bool):
+                config.set(section, option, 'yes' if value else 'no')
+            else:
+                config.set(section, option, str(value))
+
+    try:
+        config_validation()
+        game = read_game()
+        gui = read_gui(game)
+    except (ValueError, OSError):
+        config = previous
+        raise
+
+    # random seed is drawn again only for the changed game,
+    # so the new boards do not repeat the ones of the same seed
+    if config.get('Game Parameters', 'random seed', fallback='') == '' \
+            and all(
+                getattr(GAME, name, None) == value
+                for name, value in vars(game).items()
+                if name.isupper() and name != 'SEED'
+            ):
+        game.SEED = GAME.SEED
+
+    return update_constants(GAME, game) | update_constants(GUI, gui)
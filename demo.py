@@ -11,18 +11,47 @@ Main program. Entry point.
 """
 
 
+# System imports
+from sys import stderr
+from os import makedirs, path
+from datetime import datetime
+
 # External imports
 import pygame as pg
 
 # Project imports
-from config import GAME, GUI
+from config import GAME, GUI, change_settings
 from structures import EVENT, ACTION, GAME_STATE, FACE_STATE
-from logic import Logic
+from pool import BoardPool
+from replay import Recorder
+from journal import Journal
 from graphics import Graphics
 
 
 # --- Demo --------------------------------------------------------------------
 
+# event of the timer waking up the main loop, once time score changes
+TIMER_EVENT = pg.event.custom_type()
+
+# maximum scale of the graphics set by the function keys
+MAX_SCALE = 4
+
+# settings changed by the function keys while the game runs:
+# options of the configuration by sections (see config.change_settings)
+SETTINGS_KEYS = {
+    pg.K_F5: lambda: {'Minefield': {'preset': 'beginner'}},
+    pg.K_F6: lambda: {'Minefield': {'preset': 'intermediate'}},
+    pg.K_F7: lambda: {'Minefield': {'preset': 'expert'}},
+    pg.K_F8: lambda: {'User Interface': {'night mode': not GUI.NIGHT_MODE}},
+    pg.K_F9: lambda: {
+        'User Interface': {'graphics scale': max(GUI.SCALE - 1, 1)}
+    },
+    pg.K_F10: lambda: {
+        'User Interface': {'graphics scale': min(GUI.SCALE + 1, MAX_SCALE)}
+    }
+}
+
+
 class Demo:
 
     def __init__(self):
@@ -31,9 +60,11 @@ class Demo:
         self.is_running = True  # running main program flag
 
         self.is_mousemotion = False  # flag of the mouse pointer movement event
+        self.is_dragged = False  # flag of the minefield dragging by mouse
         self.mouse_coords = None  # current mouse position
 
         self.event = None  # current occurred event from mouse or keys
+        self.settings_key = None  # key of the settings to be changed
         self.action = None  # current action performed based on event
 
         self.hover_action = None
@@ -42,7 +73,11 @@ class Demo:
         self.interaction_object = None
 
         # Setup game engine
-        self.logic = Logic(GAME)
+        self.recorder = None
+        self.journal = None
+        self.pool = None
+        self.logic = None
+        self.setup_game()
         # Setup graphics
         self.graphics = Graphics(GUI.RESOLUTION)
 
@@ -64,11 +99,12 @@ class Demo:
         # Tracking both kinds of events: on press and release of mouse buttons.
         # Tracking only pressing events for keyboard keys.
 
-        for event in pg.event.get():
+        for event in self.get_events():
 
             # events from main window
             if event.type == pg.QUIT:
                 self.is_running = False
+                self.stop()
                 return
 
             # events from mouse
@@ -78,17 +114,29 @@ class Demo:
                 self.is_mousemotion = True
                 self.mouse_coords = pg.mouse.get_pos()
 
+                # dragging minefield by holding middle button
+                if event.buttons[1]:
+                    if self.graphics.drag_view(event.rel):
+                        self.is_dragged = True
+
             left_button, middle_button, right_button = pg.mouse.get_pressed()
             if left_button:  # Left button click press
                 self.event = EVENT.LEFT_MOUSE_BUTTON_DOWN
             if right_button:  # Right button click press
                 self.event = EVENT.RIGHT_MOUSE_BUTTON_DOWN
 
+            if event.type == pg.MOUSEBUTTONDOWN:
+                if event.button == 2:  # middle button click press
+                    self.is_dragged = False
+                    self.graphics.drag_view(None)
+
             if event.type == pg.MOUSEBUTTONUP:
                 if event.button == 1:  # Left button click release
                     self.event = EVENT.LEFT_MOUSE_BUTTON_UP
                 if event.button == 2:  # middle button click release
-                    self.event = EVENT.MIDDLE_MOUSE_BUTTON_UP
+                    # no revealing once minefield was dragged
+                    if not self.is_dragged:
+                        self.event = EVENT.MIDDLE_MOUSE_BUTTON_UP
                 if event.button == 3:  # Right button click release
                     self.event = EVENT.RIGHT_MOUSE_BUTTON_UP
 
@@ -96,6 +144,7 @@ class Demo:
             if event.type == pg.KEYDOWN:
                 if event.key == pg.K_ESCAPE:  # Esc key
                     self.is_running = False
+                    self.stop()
                     return
 
                 # if event.key == pg.K_F2:  # 'F2' key
@@ -125,6 +174,18 @@ class Demo:
                 if event.key == pg.K_SPACE:  # Space bar key press
                     self.event = EVENT.SPACE_BAR_DOWN
 
+                if event.key == pg.K_BACKSPACE or (
+                        event.key == pg.K_z and event.mod & pg.KMOD_CTRL
+                ):  # 'Backspace' or 'Ctrl+Z' keys
+                    self.event = EVENT.UNDO_KEY_DOWN
+                if event.key == pg.K_y \
+                        and event.mod & pg.KMOD_CTRL:  # 'Ctrl+Y' keys
+                    self.event = EVENT.REDO_KEY_DOWN
+
+                if event.key in SETTINGS_KEYS:  # 'F5' - 'F10' keys
+                    self.event = EVENT.SETTINGS_KEY_DOWN
+                    self.settings_key = event.key
+
     def actions_handler(self):
         """Program actions in the main loop."""
 
@@ -191,6 +252,13 @@ class Demo:
 
         # Performing actual reactions.
 
+        if self.event == EVENT.UNDO_KEY_DOWN \
+                or self.event == EVENT.REDO_KEY_DOWN:
+            self.reaction_on_undo()
+
+        if self.event == EVENT.SETTINGS_KEY_DOWN:
+            self.reaction_on_settings()
+
         if self.action is not None:
 
             if self.interaction_object == self.graphics.face_button:
@@ -219,7 +287,7 @@ class Demo:
         self.graphics.draw_face_button(self.face_button_status)
         self.graphics.draw_bombs_score(self.logic.get_bombs_score())
         self.graphics.draw_time_score(self.logic.get_time_score())
-        self.graphics.draw_minefield(self.logic.get_matrix())
+        self.graphics.draw_minefield(self.get_view_matrix())
         if self.press_action is not None:
             self.graphics.draw_pressed_cells(
                 self.logic.get_pressed_cells(),
@@ -228,19 +296,121 @@ class Demo:
         if GUI.INDICATE_HOVER and self.hover_action:
             self.graphics.draw_hovered_cell(
                 self.logic.get_code_of_cell(
-                    self.graphics.convert_coords(self.mouse_coords)
+                    self.graphics.locate_cell(self.mouse_coords)
                 ),
-                self.graphics.convert_coords(self.mouse_coords)
+                self.graphics.locate_cell(self.mouse_coords)
             )
 
         self.graphics.show()
 
+    def get_view_matrix(self):
+        """Exporting visible part of the minefield matrix."""
+        return self.logic.get_matrix(
+            *self.graphics.origin, GUI.VISIBLE_ROWS, GUI.VISIBLE_COLS
+        )
+
+    # --- Scheduling methods --------------------------------------------------
+
+    def get_events(self) -> list[pg.event.Event]:
+        """
+        Collecting occurred events: at once for the 'frames' scheduler,
+        otherwise - waiting for at least one of them (or for the timer),
+        except the very first frame.
+        """
+
+        events = pg.event.get()
+        if GUI.SCHEDULER == 'events' and not events \
+                and not self.graphics.full_update:
+            self.schedule_timer()
+            events = [pg.event.wait()] + pg.event.get()
+        return events
+
+    def schedule_timer(self):
+        """
+        Setting up timer event to the moment, when time score changes,
+        or cancelling it in case time score is not running.
+        """
+
+        delay = self.logic.get_time_to_next_score()
+        if delay is None:
+            pg.time.set_timer(TIMER_EVENT, 0)
+        else:
+            pg.time.set_timer(TIMER_EVENT, int(delay * 1000) + 1, loops=1)
+
     # --- Gaming methods ------------------------------------------------------
 
+    def setup_game(self):
+        """
+        Setup game engine by the current settings: the pool of new boards,
+        recording of the games into replay log
+        or journal of the actions for undo in practice mode.
+        """
+
+        if self.pool is not None:
+            self.stop()
+
+        self.recorder = None
+        self.journal = None
+        if GAME.PRACTICE:
+            self.journal = Journal(GAME.UNDO_MEMORY)
+        elif GAME.REPLAYS is not None:
+            makedirs(GAME.REPLAYS, exist_ok=True)
+            self.recorder = Recorder(open(path.join(
+                GAME.REPLAYS, f'{datetime.now():%Y%m%d-%H%M%S}.mrp'
+            ), 'ab'))
+        self.pool = BoardPool(GAME, GAME.BOARD_POOL)
+        self.take_board()
+
+    def change_settings(self, changes: dict[str, dict[str, object]]) -> bool:
+        """
+        Changing settings while the game runs (see config.change_settings)
+        and rebuilding only what depends on the changed ones:
+        game engine (new game) - once any of the game parameters is changed,
+        sprites, frame and window - by graphics itself.
+        Invalid settings are reported, while the game goes on as is.
+        Return True in case settings are changed - False otherwise.
+        """
+
+        try:
+            changed = change_settings(changes)
+        except (ValueError, OSError) as error:
+            print(f"Settings are not changed: {error}", file=stderr)
+            return False
+        if any(hasattr(GAME, name) for name in changed):
+            self.setup_game()
+            self.face_button_status = FACE_STATE.READY
+        self.graphics.reconfigure(changed)
+
+        self.interaction_object = None
+        self.hover_action = False
+        self.press_action = None
+        self.action = None
+        return True
+
+    def take_board(self):
+        """
+        Taking the next ready board, recorded once recording is on
+        (or journaled for undo in practice mode).
+        """
+
+        self.logic = self.pool.take()
+        if self.recorder is not None:
+            self.recorder.attach(self.logic)
+        if self.journal is not None:
+            self.journal.attach(self.logic)
+
+    def stop(self):
+        """Stopping background generation of boards and recording."""
+
+        self.pool.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+
     def move_mouse_cursor(self):
         """
         Moving mouse cursor according
-        to the direction of pressed arrow keys.
+        to the direction of pressed arrow keys
+        (scrolling visible part of the minefield over its edges).
         """
 
         if self.event == EVENT.RIGHT_ARROW_KEY_DOWN:
@@ -259,15 +429,15 @@ class Demo:
         )
 
     def new_game(self):
-        """Procedure for the new game."""
+        """Procedure for the new game (taking the next ready board)."""
 
-        self.logic.new_game()
+        self.take_board()
         self.face_button_status = FACE_STATE.READY
 
     def reaction_on_hover(self):
         self.hover_action = True
         self.logic.define_hovered_cell(
-            self.graphics.convert_coords(self.mouse_coords)
+            self.graphics.locate_cell(self.mouse_coords)
         )
 
     def reaction_on_press(self):
@@ -276,7 +446,7 @@ class Demo:
         self.face_button_status = FACE_STATE.ACTIVE
         self.press_action = self.action
         self.logic.define_pressed_cells(
-            self.graphics.convert_coords(self.mouse_coords),
+            self.graphics.locate_cell(self.mouse_coords),
             self.press_action
         )
 
@@ -286,9 +456,29 @@ class Demo:
         self.press_action = None
         self.logic.perform_action(
             self.action,
-            self.graphics.convert_coords(self.mouse_coords)
+            self.graphics.locate_cell(self.mouse_coords)
         )
         if self.logic.check_game_lost():
             self.face_button_status = FACE_STATE.LOST
         if self.logic.check_game_won():
             self.face_button_status = FACE_STATE.WON
+
+    def reaction_on_settings(self):
+        """Changing settings by the function key."""
+        self.change_settings(SETTINGS_KEYS[self.settings_key]())
+
+    def reaction_on_undo(self):
+        """Undoing or redoing the action in practice mode."""
+
+        if self.journal is None:
+            return
+        if self.event == EVENT.UNDO_KEY_DOWN:
+            self.journal.undo(self.logic)
+        else:
+            self.journal.redo(self.logic)
+
+        self.press_action = None
+        self.face_button_status = {
+            GAME_STATE.WON: FACE_STATE.WON,
+            GAME_STATE.LOST: FACE_STATE.LOST
+        }.get(self.logic.game_state, FACE_STATE.READY)
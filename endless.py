@@ -0,0 +1,589 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+(III) Logic level abstraction.
+Endless minefield, split into chunks generated on demand.
+"""
+
+
+# System imports
+from typing import Optional
+from collections import deque
+from zlib import compress, decompress
+
+# External imports
+import numpy as np
+
+# Project imports
+from structures import START_RULE, GAME_STATE, CELL_TO_CODE
+from storage import (
+    unpack_layers, map_snapshot,
+    NEARBY_BITS, OPENED_BIT, FLAGGED_BIT, MARKED_BIT, MINED_BIT
+)
+from logic import Logic
+
+
+# --- Chunk Views -------------------------------------------------------------
+
+class ChunkView:
+    """
+    Matrix layer of the endless minefield as a view of single bit
+    (or of number of bombs nearby) of the chunks' cell states.
+    Indexed by world positions of the cells only: (row, col).
+    """
+
+    def __init__(self, logic: 'EndlessLogic', bits: int):
+        self.logic = logic
+        self.bits = bits
+
+    def __getitem__(self, position: tuple[int, int]):
+        state = self.logic.get_state(position) & self.bits
+        return state if self.bits == NEARBY_BITS else state != 0
+
+    def __setitem__(self, position: tuple[int, int], value):
+        state = self.logic.get_state(position)
+        if self.bits == NEARBY_BITS:
+            state = (state & ~NEARBY_BITS) | (int(value) & NEARBY_BITS)
+        elif value:
+            state |= self.bits
+        else:
+            state &= ~self.bits
+        self.logic.set_state(position, state)
+
+
+# --- Endless Logic -----------------------------------------------------------
+
+class EndlessLogic(Logic):
+    """
+    Game logic of the unbounded minefield, split into square chunks.
+    Each chunk is generated only once it is touched by the actions or
+    exported matrix, using own seed derived from the seed of the game
+    and chunk's coordinates - so the minefield is the same regardless
+    of the order chunks are generated in.
+    Density of bombs is taken from game parameters: BOMBS / (ROWS * COLS).
+    Positions of the cells are world positions (row, col) of any sign.
+    There is no win in the endless game - only opening more and more cells.
+    """
+
+    STORAGE = 'endless'
+
+    # number of rows and columns of the single chunk
+    CHUNK_SIZE = 32
+
+    # maximum number of cells opened by the expansion per single action,
+    # the rest of expansion is continued by the following actions
+    MAX_EXPANSION = 1 << 14
+
+    # distance (in chunks) from the clicked cell, which the expansion
+    # is limited by - it is resumed once the action is performed nearby
+    EXPANSION_DISTANCE = 2
+
+    # distance (in chunks) from the exported matrix,
+    # beyond which resolved chunks are compressed
+    KEEP_DISTANCE = 4
+
+    def __init__(self, game):
+        size = self.CHUNK_SIZE
+        density = game.BOMBS / (game.ROWS * game.COLS)
+        self.bombs_per_chunk = min(round(density * size * size), size * size - 1)
+
+        # chunks of the cell states (see storage.*_BIT) by chunk coordinates,
+        # resolved chunks far from the exported matrix are compressed
+        self.chunks: dict[tuple[int, int], np.ndarray] = dict()
+        self.compressed: dict[tuple[int, int], bytes] = dict()
+        # generated bombs of the chunks, to not regenerate them for neighbours
+        self.mines: dict[tuple[int, int], np.ndarray] = dict()
+
+        # seed of the current game, chunks' seeds are derived from it
+        self.game_seed = 0
+        # cells cleared from bombs by the start rule on the first click
+        self.safe_area: set[tuple[int, int]] = set()
+
+        # cells to continue the expansion from (opened ones without bombs
+        # nearby), chunks of the expansion cut by the distance from the click
+        # and those chunks the expansion is limited by for the current action
+        self.to_expand: deque[tuple[int, int]] = deque()
+        self.unfinished: set[tuple[int, int]] = set()
+        self.bounds: Optional[tuple[int, int, int, int]] = None
+
+        super().__init__(game)
+
+    # --- Chunk methods -------------------------------------------------------
+
+    def split_position(
+            self,
+            position: tuple[int, int]
+    ) -> tuple[tuple[int, int], tuple[int, int]]:
+        """
+        Converting world position of the cell (row, col)
+        to the coordinates of its chunk and position within the chunk.
+        """
+
+        row, col = position
+        chunk_row, row = divmod(int(row), self.CHUNK_SIZE)
+        chunk_col, col = divmod(int(col), self.CHUNK_SIZE)
+        return (chunk_row, chunk_col), (row, col)
+
+    def chunk_seed(self, key: tuple[int, int]) -> np.random.SeedSequence:
+        """Deterministic seed of the chunk derived from the game seed."""
+
+        # mapping integers of any sign to non-negative ones for spawn key
+        return np.random.SeedSequence(
+            self.game_seed,
+            spawn_key = tuple(2 * k if k >= 0 else -2 * k - 1 for k in key)
+        )
+
+    def generate_mines(self, key: tuple[int, int]) -> np.ndarray:
+        """Generating boolean matrix of bombs of the chunk."""
+
+        if key in self.mines:
+            return self.mines[key]
+
+        size = self.CHUNK_SIZE
+        rng = np.random.default_rng(self.chunk_seed(key))
+        mined = np.zeros(size * size, np.bool)
+        mined[rng.choice(size * size, self.bombs_per_chunk, replace=False)] \
+            = True
+        mined = mined.reshape((size, size))
+
+        # clearing cells of the start rule (from the first click)
+        for position in self.safe_area:
+            safe_key, (row, col) = self.split_position(position)
+            if safe_key == key:
+                mined[row, col] = False
+
+        if len(self.mines) >= 1024:
+            self.mines.clear()
+        self.mines[key] = mined
+        return mined
+
+    def calculate_chunk(self, key: tuple[int, int]) -> np.ndarray:
+        """
+        Calculating bombs and numbers of bombs nearby of the chunk,
+        taking into account bombs of the neighbour chunks on the edges.
+        """
+
+        size = self.CHUNK_SIZE
+        chunk_row, chunk_col = key
+
+        # bombs of the chunk with bordering rows/cols of the neighbour chunks
+        block = np.block([
+            [
+                self.generate_mines((chunk_row + row_shift, chunk_col + col_shift))
+                for col_shift in [-1, 0, 1]
+            ]
+            for row_shift in [-1, 0, 1]
+        ])
+        m = block[size-1:2*size+1, size-1:2*size+1].astype(np.uint8)
+
+        v = m[:-2, :] + m[1:-1, :] + m[2:, :]
+        nearby = v[:, :-2] + v[:, 1:-1] + v[:, 2:]
+        mined = m[1:-1, 1:-1]
+        nearby -= mined
+        return nearby | (mined * np.uint8(MINED_BIT))
+
+    def load_chunk(self, key: tuple[int, int]) -> np.ndarray:
+        """Return cell states of the chunk, generating it once touched."""
+
+        if key in self.chunks:
+            return self.chunks[key]
+
+        if key in self.compressed:
+            chunk = np.frombuffer(
+                decompress(self.compressed.pop(key)), np.uint8
+            ).reshape((self.CHUNK_SIZE, self.CHUNK_SIZE)).copy()
+        else:
+            chunk = self.calculate_chunk(key)
+        self.chunks[key] = chunk
+        return chunk
+
+    def refresh_chunks(self):
+        """
+        Recalculating bombs and numbers of bombs nearby of generated chunks,
+        keeping the rest of cell states (once safe area is changed).
+        """
+
+        self.mines.clear()
+        for key, chunk in self.chunks.items():
+            chunk &= ~np.uint8(NEARBY_BITS | MINED_BIT)
+            chunk |= self.calculate_chunk(key)
+
+    def compress_far_chunks(self):
+        """
+        Compressing chunks far away from the window of the exported matrix,
+        which are resolved: all the cells without bombs are opened.
+        """
+
+        if self.window is None:
+            return
+        top, left, rows, cols = self.window
+        (bottom, right), _ = \
+            self.split_position((top + rows - 1, left + cols - 1))
+        (top, left), _ = self.split_position((top, left))
+
+        for key in list(self.chunks):
+            chunk_row, chunk_col = key
+            distance = max(
+                top - chunk_row, chunk_row - bottom,
+                left - chunk_col, chunk_col - right
+            )
+            if distance <= self.KEEP_DISTANCE:
+                continue
+            chunk = self.chunks[key]
+            if (chunk & (OPENED_BIT | MINED_BIT)).all():
+                self.compressed[key] = compress(self.chunks.pop(key).tobytes())
+
+    def get_state(self, position: tuple[int, int]) -> int:
+        """Return state of the cell (see storage.*_BIT)."""
+
+        key, local = self.split_position(position)
+        return int(self.load_chunk(key)[local])
+
+    def set_state(self, position: tuple[int, int], state: int):
+        """Setting state of the cell (see storage.*_BIT)."""
+
+        key, local = self.split_position(position)
+        self.load_chunk(key)[local] = state
+
+    # --- Initialization methods ----------------------------------------------
+
+    def create_matrices(self):
+        """Creating views of the matrix layers over the chunks."""
+
+        self.mined = ChunkView(self, MINED_BIT)
+        self.opened = ChunkView(self, OPENED_BIT)
+        self.flagged = ChunkView(self, FLAGGED_BIT)
+        self.marked = ChunkView(self, MARKED_BIT)
+        self.nearby = ChunkView(self, NEARBY_BITS)
+
+    def clear_matrices(self):
+        """Erasing all the chunks."""
+
+        self.chunks.clear()
+        self.compressed.clear()
+        self.mines.clear()
+        self.safe_area.clear()
+        self.to_expand.clear()
+        self.unfinished.clear()
+        self.bounds = None
+
+    def generate_bombs(self, safe_cells: Optional[list] = None):
+        """
+        Seeding new minefield - chunks are generated later on demand
+        (safe cells are kept free of bombs by the safe area).
+        """
+        self.game_seed = int(self.rng.integers(2 ** 63))
+
+    def calculate_nearby(self):
+        """Numbers of bombs nearby are calculated together with chunks."""
+
+    def new_game(self):
+        """
+        New game with the same predefined conditions.
+        Minefield is seeded at once for any start rule,
+        as start rules are met by the safe area around first open click.
+        """
+
+        self.clear_matrices()
+        self.reset_state()
+        self.generate_bombs()
+
+    # --- Snapshot methods ----------------------------------------------------
+
+    def storage_matrices(self) -> list[np.ndarray]:
+        """
+        Return arrays of the generated chunks for the snapshot:
+        numbers of chunks, cells of the safe area and unfinished chunks
+        together with the seed of the game; coordinates of the chunks
+        and their cell states (compressed ones are decompressed);
+        cells of the safe area; chunks of the unfinished expansion.
+        """
+
+        keys = list(self.chunks) + list(self.compressed)
+        states = [self.chunks[key] for key in self.chunks] + [
+            np.frombuffer(decompress(data), np.uint8).reshape(
+                (self.CHUNK_SIZE, self.CHUNK_SIZE)
+            )
+            for data in self.compressed.values()
+        ]
+        # expansion left for the following actions is resumed by chunks
+        unfinished = self.unfinished | {
+            self.split_position(cell)[0] for cell in self.to_expand
+        }
+
+        return [
+            np.array([
+                self.game_seed, len(keys), len(self.safe_area), len(unfinished)
+            ], np.int64),
+            np.array(keys, np.int64).reshape((-1, 2)),
+            np.array(states, np.uint8).reshape(
+                (-1, self.CHUNK_SIZE, self.CHUNK_SIZE)
+            ),
+            np.array(list(self.safe_area), np.int64).reshape((-1, 2)),
+            np.array(list(unfinished), np.int64).reshape((-1, 2))
+        ]
+
+    def map_matrices(self, path: str, offset: int) -> list[np.ndarray]:
+        """Mapping arrays of the chunks by their numbers from the snapshot."""
+
+        counts, = map_snapshot(path, offset, [(np.dtype(np.int64), (4,))])
+        _, chunks, safe_cells, unfinished = counts.tolist()
+        return [counts] + map_snapshot(path, offset + counts.nbytes, [
+            (np.dtype(np.int64), (chunks, 2)),
+            (np.dtype(np.uint8), (chunks, self.CHUNK_SIZE, self.CHUNK_SIZE)),
+            (np.dtype(np.int64), (safe_cells, 2)),
+            (np.dtype(np.int64), (unfinished, 2))
+        ])
+
+    def attach_matrices(self, matrices: list[np.ndarray]):
+        """Restoring the chunks from the arrays (see storage_matrices)."""
+
+        counts, keys, states, safe_cells, unfinished = matrices
+        self.clear_matrices()
+        size = self.CHUNK_SIZE
+        self.bombs_per_chunk = min(
+            round(self.bombs / (self.rows * self.cols) * size * size),
+            size * size - 1
+        )
+        self.game_seed = int(counts[0])
+        for key, chunk in zip(map(tuple, keys.tolist()), states):
+            self.chunks[key] = chunk
+        self.safe_area = set(map(tuple, safe_cells.tolist()))
+        self.unfinished = set(map(tuple, unfinished.tolist()))
+
+    # --- Operational methods -------------------------------------------------
+
+    def find_neighbours(
+            self,
+            position: tuple[int, int]
+    ) -> list[tuple[int, int]]:
+        """Compiling list of neighbour cells positions (there are no edges)."""
+
+        row, col = position
+        return [
+            (row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1),
+            (row - 1, col - 1), (row - 1, col + 1),
+            (row + 1, col - 1), (row + 1, col + 1)
+        ]
+
+    def expand(self, position: tuple[int, int]):
+        """Expending area in case opened cell has no bombs nearby."""
+
+        self.to_expand.append(position)
+        self.continue_expansion()
+
+    def limit_expansion(self, position: tuple[int, int]):
+        """
+        Limiting the expansion by the chunks within EXPANSION_DISTANCE
+        from the clicked cell, resuming the expansion cut nearby before.
+        (the limit depends on the actions only - so replays are the same)
+        """
+
+        (row, col), _ = self.split_position(position)
+        distance = self.EXPANSION_DISTANCE
+        self.bounds = (
+            row - distance, col - distance, row + distance, col + distance
+        )
+
+        size = self.CHUNK_SIZE
+        for key in [key for key in self.unfinished if self.within_bounds(key)]:
+            self.unfinished.discard(key)
+            chunk = self.load_chunk(key)
+            rows, cols = np.nonzero(
+                chunk & (OPENED_BIT | MINED_BIT | NEARBY_BITS) == OPENED_BIT
+            )
+            self.to_expand.extend(zip(
+                (rows + key[0] * size).tolist(),
+                (cols + key[1] * size).tolist()
+            ))
+
+    def within_bounds(self, key: tuple[int, int]) -> bool:
+        """Checking if the chunk is within the limit of the expansion."""
+
+        if self.bounds is None:
+            return True
+        top, left, bottom, right = self.bounds
+        return top <= key[0] <= bottom and left <= key[1] <= right
+
+    def continue_expansion(self):
+        """
+        Continuing expansion of the empty cells breadth-first,
+        by the MAX_EXPANSION cells at most and within the limit of chunks.
+        Cells beyond the limit are dropped, only their chunks are kept
+        for the expansion to be resumed there - so the memory of the
+        expansion does not grow with the endless minefield.
+        """
+
+        budget = self.MAX_EXPANSION
+        while self.to_expand and budget > 0:
+            cell = self.to_expand.popleft()
+            key, _ = self.split_position(cell)
+            if not self.within_bounds(key):
+                self.unfinished.add(key)
+                continue
+            for neighbour in self.find_neighbours(cell):
+                state = self.get_state(neighbour)
+                if state & (OPENED_BIT | FLAGGED_BIT):
+                    continue
+                self.set_state(neighbour, (state | OPENED_BIT) & ~MARKED_BIT)
+                self.opened_count += 1
+                self.marked_count -= bool(state & MARKED_BIT)
+                budget -= 1
+                if state & NEARBY_BITS == 0:
+                    self.to_expand.append(neighbour)
+
+    # --- Game Start Rule methods ---------------------------------------------
+
+    def _before_first_action_to_open(self) -> bool:
+        """
+        Clearing bombs under position of the first open click
+        according to current start rule.
+        Return True in case of successful performing - False otherwise.
+        """
+
+        if self.flagged[self.click_position]:
+            return False
+
+        if self.start_rule == START_RULE.NO_BOMB:
+            self.safe_area = {self.click_position}
+        elif self.start_rule == START_RULE.EMPTY_CELL:
+            self.safe_area = set(
+                self.find_neighbours(self.click_position)
+                + [self.click_position]
+            )
+        self.refresh_chunks()
+
+        return True
+
+    # --- Action methods ------------------------------------------------------
+
+    def perform_action(self, action, click_position):
+        """
+        Method to call appropriate action by corresponding click,
+        continuing unfinished expansion nearby beforehand.
+        """
+
+        self.limit_expansion(click_position)
+        self.continue_expansion()
+        super().perform_action(action, click_position)
+
+    # --- Checking game state methods -----------------------------------------
+
+    def check_game_won(self) -> bool:
+        """There is no win in the endless game."""
+        return False
+
+    # --- Export methods ------------------------------------------------------
+
+    def get_bombs_score(self) -> int:
+        """Number of flags set on the minefield."""
+        return self.flagged_count
+
+    def get_opened_score(self) -> int:
+        """Number of opened cells on the minefield."""
+        return self.opened_count
+
+    def check_counters(self):
+        """
+        Checking running counters of the cells by counting them
+        throughout the chunks (in debug mode only - it is slow).
+        """
+
+        counted = tuple(
+            self.count_cells(bit)
+            for bit in [OPENED_BIT, FLAGGED_BIT, MARKED_BIT]
+        )
+        counters = (self.opened_count, self.flagged_count, self.marked_count)
+        if counted != counters:
+            raise RuntimeError(
+                f"Counters of opened, flagged and marked cells {counters} "
+                f"differ from the chunks {counted}."
+            )
+
+    def count_cells(self, bit: int) -> int:
+        """Counting cells with the bit of state set throughout the chunks."""
+
+        count = sum(
+            int(np.count_nonzero(chunk & bit))
+            for chunk in self.chunks.values()
+        )
+        for data in self.compressed.values():
+            count += int(np.count_nonzero(
+                np.frombuffer(decompress(data), np.uint8) & bit
+            ))
+        return count
+
+    def get_matrix(
+            self,
+            top: int = 0,
+            left: int = 0,
+            rows: Optional[int] = None,
+            cols: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Exporting window of the minefield matrix with the definitions
+        from CODE_TO_CELL: from world position (top, left)
+        by rows * cols cells (by default - of the game parameters).
+        """
+
+        rows = self.rows if rows is None else rows
+        cols = self.cols if cols is None else cols
+        self.window = (top, left, rows, cols)
+
+        matrix = self.compose_window(top, left, rows, cols)
+        self.compress_far_chunks()
+        return matrix
+
+    def compose_window(
+            self,
+            top: int,
+            left: int,
+            rows: int,
+            cols: int
+    ) -> np.ndarray:
+        """Composing cell codes of the window of minefield."""
+
+        # assembling cell states of the window from the chunks
+        size = self.CHUNK_SIZE
+        states = np.empty((rows, cols), np.uint8)
+        (first_row, first_col), _ = self.split_position((top, left))
+        (last_row, last_col), _ = \
+            self.split_position((top + rows - 1, left + cols - 1))
+        for chunk_row in range(first_row, last_row + 1):
+            for chunk_col in range(first_col, last_col + 1):
+                chunk = self.load_chunk((chunk_row, chunk_col))
+                row_from = max(chunk_row * size, top)
+                row_to = min((chunk_row + 1) * size, top + rows)
+                col_from = max(chunk_col * size, left)
+                col_to = min((chunk_col + 1) * size, left + cols)
+                states[
+                    row_from - top:row_to - top, col_from - left:col_to - left
+                ] = chunk[
+                    row_from - chunk_row * size:row_to - chunk_row * size,
+                    col_from - chunk_col * size:col_to - chunk_col * size
+                ]
+
+        is_lost = self.game_state == GAME_STATE.LOST
+        mined, opened, flagged, marked, nearby = unpack_layers(states)
+        matrix = self.select_codes(
+            opened, flagged, mined, marked, nearby, is_lost
+        )
+
+        if is_lost and self.click_position is not None:
+            row, col = self.click_position
+            if top <= row < top + rows and left <= col < left + cols \
+                    and not self.opened[self.click_position]:
+                matrix[row - top, col - left] = CELL_TO_CODE['detonated']
+
+        return matrix
+
+    def get_code_of_cell(self, position: tuple[int, int]):
+        """
+        Providing code of the cell at world position on minefield.
+        """
+        return self.compose_window(*position, 1, 1)[0, 0]
@@ -12,11 +12,15 @@ Presentation, graphics & UI, provided by pygame external module.
 
 
 # System imports
-from os import environ, path
-from json import load as json_load
+from sys import platform, stderr
+from os import environ, listdir, makedirs, path, remove, replace
+from json import dumps as json_dumps, loads as json_loads
+from hashlib import sha256
+from struct import Struct, error as StructError
 from typing import Optional
 
 # External imports
+import numpy as np
 from numpy import ndarray
 import pygame as pg
 
@@ -25,14 +29,162 @@ from config import GAME, GUI
 from structures import ACTION, FACE_STATE, CODE_TO_CELL
 
 
+# --- Sprites Cache -----------------------------------------------------------
+
+# Cache file holds all the sprites preprocessed for the graphics name,
+# night mode and scale (including the hover and grid line ones) as one atlas:
+# header - magic, version, width and height of the atlas, size of its index;
+# index - JSON of the rects of the sprites on the atlas by their names;
+# pixels - RGB bytes of the atlas row by row.
+# Name of the file is made of the graphics name, scale and night mode,
+# followed by the hash of the sprites files and the way of preprocessing,
+# so any change of them just misses the cache.
+
+SPRITES_CACHE_MAGIC = b'MSSC'
+SPRITES_CACHE_VERSION = 1  # to be increased once preprocessing is changed
+SPRITES_CACHE_HEADER = Struct('<4sBIII')
+SPRITES_CACHE_EXTENSION = '.sprites'
+
+# maximum width of the atlas in pixels (unless the sprite is wider)
+ATLAS_WIDTH = 1024
+
+
+def sprites_cache_path() -> Optional[str]:
+    """
+    Defining path to the cache file of the sprites
+    for the current graphics name, night mode and scale.
+    """
+
+    if GUI.SPRITES_CACHE is None:
+        return None
+
+    digest = sha256()
+    digest.update(SPRITES_CACHE_MAGIC)
+    digest.update(bytes([SPRITES_CACHE_VERSION]))
+    with open(GUI.SPRITES_IMAGE, 'rb') as image_file:
+        digest.update(image_file.read())
+    digest.update(json_dumps(GUI.STENCIL, sort_keys=True).encode())
+
+    name = path.splitext(path.basename(GUI.SPRITES_IMAGE))[0]
+    mode = 'night' if GUI.NIGHT_MODE else 'day'
+    return path.join(
+        GUI.SPRITES_CACHE,
+        f'{name}-x{GUI.SCALE}-{mode}-{digest.hexdigest()[:16]}'
+        + SPRITES_CACHE_EXTENSION
+    )
+
+
+def pack_atlas(sprites: dict[str, pg.Surface]) -> dict[str, pg.Rect]:
+    """
+    Placing sprites on the atlas by shelves: rows of sprites from the tallest
+    to the lowest ones. Return rects of the sprites on the atlas.
+    """
+
+    width = max(
+        [ATLAS_WIDTH] + [sprite.get_width() for sprite in sprites.values()]
+    )
+    rects: dict[str, pg.Rect] = dict()
+    x = y = shelf_height = 0
+    for name in sorted(sprites, key=lambda n: -sprites[n].get_height()):
+        rect = sprites[name].get_rect()
+        if x + rect.width > width:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        rect.topleft = (x, y)
+        rects[name] = rect
+        x += rect.width
+        shelf_height = max(shelf_height, rect.height)
+    return rects
+
+
+def write_sprites_cache(cache_path: str, sprites: dict[str, pg.Surface]):
+    """
+    Writing sprites into the cache file as one atlas,
+    replacing the outdated cache files of the same graphics, mode and scale.
+    """
+
+    rects = pack_atlas(sprites)
+    width = max(rect.right for rect in rects.values())
+    height = max(rect.bottom for rect in rects.values())
+    atlas = pg.Surface((width, height))
+    for name, rect in rects.items():
+        atlas.blit(sprites[name], rect)
+
+    index = json_dumps({
+        name: [rect.x, rect.y, rect.width, rect.height]
+        for name, rect in rects.items()
+    }).encode()
+    pixels = pg.surfarray.array3d(atlas).transpose(1, 0, 2).tobytes()
+
+    folder, file_name = path.split(cache_path)
+    makedirs(folder, exist_ok=True)
+    prefix = file_name.rsplit('-', 1)[0] + '-'
+    for outdated in listdir(folder):
+        if outdated.startswith(prefix) and outdated != file_name:
+            remove(path.join(folder, outdated))
+
+    # writing through the temporary file, so the cache is never partial
+    with open(cache_path + '.tmp', 'wb') as cache_file:
+        cache_file.write(SPRITES_CACHE_HEADER.pack(
+            SPRITES_CACHE_MAGIC, SPRITES_CACHE_VERSION,
+            width, height, len(index)
+        ))
+        cache_file.write(index)
+        cache_file.write(pixels)
+    replace(cache_path + '.tmp', cache_path)
+
+
+def read_sprites_cache(cache_path: str) -> dict[str, pg.Surface]:
+    """
+    Reading sprites from the cache file at once:
+    sprites are the subsurfaces of the atlas, converted for the display.
+    """
+
+    with open(cache_path, 'rb') as cache_file:
+        data = cache_file.read()
+
+    magic, version, width, height, index_size = \
+        SPRITES_CACHE_HEADER.unpack_from(data)
+    offset = SPRITES_CACHE_HEADER.size
+    if magic != SPRITES_CACHE_MAGIC or version != SPRITES_CACHE_VERSION \
+            or len(data) != offset + index_size + width * height * 3:
+        raise ValueError(f"Broken cache of the sprites: {cache_path}.")
+
+    index = json_loads(data[offset:offset + index_size])
+    offset += index_size
+    atlas = pg.image.frombuffer(
+        memoryview(data)[offset:], (width, height), 'RGB'
+    ).convert()
+    return {name: atlas.subsurface(rect) for name, rect in index.items()}
+
+
 # --- Graphics ----------------------------------------------------------------
 
+# settings (names of the constants of GUI) the graphics is built on:
+# sprites - for the theme, night mode and scale,
+# frame and window - for the layout of the screen (see Graphics.reconfigure)
+SPRITES_SETTINGS = {'SPRITES_IMAGE', 'STENCIL', 'NIGHT_MODE', 'SCALE'}
+LAYOUT_SETTINGS = {
+    'RESOLUTION', 'CELL_SIZE', 'BORDER', 'PADDING', 'DIGIT_WIDTH',
+    'PANEL_HEIGHT', 'VISIBLE_ROWS', 'VISIBLE_COLS'
+}
+TILES_SETTINGS = SPRITES_SETTINGS | {
+    'RENDERING', 'VISIBLE_ROWS', 'VISIBLE_COLS'
+}
+
 class Graphics:
     """Setup of pygame graphics."""
 
     def __init__(self, resolution: tuple[int, int]):
         """Initializing pygame graphics."""
 
+        # Actual display fullscreen resolution
+        # do not considering OS scale and layout:
+        # (thanks to solution by)
+        # https://gamedev.stackexchange.com/questions/105750/pygame-fullsreen-display-issue
+        if platform == 'win32':
+            import ctypes
+            ctypes.windll.user32.SetProcessDPIAware()
+
         # Initialization pygame display
         environ['SDL_VIDEO_CENTERED'] = '1'  # centering pygame window
         pg.init()
@@ -49,10 +201,8 @@ class Graphics:
         # Preparing sprites
         self.sprites: dict[str, pg.Surface] = dict()
         self.load_sprites()
-        if GUI.INDICATE_HOVER:
-            self.make_hover_sprites()
-        if GAME.COLS < 8:
-            self.make_grid_line_sprite()
+        if GUI.RENDERING == 'framebuffer':
+            self.make_tile_stack()
 
         # Preparing and drawing frame
         self.frame = pg.Surface((GUI.SCREEN_WIDTH, GUI.SCREEN_HEIGHT))
@@ -63,22 +213,70 @@ class Graphics:
         self.face_button = self.define_face_button_rect()
         self.minefield = self.define_minefield_rect()
 
+        # Visible part of the minefield (viewport):
+        # position of the cell in its top left corner, and
+        # pixels of mouse dragging, not yet turned into scrolling by cells
+        self.origin = (0, 0)
+        self.drag_pixels = (0, 0)
+
+        # Tracking what is already reflected on the screen
+        # for redrawing only changed (dirty) regions of it
+        self.drawn_matrix: Optional[ndarray] = None
+        self.drawn_overlays: dict[tuple[int, int], str] = dict()
+        self.drawn_face_state: Optional[FACE_STATE] = None
+        self.drawn_bombs_score: Optional[int] = None
+        self.drawn_time_score: Optional[int] = None
+        self.matrix_to_draw: Optional[ndarray] = None
+        self.overlays_to_draw: dict[tuple[int, int], str] = dict()
+        self.dirty_rects: list[pg.Rect] = list()
+        self.full_update = True
+        self.rects_redrawn = 0  # number of rects updated on the last frame
+
+        # Overlay of the frame profiler on the panel (see profiler.py)
+        self.hud_font: Optional[pg.font.Font] = None
+        self.hud = self.define_hud_rect()
+
     # --- Sprites methods -----------------------------------------------------
 
     def load_sprites(self):
+        """
+        Loading preprocessed sprites from the cache,
+        or building them from the sprites files and caching then.
+        """
+
+        cache_path = None
+        try:
+            cache_path = sprites_cache_path()
+            if cache_path is not None and path.isfile(cache_path):
+                self.sprites = read_sprites_cache(cache_path)
+                return
+        except (OSError, ValueError, StructError) as error:
+            print(f"Sprites are not read from the cache: {error}", file=stderr)
+
+        self.build_sprites()
+        self.make_hover_sprites()
+        self.make_grid_line_sprite()
+
+        if cache_path is not None:
+            try:
+                write_sprites_cache(cache_path, self.sprites)
+            except OSError as error:
+                print(
+                    f"Sprites are not written into the cache: {error}",
+                    file=stderr
+                )
+
+    def build_sprites(self):
         """
         Compiling dictionary of separate sprite images from the file.
         """
 
-        # Step 1: reading sprites from files
+        # Step 1: reading sprites from the file
+        # (stencil is already read by config)
         image = pg.image.load(GUI.SPRITES_IMAGE).convert()
 
-        with open(GUI.SPRITES_STENCIL, 'r') as json_file:
-            obj = json_load(json_file)
-        stencil = {k: v for k, v in obj.items()}
-
         # Step 2: clipping separate sprites
-        for name, clip in stencil.items():
+        for name, clip in GUI.STENCIL.items():
 
             # making separate sprite surface
             rect = pg.Rect(clip)
@@ -106,7 +304,8 @@ class Graphics:
     def make_grid_line_sprite(self):
         """
         Making additional sprite for vertical grid line
-        in case of narrow minefield used (GAME.COLS < 8).
+        in case of narrow minefield used (GUI.VISIBLE_COLS < 8).
+        Made regardless of the minefield, as it is cached with the rest.
         """
 
         cell_empty = self.sprites['cell_empty']
@@ -119,7 +318,8 @@ class Graphics:
 
     def make_hover_sprites(self):
         """
-        Making additional sprites from existing for clickable UI elements.
+        Making additional sprites from existing for clickable UI elements
+        (regardless of GUI.INDICATE_HOVER, as they are cached with the rest).
         """
 
         brighten = 20
@@ -150,15 +350,45 @@ class Graphics:
                 special_flags = pg.BLEND_RGB_ADD
             )
 
+    def make_tile_stack(self):
+        """
+        Making stack of cell sprites pixels, indexed by cell codes,
+        together with preallocated buffers for compositing the minefield.
+        """
+
+        # stack of tiles in the shape of (codes, width, height, RGB)
+        self.tiles = np.stack([
+            pg.surfarray.array3d(self.sprites['cell_' + name])
+            for name in CODE_TO_CELL
+        ])
+        _, tile_width, tile_height, _ = self.tiles.shape
+
+        # buffer for the gathered tiles: (columns, rows, width, height, RGB)
+        self.gathered_tiles = np.empty(
+            (GUI.VISIBLE_COLS, GUI.VISIBLE_ROWS) + self.tiles.shape[1:],
+            self.tiles.dtype
+        )
+        # buffer for the entire minefield image: (x, y, RGB)
+        self.field_pixels = np.empty(
+            (
+                GUI.VISIBLE_COLS * tile_width,
+                GUI.VISIBLE_ROWS * tile_height,
+                3
+            ),
+            self.tiles.dtype
+        )
+        self.field_surface = pg.Surface(self.field_pixels.shape[:2])
+
     def put_sprite_using_anchor(
             self, surface: pg.Surface,
             name: str,
             anchor: str,
             x: int, y: int
-    ):
+    ) -> pg.Rect:
         """
         Drawing sprite by its name on coordinates (x, y) of the surface,
         using anchor point for the rect.
+        Return rect of the drawn sprite.
         """
 
         sprite = self.sprites[name]
@@ -170,14 +400,15 @@ class Graphics:
         elif anchor == 'center':
             rect.center = (x, y)
         surface.blit(sprite, rect)
+        return rect
 
     def put_line_of_sprites(self, surface: pg.Surface, name: str, y: int):
         """
-        Drawing line of sprites according to the number of minefield's columns
+        Drawing line of sprites according to the number of visible columns
         by name on coordinates (x, y) of the surface.
         """
 
-        for col in range(max(GAME.COLS, 8)):
+        for col in range(max(GUI.VISIBLE_COLS, 8)):
             self.put_sprite_using_anchor(
                 surface, name, 'topleft',
                 GUI.BORDER + col * GUI.CELL_SIZE, y
@@ -185,7 +416,7 @@ class Graphics:
 
     def build_frame(self):
         """
-        Building full frame surface according to the minefield size.
+        Building full frame surface according to the visible minefield size.
         """
 
         # frame line #1
@@ -244,7 +475,7 @@ class Graphics:
         )
 
         # frame line #4
-        for row in range(GAME.ROWS):
+        for row in range(GUI.VISIBLE_ROWS):
             self.put_sprite_using_anchor(
                 self.frame, 'frame_field_left_edge', 'topleft',
                 0, 2 * GUI.BORDER + GUI.PANEL_HEIGHT + row * GUI.CELL_SIZE
@@ -260,54 +491,133 @@ class Graphics:
             )
 
             # separate vertical grid line in case of narrow minefield
-            if GAME.COLS < 8:
+            if GUI.VISIBLE_COLS < 8:
                 self.put_sprite_using_anchor(
                     self.frame, 'cell_grid_line', 'topleft',
                     GUI.FIELD_X_TOP_LEFT + GUI.PADDING
-                    + GAME.COLS * GUI.CELL_SIZE,
+                    + GUI.VISIBLE_COLS * GUI.CELL_SIZE,
                     2 * GUI.BORDER + GUI.PANEL_HEIGHT + row * GUI.CELL_SIZE
                 )
 
         # frame line #5
         self.put_sprite_using_anchor(
             self.frame, 'frame_field_bottom_left_corner', 'topleft',
-            0, 2 * GUI.BORDER + GUI.PANEL_HEIGHT + GAME.ROWS * GUI.CELL_SIZE
+            0, 2 * GUI.BORDER + GUI.PANEL_HEIGHT + GUI.FIELD_HEIGHT
         )
         self.put_line_of_sprites(
             self.frame, 'frame_field_bottom_edge',
-            2 * GUI.BORDER + GUI.PANEL_HEIGHT + GAME.ROWS * GUI.CELL_SIZE
+            2 * GUI.BORDER + GUI.PANEL_HEIGHT + GUI.FIELD_HEIGHT
         )
         self.put_sprite_using_anchor(
             self.frame, 'frame_field_bottom_right_corner', 'topright',
             GUI.SCREEN_WIDTH,
-            2 * GUI.BORDER + GUI.PANEL_HEIGHT + GAME.ROWS * GUI.CELL_SIZE
+            2 * GUI.BORDER + GUI.PANEL_HEIGHT + GUI.FIELD_HEIGHT
         )
 
     # --- Coords / Position methods -------------------------------------------
 
     @staticmethod
-    def convert_coords(mouse_coords: tuple[int, int]) -> tuple[int, int]:
+    def convert_coords(
+            mouse_coords: tuple[int, int],
+            origin: tuple[int, int] = (0, 0)
+    ) -> tuple[int, int]:
         """
         Converting mouse coords (x, y) - to minefield cell position (row, col).
         Presumably mouse cursor is inside minefield rect.
+        Origin is position of the cell drawn in top left corner of minefield
+        (e.g. world position for the endless minefield split into chunks).
         """
 
         x, y = mouse_coords
         col = (x - GUI.FIELD_X_TOP_LEFT - GUI.PADDING) // GUI.CELL_SIZE
         row = (y - GUI.FIELD_Y_TOP_LEFT) // GUI.CELL_SIZE
-        return row, col
+        return row + origin[0], col + origin[1]
 
     @staticmethod
-    def convert_position(position: tuple[int, int]) -> tuple[int, int]:
+    def convert_position(
+            position: tuple[int, int],
+            origin: tuple[int, int] = (0, 0)
+    ) -> tuple[int, int]:
         """
         Converting minefield cell position (row, col) - to pixel coords (x, y).
+        Origin is position of the cell drawn in top left corner of minefield.
         """
 
-        row, col = position
+        row, col = position[0] - origin[0], position[1] - origin[1]
         x = GUI.FIELD_X_TOP_LEFT + GUI.PADDING + col * GUI.CELL_SIZE
         y = GUI.FIELD_Y_TOP_LEFT + row * GUI.CELL_SIZE
         return x, y
 
+    def locate_cell(self, mouse_coords: tuple[int, int]) -> tuple[int, int]:
+        """
+        Converting mouse coords (x, y) - to minefield cell position (row, col)
+        considering visible part of the minefield.
+        """
+        return self.convert_coords(mouse_coords, self.origin)
+
+    def localize_cell(
+            self,
+            position: tuple[int, int]
+    ) -> Optional[tuple[int, int]]:
+        """
+        Converting minefield cell position - to position of the cell
+        inside visible part of the minefield (None once it is not visible).
+        """
+
+        row, col = position[0] - self.origin[0], position[1] - self.origin[1]
+        if 0 <= row < GUI.VISIBLE_ROWS and 0 <= col < GUI.VISIBLE_COLS:
+            return row, col
+        return None
+
+    def scroll_view(self, rows: int, cols: int) -> bool:
+        """
+        Shifting visible part of the minefield by number of rows and columns
+        within the minefield.
+        Return whether visible part of the minefield is shifted.
+        """
+
+        origin = (self.origin[0] + rows, self.origin[1] + cols)
+        if GAME.STORAGE != 'endless':  # endless minefield has no edges
+            origin = (
+                min(max(origin[0], 0), GAME.ROWS - GUI.VISIBLE_ROWS),
+                min(max(origin[1], 0), GAME.COLS - GUI.VISIBLE_COLS)
+            )
+        is_shifted = origin != self.origin
+        self.origin = origin
+        return is_shifted
+
+    def follow_cell(self, position: tuple[int, int]):
+        """
+        Shifting visible part of the minefield for the cell to be visible.
+        """
+
+        row, col = position[0] - self.origin[0], position[1] - self.origin[1]
+        self.scroll_view(
+            min(row, 0) + max(row - GUI.VISIBLE_ROWS + 1, 0),
+            min(col, 0) + max(col - GUI.VISIBLE_COLS + 1, 0)
+        )
+
+    def drag_view(self, shift: Optional[tuple[int, int]]) -> bool:
+        """
+        Shifting visible part of the minefield by mouse dragging
+        for relative pixels (x, y) of mouse motion.
+        None shift is for the beginning of the dragging.
+        Return whether visible part of the minefield is shifted.
+        """
+
+        if shift is None:
+            self.drag_pixels = (0, 0)
+            return False
+
+        x = self.drag_pixels[0] + shift[0]
+        y = self.drag_pixels[1] + shift[1]
+        cols = int(x / GUI.CELL_SIZE)
+        rows = int(y / GUI.CELL_SIZE)
+        self.drag_pixels = (x - cols * GUI.CELL_SIZE, y - rows * GUI.CELL_SIZE)
+
+        # minefield follows mouse cursor, i.e. scrolling in opposite direction
+        return self.scroll_view(-rows, -cols)
+
     def new_mouse_coords(
             self,
             mouse_coords: tuple[int, int],
@@ -316,21 +626,26 @@ class Graphics:
         """
         Defining new mouse cursor coords according to the direction
         over the center of appropriate minefield cell.
+        Visible part of the minefield is scrolled once cell is beyond it.
         """
 
         if direction is not None:
-            row, col = self.convert_coords(mouse_coords)
+            row, col = self.locate_cell(mouse_coords)
 
             if direction == 'right':
-                col = min(col + 1, GAME.COLS - 1)
+                col += 1
             elif direction == 'left':
-                col = max(col - 1, 0)
+                col -= 1
             elif direction == 'up':
-                row = max(row - 1, 0)
+                row -= 1
             elif direction == 'down':
-                row = min(row + 1, GAME.ROWS - 1)
+                row += 1
+            if GAME.STORAGE != 'endless':  # endless minefield has no edges
+                row = min(max(row, 0), GAME.ROWS - 1)
+                col = min(max(col, 0), GAME.COLS - 1)
 
-            x, y = self.convert_position((row, col))
+            self.follow_cell((row, col))
+            x, y = self.convert_position((row, col), self.origin)
             x += GUI.CELL_SIZE // 2
             y += GUI.CELL_SIZE // 2
             return x, y
@@ -352,6 +667,21 @@ class Graphics:
         )
         return rect
 
+    def define_hud_rect(self) -> pg.Rect:
+        """
+        Defining rect of the profiler overlay: on the panel between
+        bombs score and face button (or the whole panel, once it is narrow).
+        """
+
+        left = GUI.PANEL_X_TOP_LEFT + 4 * GUI.DIGIT_WIDTH
+        right = self.face_button.left - GUI.DIGIT_WIDTH // 2
+        if right - left < 4 * GUI.DIGIT_WIDTH:
+            left, right = GUI.PANEL_X_TOP_LEFT, \
+                GUI.PANEL_X_TOP_LEFT + GUI.PANEL_WIDTH
+        return pg.Rect(
+            left, GUI.PANEL_Y_TOP_LEFT, right - left, GUI.PANEL_HEIGHT
+        )
+
     @staticmethod
     def define_minefield_rect() -> pg.Rect:
         """
@@ -361,8 +691,8 @@ class Graphics:
         return pg.Rect(
             GUI.FIELD_X_TOP_LEFT + GUI.PADDING,
             GUI.FIELD_Y_TOP_LEFT,
-            GAME.COLS * GUI.CELL_SIZE,
-            GAME.ROWS * GUI.CELL_SIZE
+            GUI.VISIBLE_COLS * GUI.CELL_SIZE,
+            GUI.FIELD_HEIGHT
         )
 
     # --- Drawing methods -----------------------------------------------------
@@ -379,22 +709,22 @@ class Graphics:
         Reflecting current state of the face button.
         """
 
-        self.put_sprite_using_anchor(
+        if face_state == self.drawn_face_state:
+            return
+        self.drawn_face_state = face_state
+
+        self.dirty_rects.append(self.put_sprite_using_anchor(
             self.screen, 'face_button_' + face_state.name.lower(), 'center',
             GUI.PANEL_X_CENTER, GUI.PANEL_Y_CENTER
-        )
+        ))
 
     def draw_minefield(self, matrix: ndarray):
         """
-        Reflecting current state of the minefield.
+        Reflecting current state of the visible part of the minefield.
+        (actual drawing of changed cells is performed by self.show())
         """
 
-        for row in range(GAME.ROWS):
-            for col in range(GAME.COLS):
-                self.put_sprite_using_anchor(
-                    self.screen, 'cell_' + CODE_TO_CELL[matrix[row, col]],
-                    'topleft', *self.convert_position((row, col))
-                )
+        self.matrix_to_draw = matrix
 
     def draw_hovered_cell(
             self,
@@ -403,13 +733,14 @@ class Graphics:
     ):
         """
         Reflecting hovered cell on the minefield.
+        (actual drawing of changed cells is performed by self.show())
         """
 
-        hover_sprite_name = 'cell_' + CODE_TO_CELL[code_of_cell] + '_hovered'
-        self.put_sprite_using_anchor(
-            self.screen, hover_sprite_name, 'topleft',
-            *self.convert_position(cell)
-        )
+        cell = self.localize_cell(cell)
+        if cell is not None:
+            hover_sprite_name = \
+                'cell_' + CODE_TO_CELL[code_of_cell] + '_hovered'
+            self.overlays_to_draw[cell] = hover_sprite_name
 
     def draw_pressed_cells(
             self,
@@ -418,27 +749,120 @@ class Graphics:
     ):
         """
         Reflecting pressed cell/cells on the minefield.
+        (actual drawing of changed cells is performed by self.show())
         """
 
         if cells is not None:
+            cells = [
+                cell for cell in map(self.localize_cell, cells)
+                if cell is not None
+            ]
             if action == ACTION.TO_OPEN_PRESS:
                 for cell in cells:
-                    self.put_sprite_using_anchor(
-                        self.screen, 'cell_pressed', 'topleft',
-                        *self.convert_position(cell)
-                    )
+                    self.overlays_to_draw[cell] = 'cell_pressed'
             elif action == ACTION.TO_LABEL_PRESS:
                 for cell in cells:
-                    self.put_sprite_using_anchor(
-                        self.screen, 'cell_marked_pressed', 'topleft',
-                        *self.convert_position(cell)
-                    )
+                    self.overlays_to_draw[cell] = 'cell_marked_pressed'
+
+    def draw_changed_cells(self):
+        """
+        Reflecting only those visible cells of the minefield, which code
+        or overlaid sprite (hovered, pressed) differs from the drawn ones.
+        (cells are in positions inside visible part of the minefield)
+        """
+
+        matrix = self.matrix_to_draw
+        if matrix is None:
+            return
+
+        # Step 1: finding cells to be redrawn
+        if self.drawn_matrix is None:
+            changed = np.ones(matrix.shape, np.bool)
+        else:
+            changed = matrix != self.drawn_matrix
+        rects = list()
+        if GUI.RENDERING == 'framebuffer' and changed.any():
+            # entire minefield is composited at once,
+            # so only overlays are left to be drawn over it
+            rects.append(self.draw_field_pixels(matrix))
+            changed[...] = False
+            for cell in self.overlays_to_draw:
+                changed[cell] = True
+        for cell in self.drawn_overlays.keys() | self.overlays_to_draw.keys():
+            if self.drawn_overlays.get(cell) \
+                    != self.overlays_to_draw.get(cell):
+                changed[cell] = True
+
+        # Step 2: drawing cells themselves and then overlays over them
+        for row, col in np.argwhere(changed):
+            cell = (int(row), int(col))
+            rects.append(self.put_sprite_using_anchor(
+                self.screen, 'cell_' + CODE_TO_CELL[matrix[cell]],
+                'topleft', *self.convert_position(cell)
+            ))
+            if cell in self.overlays_to_draw:
+                self.put_sprite_using_anchor(
+                    self.screen, self.overlays_to_draw[cell],
+                    'topleft', *self.convert_position(cell)
+                )
+
+        # Step 3: too many separate rects are joined into single one
+        max_separate_rects = 64
+        if len(rects) > max_separate_rects:
+            rects = [rects[0].unionall(rects[1:])]
+        self.dirty_rects.extend(rects)
+
+        self.drawn_matrix = matrix.copy()
+        self.drawn_overlays = self.overlays_to_draw
+        self.overlays_to_draw = dict()
+
+    def draw_field_pixels(self, matrix: ndarray) -> pg.Rect:
+        """
+        Compositing image of the visible minefield from the stack of tiles
+        by cell codes and reflecting it on the screen by single blit.
+        Return rect of the minefield.
+        """
+
+        # gathering tiles in order of (columns, rows) for (x, y) pixels
+        np.take(self.tiles, matrix.T, axis=0, out=self.gathered_tiles)
+
+        # placing each tile on its place: (columns, width, rows, height)
+        columns, rows, width, height, _ = self.gathered_tiles.shape
+        np.copyto(
+            self.field_pixels.reshape((columns, width, rows, height, 3)),
+            self.gathered_tiles.transpose((0, 2, 1, 3, 4))
+        )
+
+        pg.surfarray.blit_array(self.field_surface, self.field_pixels)
+        return self.screen.blit(self.field_surface, self.minefield)
+
+    def draw_digits(
+            self,
+            string_score: str,
+            x_positions: list[int]
+    ):
+        """
+        Reflecting digits of the score on the panel.
+        """
+
+        rects = [
+            self.put_sprite_using_anchor(
+                self.screen, 'digit_' + symbol, 'center',
+                x, GUI.PANEL_Y_CENTER
+            )
+            for symbol, x in zip(string_score, x_positions)
+        ]
+        self.dirty_rects.append(rects[0].unionall(rects[1:]))
 
     def draw_bombs_score(self, bombs_score: int):
         """
         Reflecting current bombs score on the panel.
         """
 
+        if bombs_score == self.drawn_bombs_score:
+            return
+        self.drawn_bombs_score = bombs_score
+
         # compiling 3-symbol score number as a string
         if bombs_score >= 0:
             string_score = format(bombs_score % 1000, '0>3')
@@ -446,18 +870,20 @@ class Graphics:
             string_score = '-' + format(abs(bombs_score) % 100, '0>2')
 
         # drawing corresponding digits
-        for index, symbol in enumerate(string_score):
-            self.put_sprite_using_anchor(
-                self.screen, 'digit_' + symbol, 'center',
-                GUI.PANEL_X_TOP_LEFT + (index + 1) * GUI.DIGIT_WIDTH,
-                GUI.PANEL_Y_CENTER
-            )
+        self.draw_digits(string_score, [
+            GUI.PANEL_X_TOP_LEFT + (index + 1) * GUI.DIGIT_WIDTH
+            for index in range(len(string_score))
+        ])
 
     def draw_time_score(self, time_score: int):
         """
         Reflecting current time score on the panel.
         """
 
+        if time_score == self.drawn_time_score:
+            return
+        self.drawn_time_score = time_score
+
         # compiling 3-symbol score number as a string
         if 0 <= time_score <= 999:
             string_score = format(time_score, '0>3')
@@ -465,13 +891,99 @@ class Graphics:
             string_score = '999'
 
         # drawing corresponding digits
-        for index, symbol in enumerate(string_score[::-1]):
-            self.put_sprite_using_anchor(
-                self.screen, 'digit_' + symbol, 'center',
-                GUI.PANEL_X_TOP_LEFT + GUI.PANEL_WIDTH
-                - (index + 1) * GUI.DIGIT_WIDTH,
-                GUI.PANEL_Y_CENTER
-            )
+        self.draw_digits(string_score[::-1], [
+            GUI.PANEL_X_TOP_LEFT + GUI.PANEL_WIDTH
+            - (index + 1) * GUI.DIGIT_WIDTH
+            for index in range(len(string_score))
+        ])
+
+    def draw_hud(self, table: list[list[str]]):
+        """
+        Reflecting table of the profiler overlay on the panel:
+        names in the first column, right-aligned values in the rest.
+        """
+
+        if self.hud_font is None:
+            # the biggest font, which fits all the rows into the panel
+            size = 8
+            while pg.font.Font(None, size + 1).get_linesize() * len(table) \
+                    <= self.hud.height:
+                size += 1
+            self.hud_font = pg.font.Font(None, size)
+
+        self.screen.fill((0, 0, 0), self.hud)
+        self.screen.set_clip(self.hud)
+        column_width = self.hud.width // max(len(table[0]), 1)
+        for index, row in enumerate(table):
+            y = self.hud.top + index * self.hud_font.get_linesize()
+            for column, cell in enumerate(row):
+                text = self.hud_font.render(cell, True, (0, 255, 0))
+                rect = text.get_rect(top = y)
+                if column == 0:
+                    rect.left = self.hud.left + 2
+                else:
+                    rect.right = self.hud.left + (column + 1) * column_width
+                self.screen.blit(text, rect)
+        self.screen.set_clip(None)
+        self.dirty_rects.append(self.hud.copy())
+
+    def clear_hud(self):
+        """
+        Removing the profiler overlay: restoring frame of the panel
+        and redrawing its face button and scores.
+        """
+
+        self.screen.blit(self.frame, self.hud, self.hud)
+        self.drawn_face_state = None
+        self.drawn_bombs_score = None
+        self.drawn_time_score = None
+        self.dirty_rects.append(self.hud.copy())
+
+    # --- Settings methods ----------------------------------------------------
+
+    def reconfigure(self, changed: set[str]):
+        """
+        Rebuilding only what depends on the settings changed while the game
+        runs (names of the changed constants of GAME and GUI):
+        sprites - once theme, night mode or scale is changed,
+        window - once its size is changed, frame - once either of them.
+        Entire screen is redrawn then.
+        """
+
+        if not changed:
+            return
+
+        if changed & SPRITES_SETTINGS:
+            self.load_sprites()
+        if 'RESOLUTION' in changed:
+            self.screen = pg.display.set_mode(GUI.RESOLUTION)
+        if changed & (SPRITES_SETTINGS | LAYOUT_SETTINGS):
+            self.frame = pg.Surface((GUI.SCREEN_WIDTH, GUI.SCREEN_HEIGHT))
+            self.build_frame()
+            self.face_button = self.define_face_button_rect()
+            self.minefield = self.define_minefield_rect()
+            self.hud = self.define_hud_rect()
+            self.hud_font = None
+        if GUI.RENDERING == 'framebuffer' and changed & TILES_SETTINGS:
+            self.make_tile_stack()
+
+        # keeping visible part of the minefield within the new one
+        self.scroll_view(0, 0)
+        self.drag_pixels = (0, 0)
+        self.redraw()
+
+    def redraw(self):
+        """Forgetting what is reflected on the screen, for entire redraw."""
+
+        self.draw_frame()
+        self.drawn_matrix = None
+        self.drawn_overlays = dict()
+        self.overlays_to_draw = dict()
+        self.drawn_face_state = None
+        self.drawn_bombs_score = None
+        self.drawn_time_score = None
+        self.dirty_rects = list()
+        self.full_update = True
 
     # --- Operational methods -------------------------------------------------
 
@@ -479,7 +991,22 @@ class Graphics:
         """Ticking clock."""
         self.time_delta = self.clock.tick(GUI.FPS)
 
-    @staticmethod
-    def show():
-        """Reflecting all the drawings on the display."""
-        pg.display.flip()
+    def show(self):
+        """
+        Reflecting all the drawings on the display.
+        Only dirty rects are updated, except the very first frame.
+        """
+
+        self.draw_changed_cells()
+
+        if self.full_update:
+            pg.display.flip()
+            self.full_update = False
+            self.rects_redrawn = 1
+        elif self.dirty_rects:
+            pg.display.update(self.dirty_rects)
+            self.rects_redrawn = len(self.dirty_rects)
+        else:
+            self.rects_redrawn = 0
+
+        self.dirty_rects = list()
@@ -0,0 +1,290 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+(III) Logic level abstraction.
+Journal of the changes made by actions, for undo and redo of them.
+"""
+
+
+# System imports
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+# External imports
+import numpy as np
+
+# Project imports
+from structures import GAME_STATE
+from logic import Logic
+
+
+# --- Journal Entry -----------------------------------------------------------
+
+# bits of the cell state kept by the journal:
+# lower 4 bits - before the action, upper 4 bits - after it
+OPENED_STATE = 0x1
+FLAGGED_STATE = 0x2
+MARKED_STATE = 0x4
+AFTER_SHIFT = 4
+
+# approximate memory of the entry besides its cells, bytes
+ENTRY_BYTES = 512
+
+
+@dataclass
+class Scalars:
+    """State of the game besides the cells, captured before/after action."""
+
+    game_state: GAME_STATE
+    counters: tuple[int, int, int]  # opened, flagged and marked cells
+    timer: tuple[Optional[float], Optional[float]]  # started, score
+    rng_state: dict  # state of the random generator
+
+    @classmethod
+    def capture(cls, logic: Logic) -> 'Scalars':
+        """Capturing current state of the game logic."""
+        return cls(
+            logic.game_state,
+            (logic.opened_count, logic.flagged_count, logic.marked_count),
+            (logic.time_started, logic.time_score),
+            logic.rng.bit_generator.state
+        )
+
+    def restore(self, logic: Logic):
+        """Restoring captured state into the game logic."""
+        logic.game_state = self.game_state
+        logic.opened_count, logic.flagged_count, logic.marked_count = \
+            self.counters
+        logic.time_started, logic.time_score = self.timer
+        logic.rng.bit_generator.state = self.rng_state
+
+
+@dataclass
+class Entry:
+    """
+    Changes made by the single action: flat positions of the changed cells
+    with their states before and after, and the rest of the game state.
+    """
+
+    before: Scalars
+    after: Optional[Scalars] = None
+    positions: np.ndarray = field(
+        default_factory=lambda: np.empty(0, np.int64)
+    )
+    states: np.ndarray = field(
+        default_factory=lambda: np.empty(0, np.uint8)
+    )
+
+    @property
+    def nbytes(self) -> int:
+        return ENTRY_BYTES + self.positions.nbytes + self.states.nbytes
+
+
+# --- Journal -----------------------------------------------------------------
+
+class Journal:
+    """
+    Journal of the actions performed by the game logic, which keeps
+    only the cells changed by each action - so undo and redo take time
+    in proportion to the change, not to the size of the minefield.
+    Game logic passes the cells to the journal right before changing them,
+    while the states after are taken once the action is over.
+    Memory of the journal is limited: the oldest entries are dropped first.
+    """
+
+    def __init__(self, max_bytes: int = 64 << 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0  # memory of both done and undone entries
+
+        self.done: deque[Entry] = deque()
+        self.undone: list[Entry] = list()
+
+        # entry of the current action: its cells kept so far
+        # (single cells by positions and arrays of flat positions)
+        # with their states before the action
+        self.entry: Optional[Entry] = None
+        self.cells: list[tuple[int, int]] = list()
+        self.cell_states: list[int] = list()
+        self.flat_cells: list[np.ndarray] = list()
+        self.flat_states: list[np.ndarray] = list()
+
+    def attach(self, logic: Logic):
+        """
+        Starting journal of the actions performed by the game logic
+        of the bounded minefield (practice mode of the endless one
+        is rejected by config validation).
+        """
+
+        logic.journal = self
+        self.clear()
+
+    def clear(self):
+        """Dropping all the entries (i.e. on the new game)."""
+
+        self.done.clear()
+        self.undone.clear()
+        self.nbytes = 0
+        self.entry = None
+        self.drop_cells()
+
+    def drop_cells(self):
+        """Dropping cells kept for the entry of the current action."""
+        self.cells.clear()
+        self.cell_states.clear()
+        self.flat_cells.clear()
+        self.flat_states.clear()
+
+    # --- Recording methods ---------------------------------------------------
+
+    @staticmethod
+    def read_states(logic: Logic, flat: np.ndarray) -> np.ndarray:
+        """Reading states of the cells by their flat positions."""
+
+        return logic.opened.take(flat).astype(np.uint8) * OPENED_STATE \
+            | logic.flagged.take(flat).astype(np.uint8) * FLAGGED_STATE \
+            | logic.marked.take(flat).astype(np.uint8) * MARKED_STATE
+
+    @staticmethod
+    def write_states(logic: Logic, flat: np.ndarray, states: np.ndarray):
+        """Writing states of the cells by their flat positions."""
+
+        logic.opened.put(flat, states & OPENED_STATE != 0)
+        logic.flagged.put(flat, states & FLAGGED_STATE != 0)
+        logic.marked.put(flat, states & MARKED_STATE != 0)
+
+    def begin(self, logic: Logic):
+        """Opening entry of the action to be performed."""
+
+        self.commit(logic)
+        self.nbytes -= sum(entry.nbytes for entry in self.undone)
+        self.undone.clear()
+        self.entry = Entry(Scalars.capture(logic))
+
+    def keep_cell(self, logic: Logic, position: tuple[int, int]):
+        """Keeping state of the single cell right before its change."""
+
+        if self.entry is None:
+            return
+        self.cells.append(position)
+        self.cell_states.append(
+            OPENED_STATE * bool(logic.opened[position])
+            | FLAGGED_STATE * bool(logic.flagged[position])
+            | MARKED_STATE * bool(logic.marked[position])
+        )
+
+    def keep_cells(self, logic: Logic, flat: np.ndarray):
+        """Keeping states of the cells (flat positions) before their change."""
+
+        if self.entry is None or flat.size == 0:
+            return
+        self.flush_cells(logic)
+        flat = np.asarray(flat, np.int64)
+        self.flat_cells.append(flat)
+        self.flat_states.append(self.read_states(logic, flat))
+
+    def flush_cells(self, logic: Logic):
+        """Converting kept single cells into flat positions, in order."""
+
+        if self.cells:
+            rows, cols = zip(*self.cells)
+            self.flat_cells.append(np.ravel_multi_index(
+                (rows, cols), (logic.rows, logic.cols)
+            ))
+            self.flat_states.append(np.array(self.cell_states, np.uint8))
+            self.cells.clear()
+            self.cell_states.clear()
+
+    def commit(self, logic: Logic):
+        """
+        Closing entry of the performed action: collecting its changed cells
+        with their states after the action. Entry without changes is dropped.
+        """
+
+        entry, self.entry = self.entry, None
+        if entry is None:
+            return
+
+        self.flush_cells(logic)
+        if self.flat_cells:
+            # the first kept state of the cell is the one before the action
+            flat, first = np.unique(
+                np.concatenate(self.flat_cells), return_index=True
+            )
+            states = np.concatenate(self.flat_states)[first]
+            states |= self.read_states(logic, flat) << AFTER_SHIFT
+            changed = (states & 0x0F) != (states >> AFTER_SHIFT)
+            entry.positions, entry.states = flat[changed], states[changed]
+        self.drop_cells()
+
+        entry.after = Scalars.capture(logic)
+        if entry.positions.size == 0 \
+                and entry.after.game_state == entry.before.game_state \
+                and entry.after.counters == entry.before.counters:
+            return
+
+        self.done.append(entry)
+        self.nbytes += entry.nbytes
+        while self.nbytes > self.max_bytes and self.done:
+            self.nbytes -= self.done.popleft().nbytes
+
+    # --- Undo and Redo methods -----------------------------------------------
+
+    def can_undo(self) -> bool:
+        """Checking if there is action to undo."""
+        return self.entry is not None or bool(self.done)
+
+    def can_redo(self) -> bool:
+        """Checking if there is undone action to redo."""
+        return self.entry is None and bool(self.undone)
+
+    def undo(self, logic: Logic) -> bool:
+        """
+        Reverting the last performed action.
+        Return True in case there was action to undo - False otherwise.
+        """
+
+        self.commit(logic)
+        if not self.done:
+            return False
+        entry = self.done.pop()
+
+        self.write_states(logic, entry.positions, entry.states & 0x0F)
+        entry.before.restore(logic)
+        self.refresh(logic)
+
+        self.undone.append(entry)
+        return True
+
+    def redo(self, logic: Logic) -> bool:
+        """
+        Performing again the last undone action.
+        Return True in case there was action to redo - False otherwise.
+        """
+
+        if self.entry is not None or not self.undone:
+            return False
+        entry = self.undone.pop()
+
+        self.write_states(logic, entry.positions, entry.states >> AFTER_SHIFT)
+        entry.after.restore(logic)
+        self.refresh(logic)
+
+        self.done.append(entry)
+        return True
+
+    @staticmethod
+    def refresh(logic: Logic):
+        """Resetting cached state of the game logic after the change."""
+
+        logic.click_position = None
+        logic.cell_to_hover = None
+        logic.cells_to_press = None
+        logic.matrix_outdated = True
+        if logic.debug:
+            logic.check_counters()
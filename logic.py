@@ -20,6 +20,11 @@ import numpy as np
 
 # Project imports
 from structures import START_RULE, ACTION, GAME_STATE, CELL_TO_CODE
+from storage import (
+    BitPlane, NibblePlane, BitView, NearbyView, unpack_layers,
+    write_snapshot, read_snapshot, map_snapshot,
+    NEARBY_BITS, OPENED_BIT, FLAGGED_BIT, MARKED_BIT, MINED_BIT
+)
 
 
 # --- Logic -------------------------------------------------------------------
@@ -27,6 +32,9 @@ from structures import START_RULE, ACTION, GAME_STATE, CELL_TO_CODE
 class Logic:
     """All the Minesweeper game logic is here."""
 
+    # name of the way of storing the minefield (see STORAGES)
+    STORAGE = 'layers'
+
     def __init__(self, game):
         # retrieving provided game parameters
         self.cols = game.COLS
@@ -34,6 +42,68 @@ class Logic:
         self.bombs = game.BOMBS
         self.start_rule = game.START_RULE
         self.marks_present = game.MARKS_PRESENT
+        self.debug = game.DEBUG
+
+        # own random generator of the game, reproducible by the seed
+        # (which is drawn once it is not provided, for recording of games)
+        self.seed = np.random.SeedSequence(game.SEED).entropy
+        self.rng = np.random.default_rng(self.seed)
+
+        # recorder of the performed actions (see replay.py)
+        # with the state of random generator at the start of the game
+        self.recorder = None
+        self.rng_state: Optional[dict] = None
+
+        # journal of the changes made by actions, for undo (see journal.py)
+        self.journal = None
+
+        # matrix layers of the minefield
+        self.mined = None
+        self.opened = None
+        self.flagged = None
+        self.marked = None
+        self.nearby = None
+        self.create_matrices()
+
+        # index of connected regions of empty cells (no bombs nearby):
+        # region label of each empty cell (-1 for the rest of cells),
+        # and flat positions of region's cells together with its boundary,
+        # grouped by region labels in sorted order
+        self.regions: Optional[np.ndarray] = None
+        self.region_labels: Optional[np.ndarray] = None
+        self.region_members: Optional[np.ndarray] = None
+        self.regions_outdated = True
+
+        # cached export of the minefield matrix for drawing,
+        # rebuilt once any action changes state of the game,
+        # together with its window: top, left, rows, cols
+        self.matrix: Optional[np.ndarray] = None
+        self.matrix_outdated = True
+        self.window: Optional[tuple[int, int, int, int]] = None
+
+        # running counters of the opened, flagged and marked cells,
+        # updated by every change of the matrix layers
+        self.opened_count = 0
+        self.flagged_count = 0
+        self.marked_count = 0
+
+        # click position in format: (row, column)
+        self.click_position: Optional[tuple[int, int]] = None
+        self.cell_to_hover: Optional[tuple[int, int]] = None
+        self.cells_to_press: Optional[list[tuple[int, int]]] = None
+
+        # game timer
+        self.time_started = None
+        self.time_score = None
+
+        # creating new game
+        self.game_state = GAME_STATE.NEW
+        self.new_game()
+
+    # --- Initialization methods ----------------------------------------------
+
+    def create_matrices(self):
+        """Allocating all the matrix layers."""
 
         # boolean matrix layer of the present bombs on the minefield
         self.mined = np.empty(
@@ -61,21 +131,6 @@ class Logic:
             dtype = np.uint8
         )
 
-        # click position in format: (row, column)
-        self.click_position: Optional[tuple[int, int]] = None
-        self.cell_to_hover: Optional[tuple[int, int]] = None
-        self.cells_to_press: Optional[list[tuple[int, int]]] = None
-
-        # game timer
-        self.time_started = None
-        self.time_score = None
-
-        # creating new game
-        self.game_state = GAME_STATE.NEW
-        self.new_game()
-
-    # --- Initialization methods ----------------------------------------------
-
     def clear_matrices(self):
         """Erasing all the matrix layers."""
 
@@ -85,6 +140,27 @@ class Logic:
         self.marked = np.zeros_like(self.marked)
         self.nearby = np.zeros_like(self.nearby)
 
+    def storage_matrices(self) -> list[np.ndarray]:
+        """Return arrays of the matrix layers as they are kept in memory."""
+        return [
+            self.mined, self.opened, self.flagged, self.marked, self.nearby
+        ]
+
+    def attach_matrices(self, matrices: list[np.ndarray]):
+        """Using given arrays as the matrix layers (see storage_matrices)."""
+        self.mined, self.opened, self.flagged, self.marked, self.nearby = \
+            matrices
+
+    def map_matrices(self, path: str, offset: int) -> list[np.ndarray]:
+        """
+        Mapping arrays of the matrix layers from the snapshot
+        by the layout of the ones allocated by the storage.
+        """
+        return map_snapshot(path, offset, [
+            (matrix.dtype, matrix.shape)
+            for matrix in self.storage_matrices()
+        ])
+
     def reset_state(self):
         """Resetting state of the game to the initial."""
 
@@ -94,14 +170,64 @@ class Logic:
         self.time_started = None
         self.time_score = None
         self.game_state = GAME_STATE.NEW
+        self.matrix_outdated = True
+        self.opened_count = 0
+        self.flagged_count = 0
+        self.marked_count = 0
+
+        self.rng_state = self.rng.bit_generator.state
+        if self.recorder is not None:
+            self.recorder.start_game(self)
+        if self.journal is not None:
+            self.journal.clear()
+
+    def generate_bombs(self, safe_cells: Optional[list] = None):
+        """
+        Filling up minefield by predefine number of bombs,
+        except safe cells (positions in format: (row, column)).
+        """
+
+        mined = np.zeros(self.rows * self.cols, np.bool)
+        mined[self.sample_bombs(safe_cells)] = True
+        self.mined = mined.reshape((self.rows, self.cols))
 
-    def generate_bombs(self):
-        """Filling up minefield by predefine number of bombs."""
+    def sample_bombs(self, safe_cells: Optional[list] = None) -> np.ndarray:
+        """
+        Sampling flat positions of bombs without replacement
+        only from the cells allowed to be mined (all except safe cells).
+        """
+
+        safe = self.flat_positions(safe_cells)
+        positions = self.rng.choice(
+            self.rows * self.cols - safe.size, self.bombs,
+            replace=False, shuffle=False
+        )
+        return self.skip_positions(positions, safe)
+
+    def flat_positions(self, cells: Optional[list]) -> np.ndarray:
+        """Converting cells positions into sorted unique flat positions."""
+
+        if not cells:
+            return np.empty(0, np.int64)
+        rows, cols = zip(*cells)
+        return np.unique(
+            np.ravel_multi_index((rows, cols), (self.rows, self.cols))
+        )
+
+    @staticmethod
+    def skip_positions(
+            positions: np.ndarray,
+            skipped: np.ndarray
+    ) -> np.ndarray:
+        """
+        Converting indexes of the cells counted without skipped ones
+        into flat positions (skipped positions are sorted).
+        """
 
-        tmp = np.zeros(self.rows * self.cols, self.mined.dtype)
-        tmp[:self.bombs] = True
-        np.random.shuffle(tmp)
-        self.mined = tmp.reshape((self.rows, self.cols))
+        # number of not skipped cells before each of the skipped cell
+        # defines how many skipped cells are before each of the positions
+        preceding = skipped - np.arange(skipped.size)
+        return positions + np.searchsorted(preceding, positions, side='right')
 
     def calculate_nearby(self):
         """
@@ -110,22 +236,202 @@ class Logic:
         """
 
         # creating temporary matrix with empty borders around mined field
-        m = np.zeros((self.rows + 2, self.cols + 2), self.mined.dtype)
+        m = np.zeros((self.rows + 2, self.cols + 2), np.uint8)
         m[1:self.rows+1, 1:self.cols+1] = self.mined
 
-        # calculating number of nearby bombs, excluding self cell bomb
-        for row in range(self.rows):
-            for col in range(self.cols):
-                self.nearby[row, col] = \
-                    np.sum(m[row:row+3, col:col+3]) - m[row+1, col+1]
+        # calculating number of nearby bombs, excluding self cell bomb:
+        # summing shifted slices at first vertically, then horizontally
+        v = m[:-2, :] + m[1:-1, :] + m[2:, :]
+        np.add(v[:, :-2], v[:, 1:-1], out=self.nearby)
+        self.nearby += v[:, 2:]
+        self.nearby -= self.mined
+
+        self.index_regions()
+
+    def index_regions(self):
+        """
+        Labeling connected regions of empty cells on the minefield
+        and collecting boundary cells around each of them.
+        """
+
+        empty = self.find_empty_cells()
+        positions = np.arange(self.rows * self.cols).reshape(empty.shape)
+
+        # Step 1: pairs of adjacent empty cells
+        # (right, bottom and both bottom diagonals cover all 8 directions)
+        first, second = list(), list()
+        for row_shift, col_shift in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+            a = (
+                slice(0, self.rows - row_shift),
+                slice(max(-col_shift, 0), self.cols - max(col_shift, 0))
+            )
+            b = (
+                slice(row_shift, self.rows),
+                slice(max(col_shift, 0), self.cols + min(col_shift, 0))
+            )
+            both_empty = empty[a] & empty[b]
+            first.append(positions[a][both_empty])
+            second.append(positions[b][both_empty])
+        first = np.concatenate(first)
+        second = np.concatenate(second)
+
+        # Step 2: merging pairs into regions,
+        # where each region is labeled by its smallest flat position
+        labels = positions.ravel().copy()
+        while True:
+            first_labels, second_labels = labels[first], labels[second]
+            differ = first_labels != second_labels
+            if not differ.any():
+                break
+            first, second = first[differ], second[differ]
+            np.minimum.at(
+                labels,
+                np.maximum(first_labels[differ], second_labels[differ]),
+                np.minimum(first_labels[differ], second_labels[differ])
+            )
+            # compressing chains of labels down to the region roots
+            roots = labels[labels]
+            while (roots != labels).any():
+                labels = roots
+                roots = labels[labels]
+        self.regions = np.where(empty, labels.reshape(empty.shape), -1)
+
+        # Step 3: collecting region cells and its boundary cells
+        # as the unique pairs of (label, flat position)
+        padded = np.full((self.rows + 2, self.cols + 2), -1, np.int64)
+        padded[1:self.rows+1, 1:self.cols+1] = self.regions
+        keys = [self.regions[empty] * positions.size + positions[empty]]
+        for row_shift in range(3):
+            for col_shift in range(3):
+                neighbour_labels = padded[
+                    row_shift:row_shift+self.rows,
+                    col_shift:col_shift+self.cols
+                ]
+                boundary = ~empty & (neighbour_labels >= 0)
+                keys.append(
+                    neighbour_labels[boundary] * positions.size
+                    + positions[boundary]
+                )
+        keys = np.sort(np.concatenate(keys))
+        is_unique = np.ones(keys.shape, np.bool)
+        is_unique[1:] = keys[1:] != keys[:-1]
+        keys = keys[is_unique]
+        self.region_labels, self.region_members = \
+            np.divmod(keys, positions.size)
+        self.regions_outdated = False
+
+    def find_empty_cells(self) -> np.ndarray:
+        """Return boolean mask of the cells without bombs nearby."""
+        return (self.nearby == 0) & ~self.mined
 
     def new_game(self):
-        """New game with the same predefined conditions."""
+        """
+        New game with the same predefined conditions.
+        Bombs are placed at once only for the start rule 'as is',
+        otherwise - on the first open click (out of the cells kept safe).
+        """
 
         self.clear_matrices()
         self.reset_state()
-        self.generate_bombs()
-        self.calculate_nearby()
+        if self.start_rule == START_RULE.AS_IS:
+            self.generate_bombs()
+            self.calculate_nearby()
+
+    def save_state(self, path: str):
+        """
+        Saving snapshot of the current game into the file:
+        matrix layers, state of the game, timer and random generator.
+        """
+
+        self.get_time_score()  # updating time of the game in progress
+        rng_state = self.rng.bit_generator.state
+        write_snapshot(path, {
+            'storage': SNAPSHOT_STORAGES.index(self.STORAGE),
+            'rows': self.rows,
+            'cols': self.cols,
+            'bombs': self.bombs,
+            'start_rule': self.start_rule.value,
+            'marks_present': self.marks_present,
+            'game_state': self.game_state.value,
+            'has_time': self.time_score is not None,
+            'time_score': self.time_score or 0.0,
+            'opened_count': self.opened_count,
+            'flagged_count': self.flagged_count,
+            'marked_count': self.marked_count,
+            'seed': self.seed.to_bytes(16, 'little'),
+            'rng_state': rng_state['state']['state'].to_bytes(16, 'little'),
+            'rng_inc': rng_state['state']['inc'].to_bytes(16, 'little'),
+            'rng_has_uint32': rng_state['has_uint32'],
+            'rng_uinteger': rng_state['uinteger'],
+            'has_click': self.click_position is not None,
+            'click_row': (self.click_position or (0, 0))[0],
+            'click_col': (self.click_position or (0, 0))[1]
+        }, self.storage_matrices())
+
+    def load_state(self, path: str):
+        """
+        Restoring the game from its snapshot (saved by the same storage).
+        Matrix layers are mapped from the file instead of reading,
+        so the huge minefield is restored as fast as the small one.
+        """
+
+        fields, offset = read_snapshot(path)
+        storage = SNAPSHOT_STORAGES[fields['storage']] \
+            if fields['storage'] < len(SNAPSHOT_STORAGES) else None
+        if storage != self.STORAGE:
+            raise ValueError(
+                f"Snapshot is saved by the other storage: '{storage}'."
+            )
+
+        # parameters of the game
+        self.rows = fields['rows']
+        self.cols = fields['cols']
+        self.bombs = fields['bombs']
+        self.start_rule = START_RULE(fields['start_rule'])
+        self.marks_present = bool(fields['marks_present'])
+        self.seed = int.from_bytes(fields['seed'], 'little')
+        self.rng.bit_generator.state = {
+            'bit_generator': 'PCG64',
+            'state': {
+                'state': int.from_bytes(fields['rng_state'], 'little'),
+                'inc': int.from_bytes(fields['rng_inc'], 'little')
+            },
+            'has_uint32': fields['rng_has_uint32'],
+            'uinteger': fields['rng_uinteger']
+        }
+
+        # matrix layers - of the same layout as allocated by the storage
+        self.create_matrices()
+        self.attach_matrices(self.map_matrices(path, offset))
+
+        # state of the game (i.e. the detonated cell of the lost game)
+        self.click_position = \
+            (fields['click_row'], fields['click_col']) \
+            if fields['has_click'] else None
+        self.cell_to_hover = None
+        self.cells_to_press = None
+        self.rng_state = self.rng.bit_generator.state
+        self.game_state = GAME_STATE(fields['game_state'])
+        self.opened_count = fields['opened_count']
+        self.flagged_count = fields['flagged_count']
+        self.marked_count = fields['marked_count']
+        self.time_started = self.time_score = None
+        if fields['has_time']:
+            self.time_score = fields['time_score']
+            self.time_started = time() - self.time_score
+        self.regions_outdated = True
+        self.matrix_outdated = True
+        self.window = None
+
+        # restored game is not a new one - so it is not recorded
+        # (its replay could not be started from the generator state),
+        # while actions of the previous game could not be undone on it
+        self.recorder = None
+        if self.journal is not None:
+            self.journal.clear()
+
+        if self.debug:
+            self.check_counters()
 
     # --- Operational methods -------------------------------------------------
 
@@ -251,92 +557,113 @@ class Logic:
     def expand(self, position: tuple[int, int]):
         """Expending area in case opened cell has no bombs nearby."""
 
-        # Step 1: forming list of positions of adjacent empty cells
-        expanding_cells = {position: False}
-        while False in expanding_cells.values():
-            expanding_cells_to_add = dict()
-            for cell_position, was_processed in expanding_cells.items():
-                if not was_processed:
-                    expanding_cells[cell_position] = True
-                    for neighbour in self.find_neighbours(cell_position):
-                        if self.nearby[neighbour] == 0:
-                            if not self.flagged[neighbour]:
-                                expanding_cells_to_add[neighbour] = False
-            for empty_neighbour in expanding_cells_to_add:
-                if expanding_cells.get(empty_neighbour) is None:
-                    expanding_cells[empty_neighbour] = False
-
-        # Step 2: opening all the neighbour cells to the list from Step 1
-        for empty_cell in expanding_cells:
-            if not self.flagged[empty_cell]:
-                self.to_open_cell(empty_cell)
-            self.to_open_neighbours(empty_cell, False, False)
+        if self.regions_outdated:
+            self.index_regions()
+
+        # Step 1: looking up region of the empty cell with its boundary
+        label = self.regions[position]
+        start, end = np.searchsorted(self.region_labels, [label, label + 1])
+        members = self.region_members[start:end]
+        rows, cols = np.divmod(members, self.cols)
+
+        # Step 2: in case of flags inside region - it is split by them,
+        # so only reachable part of region is going to be expanded
+        is_inner = self.regions[rows, cols] == label
+        if self.flagged[rows[is_inner], cols[is_inner]].any():
+            rows, cols = self.reachable_part_of_region(position, label)
+
+        # Step 3: opening all non-flagged cells at once
+        to_open = ~self.flagged[rows, cols]
+        rows, cols = rows[to_open], cols[to_open]
+        if self.journal is not None:
+            self.journal.keep_cells(self, rows * self.cols + cols)
+        self.opened_count += int(np.count_nonzero(~self.opened[rows, cols]))
+        self.marked_count -= int(np.count_nonzero(self.marked[rows, cols]))
+        self.opened[rows, cols] = True
+        self.marked[rows, cols] = False
+
+    def reachable_part_of_region(
+            self,
+            position: tuple[int, int],
+            label: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Collecting positions of region's non-flagged empty cells
+        reachable from position, together with their neighbours.
+        """
+
+        reached = {position}
+        cells_to_process = [position]
+        while cells_to_process:
+            cell = cells_to_process.pop()
+            for neighbour in self.find_neighbours(cell):
+                if neighbour not in reached:
+                    reached.add(neighbour)
+                    if self.regions[neighbour] == label \
+                            and not self.flagged[neighbour]:
+                        cells_to_process.append(neighbour)
+
+        rows, cols = zip(*reached)
+        return np.array(rows), np.array(cols)
 
     def to_open_cell(self, position: tuple[int, int]):
         """Opening cell."""
-        self.opened[position] = True
-        self.marked[position] = False
+        if self.journal is not None:
+            self.journal.keep_cell(self, position)
+        if not self.opened[position]:
+            self.opened_count += 1
+            self.opened[position] = True
+        self.unmark_cell(position)
 
     def to_flag_cell(self, position: tuple[int, int]):
         """Flagging cell (even if there is mark)."""
-        self.flagged[position] = True
-        self.marked[position] = False
+        if self.journal is not None:
+            self.journal.keep_cell(self, position)
+        if not self.flagged[position]:
+            self.flagged_count += 1
+            self.flagged[position] = True
+        self.unmark_cell(position)
+
+    def unmark_cell(self, position: tuple[int, int]):
+        """Removing mark from cell."""
+        if self.marked[position]:
+            self.marked_count -= 1
+            self.marked[position] = False
 
     def to_label_cell(self, position: tuple[int, int]):
         """Labeling cell by mark or flag."""
+        if self.journal is not None:
+            self.journal.keep_cell(self, position)
         if self.marks_present:
             if not self.flagged[position] and not self.marked[position]:
                 self.flagged[position] = True
+                self.flagged_count += 1
             elif self.flagged[position]:
                 self.flagged[position] = False
+                self.flagged_count -= 1
                 self.marked[position] = True
+                self.marked_count += 1
             elif self.marked[position]:
-                self.marked[position] = False
+                self.unmark_cell(position)
         else:
             self.flagged[position] = not self.flagged[position]
+            self.flagged_count += 1 if self.flagged[position] else -1
 
     # --- Game Start Rule methods ---------------------------------------------
 
-    def _start_rule_no_bomb(self):
-        """Once bomb appear under first click position - it moved elsewhere."""
+    def _start_rule_no_bomb(self) -> list[tuple[int, int]]:
+        """Cells kept free of bombs: only under first click position."""
+        return [self.click_position]
 
-        if self.mined[self.click_position]:
-            while self.mined[(
-                    new_bomb_position := (
-                            np.random.randint(self.rows),
-                            np.random.randint(self.cols)
-                    )
-            )]:
-                pass
-            self.mined[new_bomb_position] = True
-            self.mined[self.click_position] = False
-            self.calculate_nearby()
-
-    def _start_rule_empty_cell(self):
-        """Under first click position - entire 3*3 area cleared from bombs."""
-
-        while self.nearby[self.click_position] != 0 \
-                or self.mined[self.click_position]:
-            covering_area = \
-                self.find_neighbours(self.click_position) + \
-                [self.click_position]
-            for cell in covering_area:
-                if self.mined[cell]:
-                    while self.mined[(
-                            new_bomb_position := (
-                                    np.random.randint(self.rows),
-                                    np.random.randint(self.cols)
-                            )
-                    )]:
-                        pass
-                    self.mined[new_bomb_position] = True
-                    self.mined[cell] = False
-                    self.calculate_nearby()
+    def _start_rule_empty_cell(self) -> list[tuple[int, int]]:
+        """Cells kept free of bombs: entire 3*3 area under first click."""
+        return \
+            self.find_neighbours(self.click_position) + [self.click_position]
 
     def _before_first_action_to_open(self) -> bool:
         """
-        Rearranging bombs under position of the first open click
-        according to current start rule.
+        Placing bombs on the minefield on the first open click
+        out of the cells kept safe according to current start rule.
         Return True in case of successful performing - False otherwise.
         """
 
@@ -344,22 +671,22 @@ class Logic:
             return False
 
         if self.start_rule == START_RULE.AS_IS:
-            pass
+            return True  # bombs are placed already by new game
 
         elif self.start_rule == START_RULE.NO_BOMB:
-            self._start_rule_no_bomb()
+            safe_cells = self._start_rule_no_bomb()
 
         else:  # self.start_rule == START_RULE.EMPTY_CELL
-            number_of_cells_to_cover = \
-                len(self.find_neighbours(self.click_position)) + 1
+            safe_cells = self._start_rule_empty_cell()
 
-            if self.bombs < (self.rows * self.cols) - number_of_cells_to_cover:
-                self._start_rule_empty_cell()
-            else:
+            if self.bombs > (self.rows * self.cols) - len(safe_cells):
                 # Too many bombs on the minefield
                 # to meet the start rule of empty_cell,
                 # so the start rule of no_bomb will be applied instead
-                self._start_rule_no_bomb()
+                safe_cells = self._start_rule_no_bomb()
+
+        self.generate_bombs(safe_cells)
+        self.calculate_nearby()
 
         return True
 
@@ -413,9 +740,15 @@ class Logic:
         Method to call appropriate action by corresponding click.
         """
 
+        if self.recorder is not None:
+            self.recorder.record(action, click_position)
+        if self.journal is not None:
+            self.journal.begin(self)
+
         self.click_position = click_position
         self.cell_to_hover = None
         self.cells_to_press = None
+        self.matrix_outdated = True
 
         if action == ACTION.TO_OPEN:
             if self.game_state == GAME_STATE.NEW:
@@ -428,6 +761,9 @@ class Logic:
         elif action == ACTION.TO_REVEAL:
             self.action_to_reveal()
 
+        if self.debug:
+            self.check_counters()
+
     # --- Checking game state methods -----------------------------------------
 
     def start_game_time(self):
@@ -447,26 +783,58 @@ class Logic:
         # as soon as closed cells are the correct ones.
         # Otherwise player can't leave opened number of cells
         # by number of bombs without detonating.
-        if self.rows * self.cols - np.sum(self.opened) == self.bombs:
+        if self.rows * self.cols - self.opened_count == self.bombs:
+            if self.journal is not None \
+                    and self.game_state != GAME_STATE.WON:
+                self.journal.keep_cells(
+                    self, np.flatnonzero(self.mined | self.marked)
+                )
             self.game_state = GAME_STATE.WON
+            self.matrix_outdated = True
 
             # game win postprocedure:
             # marking all the remaining closed cells by flags
-            for row in range(self.rows):
-                for col in range(self.cols):
-                    if self.mined[row, col]:
-                        self.flagged[row, col] = True
-                    self.marked[row, col] = False
+            self.flagged |= self.mined
+            self.marked.fill(False)
+            self.count_won_cells()
 
             return True
         else:
             return False
 
+    def count_won_cells(self):
+        """
+        Counting cells after the win postprocedure:
+        all the remaining closed cells are the mined and flagged ones.
+        """
+
+        self.flagged_count = self.bombs
+        self.marked_count = 0
+        if self.debug:
+            self.check_counters()
+
+    def check_counters(self):
+        """
+        Checking running counters of the cells by counting them
+        throughout the matrix layers (in debug mode only - it is slow).
+        """
+
+        counted = tuple(
+            int(np.count_nonzero(np.asarray(layer)))
+            for layer in [self.opened, self.flagged, self.marked]
+        )
+        counters = (self.opened_count, self.flagged_count, self.marked_count)
+        if counted != counters:
+            raise RuntimeError(
+                f"Counters of opened, flagged and marked cells {counters} "
+                f"differ from the matrix layers {counted}."
+            )
+
     # --- Export methods ------------------------------------------------------
 
     def get_bombs_score(self) -> int:
         """Counting number of left bombs to flag on the minefield."""
-        return int(self.bombs - np.sum(self.flagged))
+        return self.bombs - self.flagged_count
 
     def get_time_score(self) -> int:
         """Proving time score of the current game."""
@@ -478,6 +846,16 @@ class Logic:
                 self.time_score = time() - self.time_started
             return int(self.time_score)
 
+    def get_time_to_next_score(self) -> Optional[float]:
+        """
+        Providing time in seconds till the time score changes
+        (None in case time score is not running).
+        """
+
+        if self.game_state != GAME_STATE.GO or self.time_started is None:
+            return None
+        return 1 - (time() - self.time_started) % 1
+
     def get_hovered_cell(self) -> Optional[tuple[int, int]]:
         """
         Return hovered cell at the moment
@@ -497,44 +875,620 @@ class Logic:
         Providing code of the cell at position on minefield.
         """
 
-        if self.opened[position]:
-            code_of_cell = self.nearby[position]
-        else:
-            code_of_cell = CELL_TO_CODE['closed']
-            # if self.mined[position]:  # for debug only
-            #     code_of_cell = CELL_TO_CODE['mined']
-            if self.game_state != GAME_STATE.LOST:
-                if self.marked[position]:
-                    code_of_cell = CELL_TO_CODE['marked']
-                if self.flagged[position]:
-                    code_of_cell = CELL_TO_CODE['flagged']
-            else:
-                if self.mined[position]:
-                    if self.flagged[position]:
-                        code_of_cell = CELL_TO_CODE['flagged']
-                    else:
-                        code_of_cell = CELL_TO_CODE['mined']
-                else:
-                    if self.marked[position]:
-                        code_of_cell = CELL_TO_CODE['marked']
-                    if self.flagged[position]:
-                        code_of_cell = CELL_TO_CODE['not_mined']
+        if not self.matrix_outdated and self.window is not None:
+            top, left, rows, cols = self.window
+            row, col = position
+            if top <= row < top + rows and left <= col < left + cols:
+                return self.matrix[row - top, col - left]
+        return self.build_matrix((*position, 1, 1))[0, 0]
 
-                if self.click_position == position:
-                    code_of_cell = CELL_TO_CODE['detonated']
-
-        return code_of_cell
-        
-    def get_matrix(self) -> np.ndarray:
+    def get_matrix(
+            self,
+            top: int = 0,
+            left: int = 0,
+            rows: Optional[int] = None,
+            cols: Optional[int] = None
+    ) -> np.ndarray:
         """
         Exporting minefield matrix with the definitions from CODE_TO_CELL.
         (suitable for drawing current state using separate graphics module)
+        Only window from position (top, left) by rows * cols cells
+        is exported (by default - the entire minefield).
+        """
+
+        rows = self.rows if rows is None else rows
+        cols = self.cols if cols is None else cols
+        window = (top, left, rows, cols)
+
+        if self.matrix_outdated or window != self.window:
+            self.matrix = self.build_matrix(window)
+            self.matrix_outdated = False
+            self.window = window
+        return self.matrix
+
+    def build_matrix(self, window: tuple[int, int, int, int]) -> np.ndarray:
+        """
+        Composing window of minefield matrix of cell codes by boolean masks
+        of the matrix layers, in order of priority of the codes.
+        """
+
+        is_lost = self.game_state == GAME_STATE.LOST
+        matrix = self.compose_matrix(is_lost, window)
+
+        if is_lost and self.click_position is not None:
+            top, left, rows, cols = window
+            row, col = self.click_position
+            if top <= row < top + rows and left <= col < left + cols \
+                    and not self.opened[self.click_position]:
+                matrix[row - top, col - left] = CELL_TO_CODE['detonated']
+
+        return matrix
+
+    def compose_matrix(
+            self,
+            is_lost: bool,
+            window: tuple[int, int, int, int]
+    ) -> np.ndarray:
+        """Composing cell codes throughout the window of minefield."""
+
+        top, left, rows, cols = window
+        area = np.s_[top:top + rows, left:left + cols]
+        return self.select_codes(
+            self.opened[area], self.flagged[area], self.mined[area],
+            self.marked[area], self.nearby[area],
+            is_lost
+        )
+
+    @staticmethod
+    def select_codes(
+            opened: np.ndarray,
+            flagged: np.ndarray,
+            mined: np.ndarray,
+            marked: np.ndarray,
+            nearby: np.ndarray,
+            is_lost: bool
+    ) -> np.ndarray:
+        """Selecting cell codes for the cells of the matrix layers."""
+
+        return np.select(
+            [
+                opened,
+                flagged & (mined | (not is_lost)),
+                flagged,  # in case of lost - flags set wrongly
+                mined & is_lost,
+                marked
+            ],
+            [
+                nearby,
+                np.uint8(CELL_TO_CODE['flagged']),
+                np.uint8(CELL_TO_CODE['not_mined']),
+                np.uint8(CELL_TO_CODE['mined']),
+                np.uint8(CELL_TO_CODE['marked'])
+            ],
+            np.uint8(CELL_TO_CODE['closed'])
+        )
+
+
+# --- Compact Logic -----------------------------------------------------------
+
+class CompactLogic(Logic):
+    """
+    Game logic on top of the compact storage of the matrix layers:
+    bit-packed boolean layers and 4-bit numbers of bombs nearby,
+    i.e. 1 byte per cell instead of 5 (for the huge minefields).
+    """
+
+    STORAGE = 'compact'
+
+    # number of cells processed at once throughout the entire minefield
+    BAND_CELLS = 1 << 20
+
+    def create_matrices(self):
+        """Allocating all the matrix layers in compact form."""
+
+        shape = (self.rows, self.cols)
+        self.mined = BitPlane(shape)
+        self.opened = BitPlane(shape)
+        self.flagged = BitPlane(shape)
+        self.marked = BitPlane(shape)
+        self.nearby = NibblePlane(shape)
+
+    def clear_matrices(self):
+        """Erasing all the matrix layers in place."""
+
+        for layer in [
+            self.mined, self.opened, self.flagged, self.marked, self.nearby
+        ]:
+            layer.fill(0)
+
+    def storage_matrices(self) -> list[np.ndarray]:
+        """Return packed data of the matrix layers."""
+        return [
+            layer.data for layer in [
+                self.mined, self.opened, self.flagged, self.marked,
+                self.nearby
+            ]
+        ]
+
+    def attach_matrices(self, matrices: list[np.ndarray]):
+        """Using given arrays as packed data of the matrix layers."""
+
+        for layer, data in zip([
+            self.mined, self.opened, self.flagged, self.marked, self.nearby
+        ], matrices):
+            layer.data = data
+
+    def bands(self) -> list[tuple[int, int]]:
+        """Splitting minefield into bands of rows: (start, stop) of each."""
+
+        band_rows = max(self.BAND_CELLS // self.cols, 1)
+        return [
+            (start, min(start + band_rows, self.rows))
+            for start in range(0, self.rows, band_rows)
+        ]
+
+    def generate_bombs(self, safe_cells: Optional[list] = None):
+        """
+        Filling up minefield by predefine number of bombs,
+        except safe cells (positions in format: (row, column)).
+        """
+
+        # splitting bombs between the bands of rows at first,
+        # so there is no permutation of the entire minefield
+        bands = self.bands()
+        safe = self.flat_positions(safe_cells)
+        band_safe = [
+            safe[(safe >= start * self.cols) & (safe < stop * self.cols)]
+            - start * self.cols
+            for start, stop in bands
+        ]
+        bombs_per_band = self.rng.multivariate_hypergeometric(
+            [
+                (stop - start) * self.cols - skipped.size
+                for (start, stop), skipped in zip(bands, band_safe)
+            ],
+            self.bombs
+        )
+        self.mined.fill(False)
+        for (start, stop), skipped, bombs in \
+                zip(bands, band_safe, bombs_per_band):
+            positions = self.rng.choice(
+                (stop - start) * self.cols - skipped.size, bombs,
+                replace=False, shuffle=False
+            )
+            self.mined.put(
+                start * self.cols + self.skip_positions(positions, skipped),
+                True
+            )
+
+    def calculate_nearby(self):
         """
+        Calculating throughout the entire minefield
+        number of neighbour bombs for each cell, band by band.
+        """
+
+        for start, stop in self.bands():
+            top, bottom = max(start - 1, 0), min(stop + 1, self.rows)
 
-        matrix = np.zeros((self.rows, self.cols), np.uint8)
+            # temporary band with empty borders around its part of minefield
+            m = np.zeros((stop - start + 2, self.cols + 2), np.uint8)
+            m[top - start + 1:bottom - start + 1, 1:self.cols+1] = \
+                self.mined.read_rows(top, bottom)
 
-        for row in range(self.rows):
-            for col in range(self.cols):
-                matrix[row, col] = self.get_code_of_cell((row, col))
+            v = m[:-2, :] + m[1:-1, :] + m[2:, :]
+            nearby = v[:, :-2] + v[:, 1:-1] + v[:, 2:]
+            nearby -= m[1:-1, 1:-1]
+            self.nearby.write_rows(start, nearby)
 
+    def index_regions(self):
+        """Regions are not indexed - expansion is performed on the fly."""
+        self.regions_outdated = False
+
+    def expand(self, position: tuple[int, int]):
+        """
+        Expending area in case opened cell has no bombs nearby,
+        by breadth-first waves of the opened empty cells.
+        """
+
+        # empty cells are passed through even if opened already,
+        # since their neighbours could be unflagged after that;
+        # visited cells are tracked sparsely, not by plane of entire minefield:
+        # empty cells next to the wave are visited only by it or previous one,
+        # numbered cells (not passed through) are kept by their indices
+        to_visit = np.array([position[0] * self.cols + position[1]])
+        previous = to_visit[:0]
+        numbered = set() if self.nearby.take(to_visit)[0] == 0 \
+            else set(to_visit.tolist())
+        while to_visit.size:
+            rows, cols = np.divmod(to_visit, self.cols)
+            neighbours = list()
+            for row_shift in [-1, 0, 1]:
+                for col_shift in [-1, 0, 1]:
+                    neighbour_rows = rows + row_shift
+                    neighbour_cols = cols + col_shift
+                    inside = (neighbour_rows >= 0) \
+                        & (neighbour_rows < self.rows) \
+                        & (neighbour_cols >= 0) \
+                        & (neighbour_cols < self.cols)
+                    neighbours.append(
+                        neighbour_rows[inside] * self.cols
+                        + neighbour_cols[inside]
+                    )
+            neighbours = np.unique(np.concatenate(neighbours))
+            window = np.sort(np.concatenate([previous, to_visit]))
+            found = window.take(
+                np.searchsorted(window, neighbours), mode='clip'
+            ) == neighbours
+            neighbours = neighbours[~self.flagged.take(neighbours) & ~found]
+            is_empty = self.nearby.take(neighbours) == 0
+            empty, neighbours = neighbours[is_empty], neighbours[~is_empty]
+            neighbours = neighbours[np.fromiter(
+                (cell not in numbered for cell in neighbours.tolist()),
+                bool, count=neighbours.size
+            )]
+            numbered.update(neighbours.tolist())
+            neighbours = np.concatenate([empty, neighbours])
+
+            if self.journal is not None:
+                self.journal.keep_cells(self, neighbours)
+            self.opened_count += \
+                int(np.count_nonzero(~self.opened.take(neighbours)))
+            self.marked_count -= \
+                int(np.count_nonzero(self.marked.take(neighbours)))
+            self.opened.put(neighbours, True)
+            self.marked.put(neighbours, False)
+            previous, to_visit = to_visit, empty
+
+    def check_game_won(self) -> bool:
+        """Checking if the current state of the game is won."""
+
+        if self.rows * self.cols - self.opened_count == self.bombs:
+            if self.journal is not None \
+                    and self.game_state != GAME_STATE.WON:
+                self.journal.keep_cells(
+                    self, np.flatnonzero(self.mined | self.marked)
+                )
+            self.game_state = GAME_STATE.WON
+            self.matrix_outdated = True
+
+            # game win postprocedure:
+            # marking all the remaining closed cells by flags
+            self.flagged.data |= self.mined.data
+            self.marked.fill(False)
+            self.count_won_cells()
+
+            return True
+        else:
+            return False
+
+    def compose_matrix(
+            self,
+            is_lost: bool,
+            window: tuple[int, int, int, int]
+    ) -> np.ndarray:
+        """Composing cell codes of the window of minefield, band by band."""
+
+        top, left, rows, cols = window
+        matrix = np.empty((rows, cols), np.uint8)
+        for start, stop in self.bands():
+            start, stop = max(start, top), min(stop, top + rows)
+            if start >= stop:
+                continue
+            matrix[start - top:stop - top] = self.select_codes(*(
+                layer.read_rows(start, stop)[:, left:left + cols]
+                for layer in [
+                    self.opened, self.flagged, self.mined,
+                    self.marked, self.nearby
+                ]
+            ), is_lost)
         return matrix
+
+
+# --- Packed Logic ------------------------------------------------------------
+
+class PackedLogic(Logic):
+    """
+    Game logic on top of the single matrix of cell states, where each byte
+    packs number of bombs nearby (lower 4 bits) together with
+    opened, flagged, marked and mined bits of the cell (storage.*_BIT).
+    Matrix layers are kept as views of the cell states for compatibility,
+    while the hot paths are performed by bitwise operations on the states.
+    """
+
+    STORAGE = 'packed'
+
+    # transitions of labels on the cell: (flagged, marked) bits before/after
+    LABELS_WITH_MARKS = {
+        0: FLAGGED_BIT,
+        FLAGGED_BIT: MARKED_BIT,
+        MARKED_BIT: 0
+    }
+    LABELS_WITHOUT_MARKS = {
+        0: FLAGGED_BIT,
+        FLAGGED_BIT: 0,
+        MARKED_BIT: FLAGGED_BIT
+    }
+
+    # cell codes for each of 256 cell states: for lost and not lost game
+    codes: dict[bool, np.ndarray] = dict()
+
+    def create_matrices(self):
+        """Allocating matrix of cell states and the views of its layers."""
+
+        self.attach_matrices([np.zeros((self.rows, self.cols), np.uint8)])
+
+    def clear_matrices(self):
+        """Erasing matrix of cell states in place."""
+        self.cells.fill(0)
+
+    def storage_matrices(self) -> list[np.ndarray]:
+        """Return matrix of cell states."""
+        return [self.cells]
+
+    def attach_matrices(self, matrices: list[np.ndarray]):
+        """Using given array as matrix of cell states with its views."""
+
+        self.cells, = matrices
+        self.mined = BitView(self.cells, MINED_BIT)
+        self.opened = BitView(self.cells, OPENED_BIT)
+        self.flagged = BitView(self.cells, FLAGGED_BIT)
+        self.marked = BitView(self.cells, MARKED_BIT)
+        self.nearby = NearbyView(self.cells)
+
+    def generate_bombs(self, safe_cells: Optional[list] = None):
+        """
+        Filling up minefield by predefine number of bombs,
+        except safe cells (positions in format: (row, column)).
+        """
+
+        # the same way as Logic, so the same seed gives the same minefield
+        positions = self.sample_bombs(safe_cells)
+        self.cells &= ~np.uint8(MINED_BIT)
+        self.cells.reshape(-1)[positions] |= np.uint8(MINED_BIT)
+
+    def calculate_nearby(self):
+        """
+        Calculating throughout the entire minefield
+        number of neighbour bombs for each cell.
+        """
+
+        mined = self.cells >> 7
+
+        # creating temporary matrix with empty borders around mined field
+        m = np.zeros((self.rows + 2, self.cols + 2), np.uint8)
+        m[1:self.rows+1, 1:self.cols+1] = mined
+
+        v = m[:-2, :] + m[1:-1, :] + m[2:, :]
+        nearby = v[:, :-2] + v[:, 1:-1] + v[:, 2:]
+        nearby -= mined
+
+        self.cells &= ~np.uint8(NEARBY_BITS)
+        self.cells |= nearby
+
+        self.index_regions()
+
+    def find_empty_cells(self) -> np.ndarray:
+        """Return boolean mask of the cells without bombs nearby."""
+        return self.cells & (NEARBY_BITS | MINED_BIT) == 0
+
+    def neighbourhood(self, position: tuple[int, int]) -> np.ndarray:
+        """Return view of cell states within 3*3 window around position."""
+
+        row, col = position
+        return self.cells[
+            max(row - 1, 0):min(row + 2, self.rows),
+            max(col - 1, 0):min(col + 2, self.cols)
+        ]
+
+    def count_nearby_closes(self, position: tuple[int, int]) -> int:
+        """Return number of closed neighbour cells."""
+
+        closed = np.count_nonzero(
+            self.neighbourhood(position) & OPENED_BIT == 0
+        )
+        return closed - int(self.cells[position] & OPENED_BIT == 0)
+
+    def count_nearby_flags(self, position: tuple[int, int]) -> int:
+        """Return number of set flags on neighbour cells."""
+
+        flags = np.count_nonzero(self.neighbourhood(position) & FLAGGED_BIT)
+        return flags - int(self.cells[position] & FLAGGED_BIT != 0)
+
+    def to_open_neighbours(
+            self,
+            position: tuple[int, int],
+            do_detonation_check = True,
+            do_further_expansion = True
+    ):
+        """
+        Opening the neighbour cells in case if set flags are correct.
+        """
+
+        window = self.neighbourhood(position)
+        row, col = position
+        centre = (min(row, 1), min(col, 1))
+        state = window[centre]
+
+        # Step 1: checking for detonation due to wrong flags
+        # (mined bit shifted to the flagged one)
+        if do_detonation_check:
+            wrong = ((window >> 2) ^ window) & FLAGGED_BIT
+            wrong[centre] = 0
+            if wrong.any():
+                # Game over
+                self.game_state = GAME_STATE.LOST
+                return
+
+        # Step 2: than the actual opening of the neighbours
+        to_open = window & FLAGGED_BIT == 0
+        to_open[centre] = False
+        to_expand = to_open & (window & NEARBY_BITS == 0)
+        if self.journal is not None:
+            window_rows, window_cols = np.nonzero(to_open)
+            self.journal.keep_cells(
+                self,
+                (row - centre[0] + window_rows) * self.cols
+                + col - centre[1] + window_cols
+            )
+        self.count_opening(window[to_open])
+        window[to_open] = \
+            (window[to_open] | OPENED_BIT) & ~np.uint8(MARKED_BIT)
+        window[centre] = state
+
+        if do_further_expansion:
+            for window_row, window_col in np.argwhere(to_expand):
+                self.expand((
+                    row - centre[0] + int(window_row),
+                    col - centre[1] + int(window_col)
+                ))
+
+    def expand(self, position: tuple[int, int]):
+        """Expending area in case opened cell has no bombs nearby."""
+
+        if self.regions_outdated:
+            self.index_regions()
+
+        # Step 1: looking up region of the empty cell with its boundary
+        label = self.regions[position]
+        start, end = np.searchsorted(self.region_labels, [label, label + 1])
+        members = self.region_members[start:end]
+        rows, cols = np.divmod(members, self.cols)
+
+        # Step 2: in case of flags inside region - it is split by them,
+        # so only reachable part of region is going to be expanded
+        is_inner = self.regions[rows, cols] == label
+        if (self.cells[rows[is_inner], cols[is_inner]] & FLAGGED_BIT).any():
+            rows, cols = self.reachable_part_of_region(position, label)
+
+        # Step 3: opening all non-flagged cells at once
+        states = self.cells[rows, cols]
+        to_open = states & FLAGGED_BIT == 0
+        if self.journal is not None:
+            self.journal.keep_cells(
+                self, rows[to_open] * self.cols + cols[to_open]
+            )
+        self.count_opening(states[to_open])
+        self.cells[rows[to_open], cols[to_open]] = \
+            (states[to_open] | OPENED_BIT) & ~np.uint8(MARKED_BIT)
+
+    def count_opening(self, states: np.ndarray):
+        """Updating counters of the cells by states of cells to be opened."""
+
+        self.opened_count += int(np.count_nonzero(states & OPENED_BIT == 0))
+        self.marked_count -= int(np.count_nonzero(states & MARKED_BIT))
+
+    def count_labels(self, old_state: int, new_state: int):
+        """Updating counters of the cells by change of the cell's labels."""
+
+        self.flagged_count += \
+            bool(new_state & FLAGGED_BIT) - bool(old_state & FLAGGED_BIT)
+        self.marked_count += \
+            bool(new_state & MARKED_BIT) - bool(old_state & MARKED_BIT)
+
+    def to_open_cell(self, position: tuple[int, int]):
+        """Opening cell."""
+
+        if self.journal is not None:
+            self.journal.keep_cell(self, position)
+        state = int(self.cells[position])
+        self.opened_count += not state & OPENED_BIT
+        self.count_labels(state, state & ~MARKED_BIT)
+        self.cells[position] = (state | OPENED_BIT) & ~MARKED_BIT
+
+    def to_flag_cell(self, position: tuple[int, int]):
+        """Flagging cell (even if there is mark)."""
+
+        if self.journal is not None:
+            self.journal.keep_cell(self, position)
+        state = int(self.cells[position])
+        new_state = (state | FLAGGED_BIT) & ~MARKED_BIT
+        self.count_labels(state, new_state)
+        self.cells[position] = new_state
+
+    def to_label_cell(self, position: tuple[int, int]):
+        """Labeling cell by mark or flag."""
+
+        if self.journal is not None:
+            self.journal.keep_cell(self, position)
+        labels = self.LABELS_WITH_MARKS if self.marks_present \
+            else self.LABELS_WITHOUT_MARKS
+        state = int(self.cells[position])
+        new_state = (state & ~(FLAGGED_BIT | MARKED_BIT)) \
+            | labels[state & (FLAGGED_BIT | MARKED_BIT)]
+        self.count_labels(state, new_state)
+        self.cells[position] = new_state
+
+    def action_to_open(self):
+        """
+        Action to open cell under click position.
+        """
+
+        state = int(self.cells[self.click_position])
+        if not state & OPENED_BIT:
+            if not state & FLAGGED_BIT:
+                if not state & MINED_BIT:
+                    self.to_open_cell(self.click_position)
+                    if state & NEARBY_BITS == 0:
+                        self.expand(self.click_position)
+                else:
+                    # Game over
+                    self.game_state = GAME_STATE.LOST
+                    return
+        else:
+            self.action_to_reveal()
+
+    def check_game_won(self) -> bool:
+        """Checking if the current state of the game is won."""
+
+        if self.rows * self.cols - self.opened_count == self.bombs:
+            if self.journal is not None \
+                    and self.game_state != GAME_STATE.WON:
+                self.journal.keep_cells(
+                    self, np.flatnonzero(self.mined | self.marked)
+                )
+            self.game_state = GAME_STATE.WON
+            self.matrix_outdated = True
+
+            # game win postprocedure:
+            # marking all the remaining closed cells by flags
+            # (mined bit shifted to the flagged one)
+            self.cells |= (self.cells >> 2) & FLAGGED_BIT
+            self.cells &= ~np.uint8(MARKED_BIT)
+            self.count_won_cells()
+
+            return True
+        else:
+            return False
+
+    def compose_matrix(
+            self,
+            is_lost: bool,
+            window: tuple[int, int, int, int]
+    ) -> np.ndarray:
+        """Composing cell codes by look up of each cell state of the window."""
+
+        if is_lost not in self.codes:
+            mined, opened, flagged, marked, nearby = \
+                unpack_layers(np.arange(256, dtype=np.uint8))
+            self.codes[is_lost] = self.select_codes(
+                opened, flagged, mined, marked, nearby, is_lost
+            )
+        top, left, rows, cols = window
+        return np.take(
+            self.codes[is_lost],
+            self.cells[top:top + rows, left:left + cols]
+        )
+
+
+# --- Other -------------------------------------------------------------------
+
+# game logic by the way of storing matrix layers
+STORAGES = {
+    'layers': Logic,
+    'compact': CompactLogic,
+    'packed': PackedLogic
+}
+
+# ways of storing by the storage byte of the snapshot
+# (including chunks of EndlessLogic of endless.py)
+SNAPSHOT_STORAGES: list[str] = list(STORAGES) + ['endless']
@@ -12,13 +12,19 @@ Main program. Entry point.
 
 
 # Project imports
+from config import GUI
 from demo import Demo
+from profiler import FrameProfiler
 
 
 # --- Main Program ------------------------------------------------------------
 
 def main():
     demo = Demo()
+    if GUI.PROFILER:
+        FrameProfiler(demo, GUI.PROFILER_TRACE).run()
+        return
+
     while demo.loop_handler():
         demo.events_handler()
         demo.actions_handler()
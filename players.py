@@ -0,0 +1,101 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+(III) Logic level abstraction.
+Auto-players, choosing actions for the game engine.
+"""
+
+
+# System imports
+from importlib import import_module
+
+# External imports
+import numpy as np
+
+# Project imports
+from structures import ACTION, GAME_STATE
+from logic import Logic
+from solver import Solver
+
+
+# --- Players -----------------------------------------------------------------
+
+class RandomPlayer:
+    """
+    Player, opening random covered cells until the game is finished.
+    (any other player has to provide the same interface)
+    """
+
+    def __init__(self, rng: np.random.Generator):
+        self.rng = rng
+
+    def choose_action(self, logic: Logic) -> tuple[ACTION, tuple[int, int]]:
+        """Choosing next action and its position for the game."""
+
+        covered = np.flatnonzero(~logic.opened & ~logic.flagged)
+        row, col = divmod(int(self.rng.choice(covered)), logic.cols)
+        return ACTION.TO_OPEN, (row, col)
+
+
+class SolverPlayer:
+    """
+    Player, opening safe cells found by the solver,
+    otherwise guessing one of the least probable to be mined.
+    """
+
+    def __init__(self, rng: np.random.Generator):
+        self.rng = rng
+        self.solver = Solver(max_nodes=200_000)
+        self.safe: list[tuple[int, int]] = list()
+
+    def choose_action(self, logic: Logic) -> tuple[ACTION, tuple[int, int]]:
+        """Choosing next action and its position for the game."""
+
+        if logic.game_state == GAME_STATE.NEW:
+            self.safe = list()
+
+        # reusing safe cells of the previous solution, while they are covered
+        while self.safe:
+            cell = self.safe.pop()
+            if not logic.opened[cell]:
+                return ACTION.TO_OPEN, cell
+
+        solution = self.solver.solve(logic)
+        if solution.safe:
+            self.safe = solution.safe
+            return ACTION.TO_OPEN, self.safe.pop()
+
+        probabilities = np.where(
+            logic.opened | logic.flagged, np.inf, solution.probabilities
+        ).ravel()
+        candidates = np.flatnonzero(probabilities == probabilities.min())
+        row, col = divmod(int(self.rng.choice(candidates)), logic.cols)
+        return ACTION.TO_OPEN, (row, col)
+
+
+# --- Other -------------------------------------------------------------------
+
+PLAYERS = {
+    'random': RandomPlayer,
+    'solver': SolverPlayer
+}
+
+
+def find_player(name: str):
+    """
+    Finding player class by its name from PLAYERS,
+    or by the path in format of 'module:Class' for custom players.
+    """
+
+    if name in PLAYERS:
+        return PLAYERS[name]
+    if ':' not in name:
+        raise ValueError(f"Unknown player: {name}")
+
+    module_name, class_name = name.split(':', 1)
+    return getattr(import_module(module_name), class_name)
@@ -0,0 +1,151 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+(III) Logic level abstraction.
+Pool of new boards generated in advance in background.
+"""
+
+
+# System imports
+from threading import Thread, Event
+from queue import Queue, Empty, Full
+from time import perf_counter
+from typing import Optional
+
+# External imports
+import numpy as np
+
+# Project imports
+from structures import PRESETS, GameParameters
+from logic import Logic, STORAGES
+from endless import EndlessLogic
+
+
+# --- Board Pool --------------------------------------------------------------
+
+# number of boards generated in advance for the predefined levels
+POOL_SIZES = {
+    'beginner': 8,
+    'intermediate': 8,
+    'expert': 4
+}
+
+# number of cells of all the boards in the pool for the custom minefields
+POOL_CELLS = 1 << 20
+
+# maximum number of boards in the pool for the custom minefields
+POOL_MAX_SIZE = 4
+
+
+def pool_size(game) -> int:
+    """Defining number of boards in the pool according to the minefield."""
+
+    for name, (rows, cols, bombs) in PRESETS.items():
+        if (game.ROWS, game.COLS, game.BOMBS) == (rows, cols, bombs):
+            return POOL_SIZES[name]
+    return min(max(POOL_CELLS // (game.ROWS * game.COLS), 1), POOL_MAX_SIZE)
+
+
+class BoardPool:
+    """
+    New boards (game logic with new game started) generated in advance
+    by background thread, so new game just takes ready one.
+    Boards are seeded one by one from the seed sequence of the game,
+    so sequence of boards is reproducible regardless of the pool.
+    """
+
+    def __init__(self, game, size: Optional[int] = None):
+        # parameters are copied, so the pool is not affected
+        # by the settings changed while the game runs
+        self.game = GameParameters(
+            game.ROWS, game.COLS, game.BOMBS,
+            game.START_RULE, game.MARKS_PRESENT,
+            SEED = game.SEED,
+            STORAGE = getattr(game, 'STORAGE', 'layers'),
+            DEBUG = getattr(game, 'DEBUG', False)
+        )
+        self.size = pool_size(game) if size is None else size
+        self.logic_class = EndlessLogic if self.game.STORAGE == 'endless' \
+            else STORAGES[self.game.STORAGE]
+        self.seeds = np.random.SeedSequence(game.SEED)
+
+        self.boards: Queue[Logic] = Queue(maxsize=max(self.size, 1))
+        self.next_board = 0  # index of the next board to be taken
+
+        # counters of taken boards: ready ones (hits) and awaited ones (misses)
+        self.hits = 0
+        self.misses = 0
+        self.wait_ms = 0.0
+
+        self.stopped = Event()
+        self.thread: Optional[Thread] = None
+        if self.size > 0:
+            self.thread = Thread(target=self.generate_boards, daemon=True)
+            self.thread.start()
+
+    def make_board(self, index: int) -> Logic:
+        """Generating board by its index in the seed sequence."""
+
+        seed = np.random.SeedSequence(self.seeds.entropy, spawn_key=(index,))
+        return self.logic_class(GameParameters(
+            self.game.ROWS, self.game.COLS, self.game.BOMBS,
+            self.game.START_RULE, self.game.MARKS_PRESENT,
+            SEED = int(seed.generate_state(1)[0]),
+            STORAGE = self.game.STORAGE,
+            DEBUG = self.game.DEBUG
+        ))
+
+    def generate_boards(self):
+        """Filling up the pool by boards in order of the seed sequence."""
+
+        index = 0
+        while not self.stopped.is_set():
+            board = self.make_board(index)
+            while not self.stopped.is_set():
+                try:
+                    self.boards.put(board, timeout=0.1)
+                    break
+                except Full:
+                    pass
+            index += 1
+
+    def take(self) -> Logic:
+        """Taking the next board - ready one or waiting for it."""
+
+        started = perf_counter()
+        if self.thread is None:
+            board = self.make_board(self.next_board)
+            self.misses += 1
+        else:
+            try:
+                board = self.boards.get_nowait()
+                self.hits += 1
+            except Empty:
+                board = self.boards.get()
+                self.misses += 1
+        self.wait_ms += (perf_counter() - started) * 1000
+        self.next_board += 1
+        return board
+
+    def stop(self):
+        """Stopping generation of the boards in background."""
+
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def get_stats(self) -> dict:
+        """Return counters of the taken boards."""
+
+        return {
+            'size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'wait_ms': self.wait_ms
+        }
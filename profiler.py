@@ -0,0 +1,253 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+(V) Control level abstraction.
+Profiling of the phases of the main loop with on-screen overlay.
+"""
+
+
+# System imports
+import sys
+from json import dump as json_dump
+from time import perf_counter_ns
+from typing import Callable, Optional
+
+# External imports
+import numpy as np
+import pygame as pg
+
+# Project imports
+from demo import Demo
+
+
+# --- Frame Profiler ----------------------------------------------------------
+
+# phases of the main loop - time of each one is exclusive of nested ones:
+# 'tick' - frame rate limiter, 'wait' - waiting for events (both idle),
+# then the handlers, export of the visible matrix, drawing and the overlay
+PHASES = [
+    'tick', 'wait', 'events', 'actions', 'reactions', 'matrix', 'draw', 'hud'
+]
+IDLE_PHASES = ['tick', 'wait']
+
+# number of the last frames kept for the trace
+TRACE_FRAMES = 1 << 16
+
+# number of the last frames for the rolling percentiles
+WINDOW_FRAMES = 600
+
+PERCENTILES = [50, 95, 99]
+
+# refresh period of the overlay, nanoseconds
+HUD_PERIOD_NS = 250_000_000
+
+# key toggling the overlay
+HUD_KEY = pg.K_F3
+
+
+class FrameProfiler:
+    """
+    Timing of each phase of the main loop by perf_counter_ns
+    with rolling percentiles over the last frames, shown by the overlay
+    on the panel (toggled by F3) and dumped as trace on exit.
+    Demo is instrumented only once profiler is created,
+    so the main loop without profiler runs as is.
+    """
+
+    def __init__(self, demo: Demo, trace_path: Optional[str] = None):
+        self.demo = demo
+        self.trace_path = trace_path
+
+        # time of the phases per frame in nanoseconds: ring of the last frames
+        self.times = np.zeros((TRACE_FRAMES, len(PHASES)), np.int64)
+        self.frames = 0  # number of the profiled frames
+        self.current = [0] * len(PHASES)  # time of the phases of this frame
+        self.nested = list()  # time of the nested phases of running ones
+
+        self.hud_visible = True
+        self.hud_refreshed = 0  # time of the last refresh of the overlay
+
+        # instrumenting nested phases of the handlers
+        self.wrap(demo, 'get_events', 'wait')
+        self.wrap(demo, 'get_view_matrix', 'matrix')
+        get_events = demo.get_events
+        demo.get_events = lambda: self.watch_events(get_events())
+        show = demo.graphics.show
+        demo.graphics.show = lambda: (self.refresh_hud(), show())
+
+    def wrap(self, obj, name: str, phase: str):
+        """Replacing method of the object by the one timed as the phase."""
+
+        method = getattr(obj, name)
+        phase = PHASES.index(phase)
+        setattr(obj, name, lambda *args: self.measure(phase, method, *args))
+
+    def measure(self, phase: int, function: Callable, *args):
+        """Calling function with its time accounted to the phase."""
+
+        started = perf_counter_ns()
+        self.nested.append(0)
+        try:
+            return function(*args)
+        finally:
+            elapsed = perf_counter_ns() - started
+            self.current[phase] += elapsed - self.nested.pop()
+            if self.nested:
+                self.nested[-1] += elapsed
+
+    def commit_frame(self):
+        """Storing time of the phases of the finished frame."""
+
+        self.times[self.frames % TRACE_FRAMES] = self.current
+        self.current = [0] * len(PHASES)
+        self.frames += 1
+
+    # --- Main loop -----------------------------------------------------------
+
+    def run(self):
+        """Running the main loop of the demo with timing of its phases."""
+
+        demo = self.demo
+        measure = self.measure
+        tick, events, actions, reactions, draw = (
+            PHASES.index(phase)
+            for phase in ['tick', 'events', 'actions', 'reactions', 'draw']
+        )
+
+        while measure(tick, demo.loop_handler):
+            measure(events, demo.events_handler)
+            measure(actions, demo.actions_handler)
+            measure(reactions, demo.reactions_handler)
+            measure(draw, demo.graphics_handler)
+            self.commit_frame()
+
+        print(self.format(), file=sys.stderr)
+        if self.trace_path is not None:
+            self.dump(self.trace_path)
+
+    # --- Statistics ----------------------------------------------------------
+
+    def trace(self) -> np.ndarray:
+        """Return time of the phases of the kept frames, oldest first."""
+
+        if self.frames <= TRACE_FRAMES:
+            return self.times[:self.frames]
+        return np.roll(self.times, -(self.frames % TRACE_FRAMES), axis=0)
+
+    def percentiles(self) -> dict[str, list[float]]:
+        """
+        Return percentiles of time of the phases over the last frames
+        in milliseconds, together with the busy time of the whole frame.
+        """
+
+        window = self.trace()[-WINDOW_FRAMES:]
+        if window.size == 0:
+            window = np.zeros((1, len(PHASES)), np.int64)
+        busy = window[:, [
+            index for index, phase in enumerate(PHASES)
+            if phase not in IDLE_PHASES
+        ]].sum(axis=1)
+        values = np.percentile(
+            np.column_stack([window, busy]), PERCENTILES, axis=0
+        ) / 1e6
+        return {
+            phase: values[:, index].tolist()
+            for index, phase in enumerate(PHASES + ['frame'])
+        }
+
+    def pool_stats(self) -> Optional[dict]:
+        """Return counters of the pool of new boards of the demo (if any)."""
+
+        if self.demo.pool is None:
+            return None
+        return self.demo.pool.get_stats()
+
+    def format(self) -> str:
+        """Formatting percentiles as a text table."""
+
+        lines = [
+            f"{'phase, ms':<12}"
+            + ''.join(f"{f'p{p}':>8}" for p in PERCENTILES)
+        ]
+        for phase, values in self.percentiles().items():
+            lines.append(
+                f"{phase:<12}" + ''.join(f"{value:>8.3f}" for value in values)
+            )
+        stats = self.pool_stats()
+        if stats is not None:
+            lines.append(
+                f"pool: {stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['wait_ms']:.3f} ms of waiting"
+            )
+        return '\n'.join(lines)
+
+    def dump(self, path: str):
+        """Writing trace of the frames in JSON or CSV format (by extension)."""
+
+        trace = self.trace()
+        first = self.frames - len(trace)
+        if path.endswith('.json'):
+            with open(path, 'w') as json_file:
+                json_dump({
+                    'phases': PHASES,
+                    'percentiles_ms': self.percentiles(),
+                    'pool': self.pool_stats(),
+                    'first_frame': first,
+                    'frames_ns': trace.tolist()
+                }, json_file)
+        else:
+            with open(path, 'w') as csv_file:
+                csv_file.write(
+                    ','.join(['frame'] + [f'{p}_ns' for p in PHASES]) + '\n'
+                )
+                for index, row in enumerate(trace, first):
+                    csv_file.write(
+                        ','.join(map(str, [index, *row.tolist()])) + '\n'
+                    )
+
+    # --- Overlay -------------------------------------------------------------
+
+    def watch_events(self, events: list) -> list:
+        """Toggling the overlay by its key among the events."""
+
+        for event in events:
+            if event.type == pg.KEYDOWN and event.key == HUD_KEY:
+                self.hud_visible = not self.hud_visible
+                self.hud_refreshed = 0
+                if not self.hud_visible:
+                    self.demo.graphics.clear_hud()
+        return events
+
+    def refresh_hud(self):
+        """Redrawing the overlay with the latest percentiles periodically."""
+
+        if not self.hud_visible:
+            return
+        now = perf_counter_ns()
+        if now - self.hud_refreshed < HUD_PERIOD_NS:
+            return
+        self.hud_refreshed = now
+        self.measure(PHASES.index('hud'), self.draw_hud)
+
+    def draw_hud(self):
+        """
+        Drawing the overlay: percentiles of the busy phases
+        and counters of the pool of new boards.
+        """
+
+        table = [['ms'] + [f'p{p}' for p in PERCENTILES]]
+        for phase, values in self.percentiles().items():
+            if phase not in IDLE_PHASES + ['hud']:
+                table.append([phase] + [f'{value:.2f}' for value in values])
+        stats = self.pool_stats()
+        if stats is not None:
+            table.append([
+                'pool', f"{stats['hits']}h", f"{stats['misses']}m",
+                f"{stats['wait_ms']:.0f}ms"
+            ])
+        self.demo.graphics.draw_hud(table)
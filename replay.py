@@ -0,0 +1,336 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+(V) Control level abstraction.
+Recording of the games into compact binary logs
+and headless replay of them. Entry point.
+"""
+
+
+# System imports
+import sys
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from json import dumps as json_dumps
+from struct import Struct
+from time import perf_counter
+from typing import BinaryIO, Iterator, Optional
+
+# Project imports
+from structures import START_RULE, ACTION, GAME_STATE, GameParameters
+from logic import Logic, STORAGES
+from endless import EndlessLogic
+
+
+# --- Format ------------------------------------------------------------------
+
+# Replay log is a stream of games, each of them is:
+# header - magic, version, storage, parameters of the game, its seed
+# and state of the random generator at the start of the game
+# (PCG64: state, increment, buffered 32 bits flag and value);
+# records - delta-encoded actions: action byte, then variable-length
+# unsigned integers of milliseconds since the previous action
+# and zigzag-encoded shifts of row and column from the previous position.
+
+MAGIC = b'MSRP'
+VERSION = 1
+HEADER = Struct('<4sBBIIIBB16s16s16sBI')
+
+# logic classes by the storage byte of the header
+REPLAY_STORAGES: list[str] = list(STORAGES) + ['endless']
+
+
+def storage_of(logic: Logic) -> str:
+    """Defining name of the storage (logic class) of the game logic."""
+
+    if isinstance(logic, EndlessLogic):
+        return 'endless'
+    for name, logic_class in STORAGES.items():
+        if type(logic) is logic_class:
+            return name
+    return 'layers'
+
+
+def create_logic(storage: str, game: GameParameters) -> Logic:
+    """Creating game logic by name of the storage."""
+
+    if storage == 'endless':
+        return EndlessLogic(game)
+    return STORAGES[storage](game)
+
+
+def encode_varint(value: int, buffer: bytearray):
+    """Appending unsigned integer by 7 bits per byte to the buffer."""
+
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def decode_varint(data: bytes, offset: int) -> tuple[int, int]:
+    """Reading unsigned integer from data. Return value and next offset."""
+
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def zigzag(value: int) -> int:
+    """Mapping signed integer to unsigned: 0, -1, 1, -2, ... to 0, 1, 2, 3."""
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value: int) -> int:
+    """Mapping unsigned integer back to signed one."""
+    return value >> 1 if value & 1 == 0 else -(value >> 1) - 1
+
+
+# --- Recorder ----------------------------------------------------------------
+
+class Recorder:
+    """
+    Recording of the actions performed by the game logic into the stream
+    (file opened in binary mode - buffered, so actions are just appended
+    to the memory buffer, which is written to disk once it is full).
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.buffer = bytearray()
+        self.time_started = 0.0
+        self.previous_ms = 0  # milliseconds since start of the game
+        self.previous_position = (0, 0)
+
+    def attach(self, logic: Logic):
+        """Starting recording of the game logic from its current game."""
+
+        logic.recorder = self
+        self.start_game(logic)
+
+    def start_game(self, logic: Logic):
+        """Writing header of the new game."""
+
+        rng_state = logic.rng_state
+        self.stream.write(HEADER.pack(
+            MAGIC, VERSION,
+            REPLAY_STORAGES.index(storage_of(logic)),
+            logic.rows, logic.cols, logic.bombs,
+            logic.start_rule.value, logic.marks_present,
+            logic.seed.to_bytes(16, 'little'),
+            rng_state['state']['state'].to_bytes(16, 'little'),
+            rng_state['state']['inc'].to_bytes(16, 'little'),
+            rng_state['has_uint32'], rng_state['uinteger']
+        ))
+        self.time_started = perf_counter()
+        self.previous_ms = 0
+        self.previous_position = (0, 0)
+
+    def record(self, action: ACTION, position: tuple[int, int]):
+        """Writing record of the action performed at position."""
+
+        # whole milliseconds since start of the game are encoded
+        # by the difference from the previous ones, so truncation
+        # of the time does not add up over the game
+        milliseconds = int((perf_counter() - self.time_started) * 1000)
+        row, col = position
+        buffer = self.buffer
+        buffer.clear()
+        buffer.append(action.value)
+        encode_varint(milliseconds - self.previous_ms, buffer)
+        encode_varint(zigzag(row - self.previous_position[0]), buffer)
+        encode_varint(zigzag(col - self.previous_position[1]), buffer)
+        self.stream.write(buffer)
+
+        self.previous_ms = milliseconds
+        self.previous_position = (row, col)
+
+    def close(self):
+        """Flushing the recorded games to the stream and closing it."""
+        self.stream.close()
+
+
+# --- Replay ------------------------------------------------------------------
+
+@dataclass
+class RecordedGame:
+    """Game read from the replay log: its parameters and actions."""
+
+    storage: str
+    game: GameParameters
+    rng_state: dict  # state of the random generator at the start of game
+    actions: list[tuple[int, ACTION, tuple[int, int]]]  # ms, action, cell
+
+    def duration(self) -> float:
+        """Return duration of the recorded game in seconds."""
+        return self.actions[-1][0] / 1000 if self.actions else 0.0
+
+
+def read_games(data: bytes) -> Iterator[RecordedGame]:
+    """
+    Reading recorded games one by one from the replay log.
+    The last game cut short (i.e. by the crash before the stream
+    was flushed) is read up to its last complete record.
+    """
+
+    offset = 0
+    while offset < len(data):
+        if len(data) - offset < HEADER.size:
+            return  # header of the last game is cut short
+        magic, version, storage, rows, cols, bombs, start_rule, \
+            marks_present, seed, state, inc, has_uint32, uinteger = \
+            HEADER.unpack_from(data, offset)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unknown format of the replay log at {offset}.")
+        offset += HEADER.size
+
+        game = GameParameters(
+            rows, cols, bombs,
+            START_RULE(start_rule), bool(marks_present),
+            SEED = int.from_bytes(seed, 'little')
+        )
+        rng_state = {
+            'bit_generator': 'PCG64',
+            'state': {
+                'state': int.from_bytes(state, 'little'),
+                'inc': int.from_bytes(inc, 'little')
+            },
+            'has_uint32': has_uint32,
+            'uinteger': uinteger
+        }
+
+        actions = list()
+        milliseconds, row, col = 0, 0, 0
+        is_cut = False
+        while offset < len(data) and data[offset] != MAGIC[0]:
+            action = ACTION(data[offset])
+            try:
+                delay, end = decode_varint(data, offset + 1)
+                row_shift, end = decode_varint(data, end)
+                col_shift, end = decode_varint(data, end)
+            except IndexError:
+                is_cut = True  # the last record is cut short
+                break
+            offset = end
+            milliseconds += delay
+            row += unzigzag(row_shift)
+            col += unzigzag(col_shift)
+            actions.append((milliseconds, action, (row, col)))
+
+        yield RecordedGame(REPLAY_STORAGES[storage], game, rng_state, actions)
+        if is_cut:
+            return
+
+
+def replay_game(
+        recorded: RecordedGame,
+        storage: Optional[str] = None,
+        logic: Optional[Logic] = None
+) -> dict:
+    """
+    Replaying recorded game by the game logic headless and as fast as it can
+    (by the recorded storage, unless the other one is provided;
+    by the given game logic of the same parameters, if any, to reuse it).
+    Return summary of the replayed game.
+    """
+
+    # new game from the recorded state of the random generator
+    if logic is None:
+        logic = create_logic(storage or recorded.storage, recorded.game)
+    logic.rng.bit_generator.state = recorded.rng_state
+    logic.new_game()
+
+    # time of the game - from the action which started the game timer
+    # till the last performed action
+    started_ms = finished_ms = None
+    performed = 0
+    for milliseconds, action, position in recorded.actions:
+        if logic.game_state not in [GAME_STATE.NEW, GAME_STATE.GO]:
+            break
+        is_new = logic.game_state == GAME_STATE.NEW
+        logic.perform_action(action, position)
+        logic.check_game_won()
+        if is_new and logic.game_state != GAME_STATE.NEW:
+            started_ms = milliseconds
+        finished_ms = milliseconds
+        performed += 1
+
+    return {
+        'minefield': f'{logic.rows}x{logic.cols}/{logic.bombs}',
+        'seed': recorded.game.SEED,
+        'actions': len(recorded.actions),
+        'performed': performed,
+        'state': logic.game_state.name,
+        'opened': logic.opened_count,
+        'flagged': logic.flagged_count,
+        'time_s': (finished_ms - started_ms) / 1000
+        if started_ms is not None else None,
+        'recorded_s': recorded.duration()
+    }
+
+
+# --- Main Program ------------------------------------------------------------
+
+def main() -> int:
+    parser = ArgumentParser(description=(
+        "Replaying recorded games headless for their results."
+    ))
+    parser.add_argument(
+        'logs', nargs='+',
+        help="paths to the replay logs"
+    )
+    parser.add_argument(
+        '--storage', default=None, choices=REPLAY_STORAGES,
+        help="way of storing the minefield instead of the recorded one "
+             "(the same boards only for the storages generating them alike)"
+    )
+    parser.add_argument(
+        '--json', default=None,
+        help="path to the file for the results in JSON format"
+    )
+    args = parser.parse_args()
+
+    results = list()
+    started = perf_counter()
+    for path in args.logs:
+        with open(path, 'rb') as log_file:
+            data = log_file.read()
+        for recorded in read_games(data):
+            summary = replay_game(recorded, args.storage)
+            summary['log'] = path
+            results.append(summary)
+    replayed_s = perf_counter() - started
+
+    for summary in results:
+        print(
+            f"{summary['log']}: {summary['minefield']:<14}"
+            f"{summary['state']:<6}{summary['actions']:>6} actions"
+            f"{summary['opened']:>8} opened{summary['recorded_s']:>9.1f} s"
+        )
+    recorded_s = sum(summary['recorded_s'] for summary in results)
+    actions = sum(summary['actions'] for summary in results)
+    print(
+        f"replayed {len(results)} games ({actions} actions) "
+        f"in {replayed_s:.3f} s, "
+        f"{recorded_s / max(replayed_s, 1e-9):.0f}x faster than recorded"
+    )
+
+    if args.json is not None:
+        with open(args.json, 'w') as json_file:
+            json_file.write(json_dumps(results, indent=4))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,271 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+(V) Control level abstraction.
+Monte-Carlo simulation of the games by auto-players. Entry point.
+"""
+
+
+# System imports
+import sys
+from argparse import ArgumentParser
+from multiprocessing import Pool
+from os import cpu_count
+from json import dump as json_dump
+from time import perf_counter
+
+# External imports
+import numpy as np
+
+# Project imports
+from structures import START_RULE, GAME_STATE, PRESETS, GameParameters
+from logic import Logic
+from players import find_player
+
+
+# --- Configurations ----------------------------------------------------------
+
+def parse_custom(definition: str) -> tuple[int, int, int]:
+    """
+    Parsing custom minefield definition in format of 'ROWSxCOLS@PERCENT',
+    where PERCENT is percentage of minefield area covered by bombs.
+    Return rows, columns and bombs of the minefield.
+    """
+
+    dimensions, percentage = definition.split('@')
+    rows, cols = (int(value) for value in dimensions.split('x'))
+    bombs = round(float(percentage) / 100 * (rows * cols))
+    bombs = min(max(bombs, 1), (rows * cols - 1))
+    return rows, cols, bombs
+
+
+def compile_configurations(
+        presets: list[str],
+        customs: list[str],
+        rules: list[str]
+) -> dict[str, tuple[int, int, int, START_RULE]]:
+    """
+    Compiling simulated configurations of the game by their names:
+    rows, columns, bombs and start rule for each of them.
+    """
+
+    minefields = {name: PRESETS[name] for name in presets}
+    minefields.update({name: parse_custom(name) for name in customs})
+
+    return {
+        f'{name} / {rule}': (*minefield, START_RULE[rule.upper()])
+        for name, minefield in minefields.items()
+        for rule in rules
+    }
+
+
+# --- Simulation --------------------------------------------------------------
+
+def simulate_chunk(task: tuple) -> dict:
+    """
+    Playing chunk of the games of the single configuration by the player,
+    with own random streams for the games and the player.
+    Return summary of the played games.
+    """
+
+    name, (rows, cols, bombs, start_rule), player_name, games, seeds = task
+    logic_seed, player_seed = seeds.spawn(2)
+
+    logic = Logic(GameParameters(
+        rows, cols, bombs, start_rule,
+        SEED = int(logic_seed.generate_state(1)[0])
+    ))
+    player = find_player(player_name)(np.random.default_rng(player_seed))
+    max_moves = 4 * rows * cols  # guard from players without progress
+
+    summary = {
+        'name': name,
+        'games': 0,
+        'wins': 0,
+        'moves': 0,
+        'cascades': 0,
+        'cascade_cells': 0,
+        'cascade_max': 0,
+        'seconds': 0.0
+    }
+
+    for game in range(games):
+        if game > 0:
+            logic.new_game()
+
+        started = perf_counter()
+        moves = 0
+        while logic.game_state in [GAME_STATE.NEW, GAME_STATE.GO] \
+                and moves < max_moves:
+            action, position = player.choose_action(logic)
+
+            opened_before = logic.opened_count
+            logic.perform_action(action, position)
+            logic.check_game_won()
+            opened_cells = logic.opened_count - opened_before
+            moves += 1
+
+            # cascade - more than a single cell opened by one action
+            if opened_cells > 1:
+                summary['cascades'] += 1
+                summary['cascade_cells'] += int(opened_cells)
+                summary['cascade_max'] = \
+                    max(summary['cascade_max'], int(opened_cells))
+
+        summary['games'] += 1
+        summary['wins'] += logic.game_state == GAME_STATE.WON
+        summary['moves'] += moves
+        summary['seconds'] += perf_counter() - started
+
+    return summary
+
+
+# --- Report ------------------------------------------------------------------
+
+class Report:
+    """Aggregated statistics of the simulated games per configuration."""
+
+    def __init__(self, names: list[str]):
+        self.totals = {name: None for name in names}
+        self.started = perf_counter()
+        self.games = 0
+
+    def add(self, summary: dict):
+        """Adding summary of the played chunk of games."""
+
+        total = self.totals[summary['name']]
+        if total is None:
+            self.totals[summary['name']] = dict(summary)
+        else:
+            for key in total:
+                if key == 'cascade_max':
+                    total[key] = max(total[key], summary[key])
+                elif key != 'name':
+                    total[key] += summary[key]
+        self.games += summary['games']
+
+    def throughput(self) -> float:
+        """Return number of played games per second."""
+        return self.games / (perf_counter() - self.started)
+
+    def statistics(self) -> dict[str, dict]:
+        """Return statistics per configuration."""
+
+        statistics = dict()
+        for name, total in self.totals.items():
+            if total is None:
+                continue
+            statistics[name] = {
+                'games': total['games'],
+                'win_rate': total['wins'] / total['games'],
+                'moves_per_game': total['moves'] / total['games'],
+                'cascade_mean': total['cascade_cells']
+                / max(total['cascades'], 1),
+                'cascade_max': total['cascade_max'],
+                'ms_per_game': 1000 * total['seconds'] / total['games']
+            }
+        return statistics
+
+    def format(self) -> str:
+        """Formatting statistics as a text table."""
+
+        lines = [
+            f"{'configuration':<32}{'games':>8}{'win rate':>10}"
+            f"{'moves':>8}{'cascade':>9}{'max':>7}{'ms/game':>9}"
+        ]
+        for name, stat in self.statistics().items():
+            lines.append(
+                f"{name:<32}{stat['games']:>8}{stat['win_rate']:>10.2%}"
+                f"{stat['moves_per_game']:>8.1f}{stat['cascade_mean']:>9.1f}"
+                f"{stat['cascade_max']:>7}{stat['ms_per_game']:>9.2f}"
+            )
+        lines.append(f"throughput: {self.throughput():.1f} games/s")
+        return '\n'.join(lines)
+
+
+# --- Main Program ------------------------------------------------------------
+
+def main() -> int:
+    parser = ArgumentParser(description=(
+        "Simulating games by auto-player for win rates "
+        "per minefield and start rule."
+    ))
+    parser.add_argument(
+        '--games', type=int, default=1000,
+        help="number of games per configuration"
+    )
+    parser.add_argument(
+        '--presets', nargs='*', default=list(PRESETS), choices=list(PRESETS),
+        help="predefined levels of the game"
+    )
+    parser.add_argument(
+        '--custom', nargs='*', default=[], metavar='ROWSxCOLS@PERCENT',
+        help="custom minefields with percentage of bombs, e.g. 30x30@20"
+    )
+    parser.add_argument(
+        '--rules', nargs='*', default=[rule.name for rule in START_RULE],
+        choices=[rule.name for rule in START_RULE],
+        help="start rules of the game"
+    )
+    parser.add_argument(
+        '--player', default='random',
+        help="player name or path to the custom one as 'module:Class'"
+    )
+    parser.add_argument(
+        '--processes', type=int, default=cpu_count(),
+        help="number of worker processes"
+    )
+    parser.add_argument(
+        '--chunk', type=int, default=50,
+        help="number of games per task of the worker"
+    )
+    parser.add_argument(
+        '--seed', type=int, default=None,
+        help="seed for reproducible simulation"
+    )
+    parser.add_argument(
+        '--json', default=None,
+        help="path to the file for the report in JSON format"
+    )
+    args = parser.parse_args()
+
+    configurations = compile_configurations(
+        args.presets, args.custom, args.rules
+    )
+
+    # splitting games into chunks with independent random streams
+    tasks = list()
+    for name, configuration in configurations.items():
+        for first in range(0, args.games, args.chunk):
+            games = min(args.chunk, args.games - first)
+            tasks.append([name, configuration, args.player, games])
+    seeds = np.random.SeedSequence(args.seed).spawn(len(tasks))
+    tasks = [(*task, seed) for task, seed in zip(tasks, seeds)]
+
+    report = Report(list(configurations))
+    total_games = args.games * len(configurations)
+
+    with Pool(args.processes) as pool:
+        for summary in pool.imap_unordered(simulate_chunk, tasks):
+            report.add(summary)
+            print(
+                f"\r{report.games}/{total_games} games, "
+                f"{report.throughput():.1f} games/s",
+                end='', file=sys.stderr, flush=True
+            )
+    print(file=sys.stderr)
+
+    print(report.format())
+    if args.json is not None:
+        with open(args.json, 'w') as json_file:
+            json_dump(report.statistics(), json_file, indent=4)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,422 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+(III) Logic level abstraction.
+Constraint-based solver: safe cells, certain mines and mine probabilities.
+"""
+
+
+# System imports
+from typing import Optional
+from dataclasses import dataclass
+from math import lgamma, inf
+from time import perf_counter
+
+# External imports
+import numpy as np
+
+# Project imports
+from logic import Logic
+
+
+# --- Dataclasses -------------------------------------------------------------
+
+@dataclass
+class Solution:
+    """Result of solving current state of the game."""
+
+    safe: list[tuple[int, int]]  # covered cells without bombs for sure
+    mines: list[tuple[int, int]]  # covered cells with bombs for sure
+    probabilities: np.ndarray  # probability of bomb for each cell
+    exact: bool  # False once budget exceeded and estimates were used
+
+
+@dataclass
+class Component:
+    """
+    Solutions of independent part of the frontier, indexed by
+    number of mines k in the component: count of solutions,
+    and for each of the cells - count of solutions where it is mined
+    and where it is safe.
+    """
+
+    cells: list[int]  # flat positions of the cells
+    solutions: np.ndarray  # of the shape (k,)
+    mined_solutions: np.ndarray  # of the shape (k, cells)
+    safe_solutions: np.ndarray  # of the shape (k, cells)
+
+
+class BudgetExceeded(Exception):
+    """Enumeration of solutions is out of the budget."""
+
+
+# --- Helpers -----------------------------------------------------------------
+
+def count_neighbours(layer: np.ndarray) -> np.ndarray:
+    """Counting for each cell number of True values among its neighbours."""
+
+    rows, cols = layer.shape
+    m = np.zeros((rows + 2, cols + 2), np.uint8)
+    m[1:rows+1, 1:cols+1] = layer
+    v = m[:-2, :] + m[1:-1, :] + m[2:, :]
+    return v[:, :-2] + v[:, 1:-1] + v[:, 2:] - layer
+
+
+def log_combinations(n: int, k: int) -> float:
+    """Logarithm of number of combinations n choose k."""
+
+    if k < 0 or k > n:
+        return -inf
+    return lgamma(n + 1) - lgamma(k + 1) - lgamma(n - k + 1)
+
+
+# --- Solver ------------------------------------------------------------------
+
+class Solver:
+    """
+    Solver of the game on top of Logic's opened, flagged and nearby layers.
+    Flags set on the minefield are considered to be correct.
+    """
+
+    def __init__(
+            self,
+            max_nodes: Optional[int] = 1_000_000,
+            max_seconds: Optional[float] = None
+    ):
+        # budget of enumeration for each call of self.solve()
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self.nodes = 0
+        self.deadline = inf
+
+        # memoized solutions of components by their constraints
+        self.cache: dict[tuple, Component] = dict()
+        self.max_cache_size = 10_000
+
+    # --- Frontier methods ----------------------------------------------------
+
+    @staticmethod
+    def collect_constraints(logic: Logic) -> list[tuple[tuple[int, ...], int]]:
+        """
+        Collecting constraints from opened cells next to the covered ones:
+        flat positions of covered neighbours and number of bombs among them.
+        """
+
+        covered = ~logic.opened & ~logic.flagged
+        flags_nearby = count_neighbours(logic.flagged)
+        constraint_cells = logic.opened & (count_neighbours(covered) > 0)
+
+        constraints = list()
+        for row, col in np.argwhere(constraint_cells):
+            position = (int(row), int(col))
+            cells = tuple(sorted(
+                neighbour[0] * logic.cols + neighbour[1]
+                for neighbour in logic.find_neighbours(position)
+                if covered[neighbour]
+            ))
+            constraints.append(
+                (cells, int(logic.nearby[position] - flags_nearby[position]))
+            )
+        return constraints
+
+    @staticmethod
+    def split_constraints(
+            constraints: list[tuple[tuple[int, ...], int]]
+    ) -> list[list[tuple[tuple[int, ...], int]]]:
+        """
+        Splitting constraints into independent groups,
+        which have no common cells with each other.
+        """
+
+        parents: dict[int, int] = dict()
+
+        def find(cell: int) -> int:
+            while parents[cell] != cell:
+                parents[cell] = parents[parents[cell]]
+                cell = parents[cell]
+            return cell
+
+        for cells, _ in constraints:
+            for cell in cells:
+                parents.setdefault(cell, cell)
+            root = find(cells[0])
+            for cell in cells[1:]:
+                parents[find(cell)] = root
+
+        groups: dict[int, list] = dict()
+        for constraint in constraints:
+            groups.setdefault(find(constraint[0][0]), []).append(constraint)
+        return list(groups.values())
+
+    # --- Enumeration methods -------------------------------------------------
+
+    def enumerate_component(
+            self,
+            constraints: list[tuple[tuple[int, ...], int]]
+    ) -> Component:
+        """
+        Counting all the arrangements of mines satisfying the group
+        of constraints, by dynamic programming over the ordered cells,
+        where arrangements are memoized by the numbers of bombs still needed
+        for partially assigned constraints (and memoized by the constraints).
+        """
+
+        key = tuple(sorted(constraints))
+        if key in self.cache:
+            return self.cache[key]
+
+        # Step 1: ordering cells by breadth-first walk over constraints,
+        # so partially assigned constraints are kept as few as possible
+        cell_constraints: dict[int, list[int]] = dict()
+        for c, (cells, _) in enumerate(key):
+            for cell in cells:
+                cell_constraints.setdefault(cell, []).append(c)
+        order = list()
+        index: dict[int, int] = dict()
+        visited = {0}
+        queue = [0]
+        for c in queue:
+            for cell in key[c][0]:
+                if cell in index:
+                    continue
+                index[cell] = len(order)
+                order.append(cell)
+                for neighbour in cell_constraints[cell]:
+                    if neighbour not in visited:
+                        visited.add(neighbour)
+                        queue.append(neighbour)
+        n = len(order)
+
+        # Step 2: for each step of assignment - constraints of the cell,
+        # constraints left partially assigned, and their unassigned cells
+        first = [min(index[cell] for cell in cells) for cells, _ in key]
+        last = [max(index[cell] for cell in cells) for cells, _ in key]
+        steps = list()
+        for i, cell in enumerate(order):
+            involved = cell_constraints[cell]
+            active = [c for c in range(len(key)) if first[c] <= i < last[c]]
+            left = {
+                c: sum(index[other] > i for other in key[c][0])
+                for c in involved
+            }
+            steps.append((involved, active, left))
+
+        def transit(i: int, state: tuple, previous_active: list, value: int):
+            """Return state after assigning value to the cell (or None)."""
+            involved, active, left = steps[i]
+            needed = dict(zip(previous_active, state))
+            for c in involved:
+                remaining = needed.get(c, key[c][1]) - value
+                if remaining < 0 or remaining > left[c]:
+                    return None
+                needed[c] = remaining
+            return tuple(needed[c] for c in active)
+
+        def shift(counts: np.ndarray, value: int) -> np.ndarray:
+            """Polynomial of counts by number of mines, multiplied by k^value."""
+            return np.concatenate((np.zeros(value), counts)) if value \
+                else counts
+
+        def add(table: dict, state: tuple, counts: np.ndarray):
+            """Accumulating counts of arrangements for the state."""
+            if state in table:
+                total = table[state]
+                if len(total) < len(counts):
+                    total, counts = counts, total
+                total = total.copy()
+                total[:len(counts)] += counts
+                table[state] = total
+            else:
+                table[state] = counts
+
+        # Step 3: forward pass - counts of arrangements of the first cells
+        forward = [{(): np.ones(1)}]
+        previous_active = list()
+        for i in range(n):
+            self.check_budget(len(forward[i]))
+            table = dict()
+            for state, counts in forward[i].items():
+                for value in (0, 1):
+                    new_state = transit(i, state, previous_active, value)
+                    if new_state is not None:
+                        add(table, new_state, shift(counts, value))
+            forward.append(table)
+            previous_active = steps[i][1]
+
+        # Step 4: backward pass - counts of arrangements of the last cells,
+        # combined with forward pass into counts per cell and its value
+        solutions = np.zeros(n + 1)
+        mined_solutions = np.zeros((n + 1, n))
+        safe_solutions = np.zeros((n + 1, n))
+        backward = {(): np.ones(1)}
+        for i in reversed(range(n)):
+            self.check_budget(len(forward[i]))
+            previous_active = steps[i - 1][1] if i > 0 else list()
+            table = dict()
+            for state, counts in forward[i].items():
+                for value, per_cell in (0, safe_solutions), \
+                        (1, mined_solutions):
+                    new_state = transit(i, state, previous_active, value)
+                    if new_state is None or new_state not in backward:
+                        continue
+                    completions = shift(backward[new_state], value)
+                    add(table, state, completions)
+                    combined = np.convolve(counts, completions)
+                    per_cell[:len(combined), i] += combined
+            backward = table
+        solutions[:len(backward[()])] += backward[()]
+        if not np.isfinite(solutions).all():
+            # too many arrangements to be counted in floating point
+            raise BudgetExceeded
+
+        component = Component(
+            order, solutions, mined_solutions, safe_solutions
+        )
+        if len(self.cache) >= self.max_cache_size:
+            self.cache.clear()
+        self.cache[key] = component
+        return component
+
+    def check_budget(self, nodes: int):
+        """Counting enumerated nodes and checking budget of enumeration."""
+
+        self.nodes += nodes
+        if self.max_nodes is not None and self.nodes > self.max_nodes \
+                or perf_counter() > self.deadline:
+            raise BudgetExceeded
+
+    @staticmethod
+    def estimate_component(
+            constraints: list[tuple[tuple[int, ...], int]]
+    ) -> dict[int, float]:
+        """
+        Estimating probabilities of mines for the cells of the group
+        of constraints, which is too large to be enumerated.
+        """
+
+        estimates: dict[int, list[float]] = dict()
+        for cells, value in constraints:
+            for cell in cells:
+                estimates.setdefault(cell, []).append(value / len(cells))
+        return {
+            cell: max(values) if 1.0 in values else min(values)
+            for cell, values in estimates.items()
+        }
+
+    # --- Solving methods -----------------------------------------------------
+
+    def solve(self, logic: Logic) -> Solution:
+        """
+        Solving current state of the game: finding safe cells,
+        certain mines and probability of bomb for each of the cells.
+        """
+
+        self.nodes = 0
+        self.deadline = inf if self.max_seconds is None \
+            else perf_counter() + self.max_seconds
+
+        probabilities = np.zeros((logic.rows, logic.cols))
+        probabilities[logic.flagged] = 1.0
+        flat_probabilities = probabilities.ravel()
+        covered = ~logic.opened & ~logic.flagged
+
+        # Step 1: splitting frontier into independent components
+        components: list[Component] = list()
+        estimates: dict[int, float] = dict()
+        exact = True
+        for group in self.split_constraints(self.collect_constraints(logic)):
+            try:
+                components.append(self.enumerate_component(group))
+            except BudgetExceeded:
+                estimates.update(self.estimate_component(group))
+                exact = False
+
+        # Step 2: weights of total number of mines on the frontier,
+        # corrected by number of ways to place the rest of mines inside
+        frontier = sum(len(component.cells) for component in components)
+        interior = int(np.count_nonzero(covered)) - frontier - len(estimates)
+        mines_left = logic.bombs - logic.flagged_count \
+            - round(sum(estimates.values()))
+
+        weights = [
+            component.solutions / component.solutions.max()
+            for component in components
+        ]
+
+        log_interior_ways = np.array([
+            log_combinations(interior, mines_left - mines)
+            for mines in range(frontier + 1)
+        ])
+        interior_ways = np.exp(log_interior_ways - log_interior_ways.max()) \
+            if np.isfinite(log_interior_ways).any() \
+            else np.ones(frontier + 1)
+
+        # Step 3: leave-one-out combination of components,
+        # using prefix and suffix convolutions of their weights
+        prefixes = [np.ones(1)]
+        for weight in weights:
+            prefix = np.convolve(prefixes[-1], weight)
+            prefixes.append(prefix / prefix.max())
+        suffix = np.ones(1)
+
+        # certain cells are tracked exactly, apart from floating point
+        is_safe = np.zeros(logic.rows * logic.cols, np.bool)
+        is_mine = np.zeros(logic.rows * logic.cols, np.bool)
+
+        for i in reversed(range(len(components))):
+            component = components[i]
+            rest = np.convolve(prefixes[i], suffix)
+            suffix = np.convolve(suffix, weights[i])
+            suffix /= suffix.max()
+
+            # weights of number of mines of the component itself
+            mine_weights = np.array([
+                weights[i][mines] * np.dot(
+                    rest, interior_ways[mines:mines + len(rest)]
+                )
+                for mines in range(len(weights[i]))
+            ])
+            if mine_weights.sum() == 0:
+                # flags are inconsistent with the global number of bombs
+                mine_weights = weights[i]
+            mine_weights /= mine_weights.sum()
+
+            possible = mine_weights > 0
+            share = mine_weights[possible] / component.solutions[possible]
+            flat_probabilities[component.cells] += \
+                share @ component.mined_solutions[possible]
+            is_safe[component.cells] = \
+                ~(component.mined_solutions[possible] > 0).any(axis=0)
+            is_mine[component.cells] = \
+                ~(component.safe_solutions[possible] > 0).any(axis=0)
+
+        # Step 4: the rest of covered cells share the rest of mines
+        for cell, estimate in estimates.items():
+            flat_probabilities[cell] = estimate
+        total = prefixes[-1] * interior_ways
+        if interior > 0 and total.sum() > 0:
+            total /= total.sum()
+            interior_mines = mines_left - np.arange(frontier + 1)
+            inside = covered.ravel().copy()
+            inside[[cell for c in components for cell in c.cells]] = False
+            inside[list(estimates)] = False
+            flat_probabilities[inside] = min(max(
+                np.dot(total, interior_mines) / interior, 0.0
+            ), 1.0)
+            is_safe[inside] = (interior_mines[total > 0] == 0).all()
+            is_mine[inside] = (interior_mines[total > 0] == interior).all()
+
+        flat_probabilities[is_safe] = 0.0
+        flat_probabilities[is_mine] = 1.0
+        safe = [
+            divmod(int(cell), logic.cols) for cell in np.flatnonzero(is_safe)
+        ]
+        mines = [
+            divmod(int(cell), logic.cols) for cell in np.flatnonzero(is_mine)
+        ]
+        return Solution(safe, mines, probabilities, exact)
@@ -0,0 +1,495 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+(I) Data level abstraction.
+Compact storage of the minefield matrix layers.
+"""
+
+
+# System imports
+from abc import ABC, abstractmethod
+from os import SEEK_END, replace
+from struct import Struct
+from typing import Optional
+
+# External imports
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+
+# --- Planes ------------------------------------------------------------------
+
+class Plane(NDArrayOperatorsMixin, ABC):
+    """
+    Base of the packed matrix layer, which keeps interface of numpy array
+    for the game logic: indexing by positions, index arrays, boolean masks
+    and slices, together with arithmetic and logical operators.
+    (operators and numpy functions work on the unpacked copy of the layer)
+    """
+
+    # number of cells packed into single byte
+    CELLS_PER_BYTE = 1
+    dtype = np.dtype(np.uint8)
+
+    def __init__(self, shape: tuple[int, int]):
+        self.shape = shape
+        self.size = shape[0] * shape[1]
+        self.ndim = 2
+        self.data = np.zeros(
+            -(-self.size // self.CELLS_PER_BYTE), np.uint8
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    @abstractmethod
+    def fill(self, value):
+        """Filling the whole layer by the value in place."""
+
+    @abstractmethod
+    def take(self, flat: np.ndarray) -> np.ndarray:
+        """Reading values of the cells by their flat positions."""
+
+    @abstractmethod
+    def put(self, flat: np.ndarray, values):
+        """Writing values of the cells by their flat positions."""
+
+    @abstractmethod
+    def read_rows(self, start: int, stop: int) -> np.ndarray:
+        """Unpacking the band of rows from start to stop."""
+
+    @abstractmethod
+    def write_rows(self, start: int, values: np.ndarray):
+        """Packing the band of rows starting from start."""
+
+    def flatten_key(self, key) -> tuple[np.ndarray, Optional[tuple]]:
+        """
+        Converting index key into flat positions of the cells
+        and shape of the result (None for a single cell).
+        """
+
+        rows, cols = self.shape
+        if isinstance(key, tuple) and len(key) == 2 \
+                and all(isinstance(k, (int, np.integer)) for k in key):
+            row, col = (int(k) for k in key)
+            if not (-rows <= row < rows and -cols <= col < cols):
+                raise IndexError(f"Position {key} is out of the minefield.")
+            return np.array([(row % rows) * cols + col % cols]), None
+
+        if isinstance(key, Plane):
+            key = np.asarray(key)
+        if isinstance(key, np.ndarray) and key.dtype == np.bool:
+            flat = np.flatnonzero(key)
+            return flat, flat.shape
+
+        if isinstance(key, tuple) and len(key) == 2 \
+                and not any(isinstance(k, slice) or k is Ellipsis for k in key):
+            key_rows, key_cols = np.broadcast_arrays(*(
+                np.asarray(k, np.intp) for k in key
+            ))
+            flat = np.ravel_multi_index((key_rows, key_cols), self.shape)
+            return flat.ravel(), flat.shape
+
+        # any other key (slices, single rows etc.) by the index of positions
+        flat = np.arange(self.size).reshape(self.shape)[key]
+        return np.ravel(flat), np.shape(flat)
+
+    def __getitem__(self, key):
+        flat, shape = self.flatten_key(key)
+        values = self.take(flat)
+        return values[0] if shape is None else values.reshape(shape)
+
+    def __setitem__(self, key, values):
+        if isinstance(key, slice) and key == slice(None) or key is Ellipsis:
+            if np.ndim(values) == 0:
+                self.fill(values)
+                return
+            if np.shape(values) == self.shape:
+                self.write_rows(0, np.asarray(values))
+                return
+        flat, shape = self.flatten_key(key)
+        values = np.asarray(values)
+        if values.ndim > 0:
+            values = np.broadcast_to(values, shape or ()).ravel()
+        self.put(flat, values)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        array = self.read_rows(0, self.shape[0])
+        return array if dtype is None else array.astype(dtype)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = tuple(
+            np.asarray(value) if isinstance(value, Plane) else value
+            for value in inputs
+        )
+        out = kwargs.pop('out', None)
+        if out is not None:
+            # in-place operators are stored back into the planes
+            result = getattr(ufunc, method)(*inputs, **kwargs)
+            for plane in out:
+                plane[...] = result
+            return out[0] if len(out) == 1 else out
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({np.asarray(self)!r})'
+
+
+class BitPlane(Plane):
+    """Boolean matrix layer, packed by 8 cells per byte."""
+
+    CELLS_PER_BYTE = 8
+    dtype = np.dtype(np.bool)
+
+    def fill(self, value):
+        self.data.fill(0xFF if value else 0x00)
+        if value and self.size & 7:
+            # keeping bits beyond the last cell unset
+            self.data[-1] = (1 << (self.size & 7)) - 1
+
+    def count(self) -> int:
+        """Counting number of True values throughout the layer."""
+
+        # bits beyond the last cell are never set
+        return int(np.bitwise_count(self.data).sum())
+
+    def take(self, flat: np.ndarray) -> np.ndarray:
+        return (self.data[flat >> 3] >> (flat & 7).astype(np.uint8)) & 1 == 1
+
+    def put(self, flat: np.ndarray, values):
+        bits = np.left_shift(1, flat & 7).astype(np.uint8)
+        values = np.broadcast_to(np.asarray(values, np.bool), flat.shape)
+        np.bitwise_or.at(self.data, flat[values] >> 3, bits[values])
+        np.bitwise_and.at(self.data, flat[~values] >> 3, ~bits[~values])
+
+    def read_rows(self, start: int, stop: int) -> np.ndarray:
+        first, last = start * self.shape[1], stop * self.shape[1]
+        bits = np.unpackbits(
+            self.data[first >> 3:-(-last // 8)], bitorder='little'
+        )
+        offset = first & 7
+        return bits[offset:offset + last - first].view(np.bool).reshape(
+            (stop - start, self.shape[1])
+        )
+
+    def write_rows(self, start: int, values: np.ndarray):
+        first = start * self.shape[1]
+        last = first + values.size
+        offset = first & 7
+        if offset == 0 and (last & 7 == 0 or last == self.size):
+            self.data[first >> 3:-(-last // 8)] = \
+                np.packbits(values.ravel(), bitorder='little')
+            return
+
+        # band is not aligned by bytes - merging with its edge bytes
+        window = self.data[first >> 3:-(-last // 8)]
+        bits = np.unpackbits(window, bitorder='little')
+        bits[offset:offset + values.size] = values.ravel()
+        window[:] = np.packbits(bits, bitorder='little')
+
+
+class NibblePlane(Plane):
+    """
+    Matrix layer of small numbers from 0 to 15 (i.e. numbers of bombs nearby),
+    packed by 2 cells per byte.
+    """
+
+    CELLS_PER_BYTE = 2
+
+    def fill(self, value):
+        self.data.fill((int(value) & 0x0F) * 0x11)
+
+    def take(self, flat: np.ndarray) -> np.ndarray:
+        shifts = ((flat & 1) << 2).astype(np.uint8)
+        return (self.data[flat >> 1] >> shifts) & 0x0F
+
+    def put(self, flat: np.ndarray, values):
+        values = np.broadcast_to(
+            np.asarray(values).astype(np.uint8) & 0x0F, flat.shape
+        )
+        # even and odd cells separately - to not overwrite shared bytes
+        for parity in [0, 1]:
+            selected = (flat & 1) == parity
+            indices = flat[selected] >> 1
+            shift = 4 * parity
+            self.data[indices] = \
+                (self.data[indices] & ~np.uint8(0x0F << shift)) \
+                | (values[selected] << shift)
+
+    def read_rows(self, start: int, stop: int) -> np.ndarray:
+        first, last = start * self.shape[1], stop * self.shape[1]
+        window = self.data[first >> 1:-(-last // 2)]
+        values = np.empty(2 * window.size, np.uint8)
+        values[0::2] = window & 0x0F
+        values[1::2] = window >> 4
+        offset = first & 1
+        return values[offset:offset + last - first].reshape(
+            (stop - start, self.shape[1])
+        )
+
+    def write_rows(self, start: int, values: np.ndarray):
+        first = start * self.shape[1]
+        last = first + values.size
+        window = self.data[first >> 1:-(-last // 2)]
+        offset = first & 1
+        unpacked = np.empty(2 * window.size, np.uint8)
+        unpacked[0::2] = window & 0x0F
+        unpacked[1::2] = window >> 4
+        unpacked[offset:offset + values.size] = values.ravel()
+        window[:] = unpacked[0::2] | (unpacked[1::2] << 4)
+
+
+# --- Packed Cell States ------------------------------------------------------
+
+# bits of the single byte of cell state:
+# lower 4 bits - number of bombs nearby, upper 4 bits - status of the cell
+NEARBY_BITS = 0x0F
+OPENED_BIT = 0x10
+FLAGGED_BIT = 0x20
+MARKED_BIT = 0x40
+MINED_BIT = 0x80
+
+
+class BitView(Plane):
+    """Boolean matrix layer as a view of single bit of the cell states."""
+
+    dtype = np.dtype(np.bool)
+
+    def __init__(self, cells: np.ndarray, bit: int):
+        self.shape = cells.shape
+        self.size = cells.size
+        self.ndim = 2
+        self.data = cells
+        self.bit = np.uint8(bit)
+
+    # indexing directly by numpy, which is the fastest for single cells
+    def __getitem__(self, key):
+        return self.data[key] & self.bit != 0
+
+    def __setitem__(self, key, values):
+        cells = self.data[key]
+        self.data[key] = np.where(values, cells | self.bit, cells & ~self.bit)
+
+    def fill(self, value):
+        if value:
+            self.data |= self.bit
+        else:
+            self.data &= ~self.bit
+
+    def take(self, flat: np.ndarray) -> np.ndarray:
+        return self.data.ravel()[flat] & self.bit != 0
+
+    def put(self, flat: np.ndarray, values):
+        cells = self.data.reshape(-1)
+        values = np.broadcast_to(np.asarray(values, np.bool), flat.shape)
+        cells[flat[values]] |= self.bit
+        cells[flat[~values]] &= ~self.bit
+
+    def read_rows(self, start: int, stop: int) -> np.ndarray:
+        return self.data[start:stop] & self.bit != 0
+
+    def write_rows(self, start: int, values: np.ndarray):
+        band = self.data[start:start + len(values)]
+        band[:] = np.where(values, band | self.bit, band & ~self.bit)
+
+
+class NearbyView(Plane):
+    """Matrix layer of numbers of bombs nearby as a view of the cell states."""
+
+    def __init__(self, cells: np.ndarray):
+        self.shape = cells.shape
+        self.size = cells.size
+        self.ndim = 2
+        self.data = cells
+
+    # indexing directly by numpy, which is the fastest for single cells
+    def __getitem__(self, key):
+        return self.data[key] & NEARBY_BITS
+
+    def __setitem__(self, key, values):
+        self.data[key] = (self.data[key] & ~np.uint8(NEARBY_BITS)) \
+            | (np.asarray(values).astype(np.uint8) & NEARBY_BITS)
+
+    def fill(self, value):
+        self.data &= ~np.uint8(NEARBY_BITS)
+        self.data |= np.uint8(value) & NEARBY_BITS
+
+    def take(self, flat: np.ndarray) -> np.ndarray:
+        return self.data.ravel()[flat] & NEARBY_BITS
+
+    def put(self, flat: np.ndarray, values):
+        cells = self.data.reshape(-1)
+        cells[flat] = (cells[flat] & ~np.uint8(NEARBY_BITS)) \
+            | (np.asarray(values).astype(np.uint8) & NEARBY_BITS)
+
+    def read_rows(self, start: int, stop: int) -> np.ndarray:
+        return self.data[start:stop] & NEARBY_BITS
+
+    def write_rows(self, start: int, values: np.ndarray):
+        band = self.data[start:start + len(values)]
+        band[:] = (band & ~np.uint8(NEARBY_BITS)) \
+            | (values.astype(np.uint8) & NEARBY_BITS)
+
+
+def pack_layers(
+        mined: np.ndarray,
+        opened: np.ndarray,
+        flagged: np.ndarray,
+        marked: np.ndarray,
+        nearby: np.ndarray
+) -> np.ndarray:
+    """Packing separate matrix layers into single matrix of cell states."""
+
+    cells = np.asarray(nearby).astype(np.uint8) & NEARBY_BITS
+    for layer, bit in [
+        (opened, OPENED_BIT),
+        (flagged, FLAGGED_BIT),
+        (marked, MARKED_BIT),
+        (mined, MINED_BIT)
+    ]:
+        cells |= np.asarray(layer, np.bool) * np.uint8(bit)
+    return cells
+
+
+def unpack_layers(cells: np.ndarray) -> tuple[np.ndarray, ...]:
+    """
+    Unpacking matrix of cell states into separate matrix layers:
+    mined, opened, flagged, marked and nearby.
+    """
+
+    return (
+        cells & MINED_BIT != 0,
+        cells & OPENED_BIT != 0,
+        cells & FLAGGED_BIT != 0,
+        cells & MARKED_BIT != 0,
+        cells & NEARBY_BITS
+    )
+
+
+# --- Snapshots ---------------------------------------------------------------
+
+# Snapshot of the game is a file of fixed layout:
+# header - magic, version and the fields of the game state (see below),
+# padded to SNAPSHOT_ALIGNMENT bytes;
+# matrices - raw data of the matrix layers one by one, exactly as they are
+# kept by the storage, so they are mapped into memory instead of parsing.
+
+SNAPSHOT_MAGIC = b'MSSN'
+SNAPSHOT_VERSION = 2
+SNAPSHOT_ALIGNMENT = 64
+SNAPSHOT_PREFIX = Struct('<4sB')
+
+# header of the snapshot and names of its fields by versions:
+# older versions are kept to load old snapshots,
+# fields missing in them are taken from SNAPSHOT_DEFAULTS
+SNAPSHOT_HEADERS: dict[int, tuple[Struct, tuple[str, ...]]] = {
+    1: (
+        Struct('<4sBBIIIBBBBdQQQ16s16s16sBIQ'),
+        (
+            'magic', 'version', 'storage', 'rows', 'cols', 'bombs',
+            'start_rule', 'marks_present', 'game_state', 'has_time',
+            'time_score', 'opened_count', 'flagged_count', 'marked_count',
+            'seed', 'rng_state', 'rng_inc', 'rng_has_uint32', 'rng_uinteger',
+            'matrices_size'
+        )
+    ),
+    2: (
+        Struct('<4sBBIIIBBBBdQQQ16s16s16sBIQBqq'),
+        (
+            'magic', 'version', 'storage', 'rows', 'cols', 'bombs',
+            'start_rule', 'marks_present', 'game_state', 'has_time',
+            'time_score', 'opened_count', 'flagged_count', 'marked_count',
+            'seed', 'rng_state', 'rng_inc', 'rng_has_uint32', 'rng_uinteger',
+            'matrices_size', 'has_click', 'click_row', 'click_col'
+        )
+    )
+}
+SNAPSHOT_DEFAULTS: dict[str, object] = {
+    'has_click': False,
+    'click_row': 0,
+    'click_col': 0
+}
+
+
+def snapshot_offset(header_size: int) -> int:
+    """Return offset of the matrices after the header of given size."""
+    return -(-header_size // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+
+
+def write_snapshot(path: str, fields: dict, matrices: list[np.ndarray]):
+    """
+    Writing snapshot of the current version: header and matrices.
+    Snapshot is written into the temporary file, which replaces the file
+    then - so the snapshot mapped by the game being saved (load_state)
+    is never truncated under it.
+    """
+
+    header, names = SNAPSHOT_HEADERS[SNAPSHOT_VERSION]
+    fields = dict(
+        fields, magic=SNAPSHOT_MAGIC, version=SNAPSHOT_VERSION,
+        matrices_size=sum(matrix.nbytes for matrix in matrices)
+    )
+    with open(path + '.tmp', 'wb') as snapshot_file:
+        snapshot_file.write(header.pack(*(fields[name] for name in names)))
+        snapshot_file.write(
+            bytes(snapshot_offset(header.size) - header.size)
+        )
+        for matrix in matrices:
+            np.ascontiguousarray(matrix).tofile(snapshot_file)
+    replace(path + '.tmp', path)
+
+
+def read_snapshot(path: str) -> tuple[dict, int]:
+    """
+    Reading header of the snapshot of any known version.
+    Return its fields and offset of the matrices.
+    """
+
+    with open(path, 'rb') as snapshot_file:
+        prefix = snapshot_file.read(SNAPSHOT_PREFIX.size)
+        if len(prefix) < SNAPSHOT_PREFIX.size:
+            raise ValueError("Snapshot is too short.")
+        magic, version = SNAPSHOT_PREFIX.unpack(prefix)
+        if magic != SNAPSHOT_MAGIC or version not in SNAPSHOT_HEADERS:
+            raise ValueError("Unknown format of the snapshot.")
+
+        header, names = SNAPSHOT_HEADERS[version]
+        data = prefix + snapshot_file.read(header.size - len(prefix))
+        if len(data) < header.size:
+            raise ValueError("Snapshot is too short.")
+        fields = dict(SNAPSHOT_DEFAULTS)
+        fields.update(zip(names, header.unpack(data)))
+
+        offset = snapshot_offset(header.size)
+        if snapshot_file.seek(0, SEEK_END) < offset + fields['matrices_size']:
+            raise ValueError("Snapshot is too short.")
+
+    return fields, offset
+
+
+def map_snapshot(
+        path: str,
+        offset: int,
+        layout: list[tuple[np.dtype, tuple[int, ...]]]
+) -> list[np.ndarray]:
+    """
+    Mapping matrices of the snapshot into memory by their layout
+    (dtype and shape of each). Mapping is copy-on-write: changes of the
+    matrices are kept in memory only, the snapshot stays unchanged.
+    """
+
+    matrices = list()
+    for dtype, shape in layout:
+        matrix = np.memmap(path, dtype, 'c', offset, shape)
+        matrices.append(matrix.view(np.ndarray))
+        offset += matrix.nbytes
+    return matrices
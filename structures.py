@@ -12,6 +12,8 @@ Data structures, types and interfaces.
 
 
 # System imports
+from typing import Optional
+from dataclasses import dataclass
 from enum import Enum, auto
 
 
@@ -34,6 +36,9 @@ class EVENT(Enum):
     LEFT_ARROW_KEY_DOWN = auto()
     UP_ARROW_KEY_DOWN = auto()
     DOWN_ARROW_KEY_DOWN = auto()
+    UNDO_KEY_DOWN = auto()
+    REDO_KEY_DOWN = auto()
+    SETTINGS_KEY_DOWN = auto()
 
 
 class ACTION(Enum):
@@ -60,8 +65,34 @@ class FACE_STATE(Enum):
     PRESSED = auto()  # pressed state of the button
 
 
+# --- Dataclasses -------------------------------------------------------------
+
+@dataclass
+class GameParameters:
+    """
+    Set of parameters for the game engine to be created explicitly,
+    without parsing configuration file (e.g. for headless usage).
+    """
+
+    ROWS: int
+    COLS: int
+    BOMBS: int
+    START_RULE: START_RULE = START_RULE.AS_IS
+    MARKS_PRESENT: bool = False
+    SEED: Optional[int] = None  # None for pure random
+    STORAGE: str = 'layers'  # way of storing matrix layers (logic.STORAGES)
+    DEBUG: bool = False  # checking counters of cells against matrix layers
+
+
 # --- Other -------------------------------------------------------------------
 
+# predefined levels of the game: rows, columns and bombs of the minefield
+PRESETS = {
+    'beginner': (9, 9, 10),
+    'intermediate': (16, 16, 40),
+    'expert': (16, 30, 99)
+}
+
 CODE_TO_CELL = [
     'empty',
     'nearby_1',
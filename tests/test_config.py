@@ -0,0 +1,54 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+Regression tests of the settings changed while the game runs:
+random seed is drawn again only once the game itself is changed.
+"""
+
+
+# External imports
+import pytest
+
+# Project imports
+import config
+from config import GAME, change_settings
+
+
+# --- Tests -------------------------------------------------------------------
+
+@pytest.fixture
+def settings():
+    """Restoring the configuration changed by the test."""
+
+    previous = config.config
+    yield
+    config.config = previous
+    change_settings(dict())
+
+
+def test_seed_is_kept_by_interface_settings(settings):
+    change_settings({'Game Parameters': {'random seed': None}})
+    seed = GAME.SEED
+    change_settings({'User Interface': {'night mode': True}})
+    assert GAME.SEED == seed
+
+
+def test_seed_is_drawn_again_for_changed_game(settings):
+    change_settings({'Game Parameters': {'random seed': None}})
+    seeds = {GAME.SEED}
+    for preset in ['beginner', 'expert', 'beginner', 'expert']:
+        change_settings({'Minefield': {'preset': preset}})
+        seeds.add(GAME.SEED)
+    assert len(seeds) == 5
+
+
+def test_explicit_seed_is_kept_for_changed_game(settings):
+    change_settings({'Game Parameters': {'random seed': 42}})
+    for preset in ['beginner', 'expert']:
+        change_settings({'Minefield': {'preset': preset}})
+        assert GAME.SEED == 42
@@ -0,0 +1,56 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+Regression tests of the endless minefield:
+resolved chunks are compressed only far away from the exported window.
+"""
+
+
+# External imports
+import numpy as np
+import pytest
+
+# Project imports
+from structures import START_RULE, GameParameters
+from storage import OPENED_BIT, MINED_BIT
+from endless import EndlessLogic
+
+
+# --- Tests -------------------------------------------------------------------
+
+@pytest.mark.parametrize('top, left', [(640, 640), (-40, 17), (0, 0)])
+def test_window_chunks_are_not_compressed(top, left):
+    logic = EndlessLogic(
+        GameParameters(48, 96, 500, START_RULE.AS_IS, False, SEED = 1)
+    )
+    rows, cols = 48, 96
+    (first_row, first_col), _ = logic.split_position((top, left))
+    (last_row, last_col), _ = \
+        logic.split_position((top + rows - 1, left + cols - 1))
+
+    # resolving all the chunks around the window: cells without bombs opened
+    margin = logic.KEEP_DISTANCE + 2
+    for chunk_row in range(first_row - margin, last_row + margin + 1):
+        for chunk_col in range(first_col - margin, last_col + margin + 1):
+            chunk = logic.load_chunk((chunk_row, chunk_col))
+            chunk[chunk & MINED_BIT == 0] |= np.uint8(OPENED_BIT)
+
+    logic.get_matrix(top, left, rows, cols)
+
+    for chunk_row, chunk_col in logic.compressed:
+        assert not (
+            first_row <= chunk_row <= last_row
+            and first_col <= chunk_col <= last_col
+        ), (chunk_row, chunk_col)
+    # only the chunks beyond the distance kept around the window
+    assert len(logic.compressed) > 0
+    for chunk_row, chunk_col in logic.compressed:
+        assert max(
+            first_row - chunk_row, chunk_row - last_row,
+            first_col - chunk_col, chunk_col - last_col
+        ) > logic.KEEP_DISTANCE
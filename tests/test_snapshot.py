@@ -0,0 +1,69 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+Regression tests of the snapshots of the game:
+restored game keeps its own state and nothing of the previous game.
+"""
+
+
+# External imports
+import numpy as np
+import pytest
+
+# Project imports
+from structures import START_RULE, ACTION, GAME_STATE, GameParameters
+from logic import STORAGES
+from journal import Journal
+
+
+# --- Helpers -----------------------------------------------------------------
+
+def create_logic(storage: str, seed: int):
+    game = GameParameters(
+        16, 30, 99, START_RULE.EMPTY_CELL, False,
+        SEED = seed, STORAGE = storage, DEBUG = True
+    )
+    return STORAGES[storage](game)
+
+
+# --- Tests -------------------------------------------------------------------
+
+@pytest.mark.parametrize('storage', list(STORAGES))
+def test_load_state_clears_journal(storage, tmp_path):
+    snapshot = str(tmp_path / 'game.snap')
+    saved = create_logic(storage, 1)
+    saved.perform_action(ACTION.TO_OPEN, (8, 15))
+    saved.save_state(snapshot)
+
+    logic = create_logic(storage, 2)
+    Journal().attach(logic)
+    logic.perform_action(ACTION.TO_OPEN, (0, 0))
+    logic.perform_action(ACTION.TO_OPEN, (15, 29))
+    logic.load_state(snapshot)
+
+    assert not logic.journal.can_undo()
+    assert not logic.journal.undo(logic)
+    np.testing.assert_array_equal(logic.get_matrix(), saved.get_matrix())
+    logic.check_counters()
+
+
+@pytest.mark.parametrize('storage', list(STORAGES))
+def test_load_state_keeps_detonated_cell(storage, tmp_path):
+    snapshot = str(tmp_path / 'game.snap')
+    saved = create_logic(storage, 3)
+    saved.perform_action(ACTION.TO_OPEN, (8, 15))
+    row, col = (int(i) for i in np.argwhere(np.asarray(saved.mined))[0])
+    saved.perform_action(ACTION.TO_OPEN, (row, col))
+    assert saved.game_state == GAME_STATE.LOST
+    saved.save_state(snapshot)
+
+    logic = create_logic(storage, 4)
+    logic.load_state(snapshot)
+
+    assert logic.click_position == (row, col)
+    np.testing.assert_array_equal(logic.get_matrix(), saved.get_matrix())
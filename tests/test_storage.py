@@ -0,0 +1,94 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+Regression tests of the packed cell-state storage:
+the same games played on Logic and PackedLogic keep the same cell states.
+"""
+
+
+# External imports
+import numpy as np
+import pytest
+
+# Project imports
+from structures import START_RULE, ACTION, GAME_STATE, GameParameters
+from storage import pack_layers, unpack_layers
+from logic import Logic, PackedLogic
+
+
+# --- Helpers -----------------------------------------------------------------
+
+ACTIONS = [ACTION.TO_OPEN, ACTION.TO_LABEL, ACTION.TO_REVEAL]
+
+
+def layers(logic: Logic) -> tuple[np.ndarray, ...]:
+    """Return matrix layers: mined, opened, flagged, marked and nearby."""
+
+    return tuple(
+        np.asarray(layer)
+        for layer in [
+            logic.mined, logic.opened, logic.flagged, logic.marked,
+            logic.nearby
+        ]
+    )
+
+
+def assert_same_states(layered: Logic, packed: PackedLogic):
+    """Comparing cell states of both games by packing and unpacking them."""
+
+    np.testing.assert_array_equal(pack_layers(*layers(layered)), packed.cells)
+    for expected, actual in zip(layers(layered), unpack_layers(packed.cells)):
+        np.testing.assert_array_equal(expected, actual)
+    assert layered.game_state == packed.game_state
+    np.testing.assert_array_equal(layered.get_matrix(), packed.get_matrix())
+
+
+# --- Tests -------------------------------------------------------------------
+
+def test_pack_unpack_round_trip():
+    rng = np.random.default_rng(0)
+    shape = (17, 23)
+    mined, opened, flagged, marked = rng.integers(0, 2, (4, *shape), np.bool)
+    nearby = rng.integers(0, 9, shape, np.uint8)
+
+    cells = pack_layers(mined, opened, flagged, marked, nearby)
+    assert cells.dtype == np.uint8 and cells.shape == shape
+    for expected, actual in zip(
+            [mined, opened, flagged, marked, nearby], unpack_layers(cells)
+    ):
+        np.testing.assert_array_equal(expected, actual)
+
+
+@pytest.mark.parametrize('start_rule', list(START_RULE))
+@pytest.mark.parametrize('marks_present', [False, True])
+@pytest.mark.parametrize('seed', range(5))
+def test_packed_logic_plays_as_logic(start_rule, marks_present, seed):
+    rng = np.random.default_rng(seed)
+    rows, cols = (int(size) for size in rng.integers(2, 16, 2))
+    bombs = int(rng.integers(1, rows * cols // 3 + 2))
+    game = GameParameters(
+        rows, cols, bombs, start_rule, marks_present, SEED = seed
+    )
+    layered, packed = Logic(game), PackedLogic(game)
+    assert_same_states(layered, packed)
+
+    for _ in range(300):
+        action = ACTIONS[rng.integers(len(ACTIONS))]
+        position = (int(rng.integers(rows)), int(rng.integers(cols)))
+        if action == ACTION.TO_OPEN and layered.game_state == GAME_STATE.GO:
+            # opening only cells without bombs, so the games last long enough
+            # for labels to go through all their states
+            safe = np.argwhere(~layered.mined & ~layered.opened)
+            position = tuple(int(i) for i in safe[rng.integers(len(safe))])
+        for logic in [layered, packed]:
+            logic.perform_action(action, position)
+            logic.check_game_won()
+        assert_same_states(layered, packed)
+        assert layered.get_bombs_score() == packed.get_bombs_score()
+        if layered.game_state in [GAME_STATE.WON, GAME_STATE.LOST]:
+            break
@@ -0,0 +1,390 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+(III) Logic level abstraction.
+Batched logic of many games at once, for bots and simulations.
+"""
+
+
+# System imports
+from typing import Optional
+
+# External imports
+import numpy as np
+
+# Project imports
+from structures import START_RULE, ACTION, GAME_STATE
+
+
+# --- Helpers -----------------------------------------------------------------
+
+# relative positions of the neighbour cells
+NEIGHBOUR_SHIFTS = np.array([
+    (-1, -1), (-1, 0), (-1, 1),
+    (0, -1), (0, 1),
+    (1, -1), (1, 0), (1, 1)
+])
+
+
+def pad(layers: np.ndarray, dtype) -> np.ndarray:
+    """Surrounding each matrix layer of the stack by empty borders."""
+
+    games, rows, cols = layers.shape
+    padded = np.zeros((games, rows + 2, cols + 2), dtype)
+    padded[:, 1:rows+1, 1:cols+1] = layers
+    return padded
+
+
+def dilate(layers: np.ndarray) -> np.ndarray:
+    """
+    Extending True values of each boolean matrix layer of the stack
+    over all the neighbour cells (self cells are kept as well).
+    """
+
+    m = pad(layers, np.bool)
+    v = m[:, :-2, :] | m[:, 1:-1, :] | m[:, 2:, :]
+    return v[:, :, :-2] | v[:, :, 1:-1] | v[:, :, 2:]
+
+
+# --- VecLogic ----------------------------------------------------------------
+
+class VecLogic:
+    """
+    Minesweeper game logic for N games of the same parameters,
+    stored as matrix layers of the shape (N, rows, cols).
+    Behaviour of each game follows the Logic class.
+    """
+
+    def __init__(self, game, number_of_games: int):
+        # retrieving provided game parameters
+        self.games = number_of_games
+        self.cols = game.COLS
+        self.rows = game.ROWS
+        self.bombs = game.BOMBS
+        self.start_rule = game.START_RULE
+        self.marks_present = game.MARKS_PRESENT
+
+        # own random generator of the games, reproducible by the seed
+        self.rng = np.random.default_rng(game.SEED)
+
+        # matrix layers of all the games, the same as in Logic class
+        shape = (self.games, self.rows, self.cols)
+        self.mined = np.zeros(shape, np.bool)
+        self.opened = np.zeros(shape, np.bool)
+        self.flagged = np.zeros(shape, np.bool)
+        self.marked = np.zeros(shape, np.bool)
+        self.nearby = np.zeros(shape, np.uint8)
+
+        # states of the games as values of GAME_STATE
+        self.game_state = np.full(self.games, GAME_STATE.NEW.value, np.uint8)
+
+        # creating new games
+        self.new_game()
+
+    # --- Initialization methods ----------------------------------------------
+
+    def new_game(self, games: Optional[np.ndarray] = None):
+        """
+        New games with the same predefined conditions
+        (for all the games, or only for provided indices of games).
+        """
+
+        if games is None:
+            games = np.arange(self.games)
+
+        self.opened[games] = False
+        self.flagged[games] = False
+        self.marked[games] = False
+        self.game_state[games] = GAME_STATE.NEW.value
+        self.generate_bombs(games)
+        self.calculate_nearby(games)
+
+    def generate_bombs(self, games: np.ndarray):
+        """Filling up minefields by predefine number of bombs."""
+
+        # bombs are placed under the smallest random keys of each minefield
+        keys = self.rng.random((len(games), self.rows * self.cols))
+        positions = np.argpartition(keys, self.bombs - 1, axis=1)
+        mined = np.zeros(keys.shape, np.bool)
+        np.put_along_axis(mined, positions[:, :self.bombs], True, axis=1)
+        self.mined[games] = mined.reshape((-1, self.rows, self.cols))
+
+    def calculate_nearby(self, games: np.ndarray):
+        """
+        Calculating throughout the entire minefields
+        number of neighbour bombs for each cell.
+        """
+
+        mined = self.mined[games]
+        m = pad(mined, np.uint8)
+        v = m[:, :-2, :] + m[:, 1:-1, :] + m[:, 2:, :]
+        self.nearby[games] = \
+            v[:, :, :-2] + v[:, :, 1:-1] + v[:, :, 2:] - mined
+
+    # --- Operational methods -------------------------------------------------
+
+    def find_neighbours(
+            self,
+            rows: np.ndarray,
+            cols: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Compiling neighbour cells positions for each of the cells:
+        rows and columns of the shape (cells, 8), clipped to the minefield,
+        together with mask of the actually existing neighbours.
+        """
+
+        neighbour_rows = rows[:, None] + NEIGHBOUR_SHIFTS[:, 0]
+        neighbour_cols = cols[:, None] + NEIGHBOUR_SHIFTS[:, 1]
+        exist = (neighbour_rows >= 0) & (neighbour_rows < self.rows) \
+            & (neighbour_cols >= 0) & (neighbour_cols < self.cols)
+        return (
+            np.clip(neighbour_rows, 0, self.rows - 1),
+            np.clip(neighbour_cols, 0, self.cols - 1),
+            exist
+        )
+
+    def to_label_cells(
+            self,
+            games: np.ndarray,
+            rows: np.ndarray,
+            cols: np.ndarray
+    ):
+        """Labeling cells by mark or flag."""
+
+        flagged = self.flagged[games, rows, cols]
+        if self.marks_present:
+            marked = self.marked[games, rows, cols]
+            self.flagged[games, rows, cols] = ~flagged & ~marked
+            self.marked[games, rows, cols] = flagged
+        else:
+            self.flagged[games, rows, cols] = ~flagged
+
+    def to_flag_neighbours(
+            self,
+            games: np.ndarray,
+            rows: np.ndarray,
+            cols: np.ndarray
+    ):
+        """
+        Flagging the neighbour cells in case if there are
+        precise number of closed neighbours.
+        """
+
+        neighbour_rows, neighbour_cols, exist = self.find_neighbours(rows, cols)
+        neighbour_games = np.broadcast_to(games[:, None], exist.shape)
+        closed = exist & ~self.opened[
+            neighbour_games, neighbour_rows, neighbour_cols
+        ]
+        precise = closed.sum(axis=1) == self.nearby[games, rows, cols]
+
+        to_flag = closed & precise[:, None]
+        flag_games = neighbour_games[to_flag]
+        flag_rows, flag_cols = neighbour_rows[to_flag], neighbour_cols[to_flag]
+        self.flagged[flag_games, flag_rows, flag_cols] = True
+        self.marked[flag_games, flag_rows, flag_cols] = False
+
+    def to_open_neighbours(
+            self,
+            games: np.ndarray,
+            rows: np.ndarray,
+            cols: np.ndarray
+    ) -> np.ndarray:
+        """
+        Opening the neighbour cells in case if set flags are correct.
+        Return mask of the opened cells of the shape (N, rows, cols).
+        """
+
+        to_open = np.zeros(self.mined.shape, np.bool)
+
+        neighbour_rows, neighbour_cols, exist = self.find_neighbours(rows, cols)
+        neighbour_games = np.broadcast_to(games[:, None], exist.shape)
+        flagged = exist & self.flagged[
+            neighbour_games, neighbour_rows, neighbour_cols
+        ]
+        mined = exist & self.mined[
+            neighbour_games, neighbour_rows, neighbour_cols
+        ]
+        precise = flagged.sum(axis=1) == self.nearby[games, rows, cols]
+
+        # Step 1: checking for detonation due to wrong flags
+        detonated = precise & (flagged ^ mined).any(axis=1)
+        self.game_state[games[detonated]] = GAME_STATE.LOST.value
+
+        # Step 2: than the actual opening of the neighbours
+        opening = exist & ~flagged & (precise & ~detonated)[:, None]
+        to_open[
+            neighbour_games[opening],
+            neighbour_rows[opening],
+            neighbour_cols[opening]
+        ] = True
+        return to_open
+
+    def expand(self, to_open: np.ndarray):
+        """
+        Opening cells by the mask, with expending areas
+        in case opened cells have no bombs nearby.
+        """
+
+        # processing only the games with something to open
+        games = np.flatnonzero(to_open.any(axis=(1, 2)))
+        to_open = to_open[games]
+
+        # Step 1: growing areas of adjacent empty cells
+        empty = (self.nearby[games] == 0) & ~self.flagged[games]
+        area = to_open & empty
+        frontier = area
+        while frontier.any():
+            frontier = dilate(frontier) & empty & ~area
+            area |= frontier
+
+        # Step 2: opening all the cells of areas together with their borders
+        to_open |= dilate(area) & ~self.flagged[games]
+        self.opened[games] |= to_open
+        self.marked[games] &= ~to_open
+
+    # --- Game Start Rule methods ---------------------------------------------
+
+    def relocate_bombs(self, games: np.ndarray, area: np.ndarray):
+        """
+        Moving bombs out of the area (boolean mask of the shape of games)
+        to the random free cells outside of it.
+        """
+
+        cells = self.rows * self.cols
+        mined = self.mined[games].reshape((-1, cells))
+        area = area.reshape((-1, cells))
+        moving = (mined & area).sum(axis=1)
+
+        # bombs are moved under the smallest random keys of allowed cells
+        keys = self.rng.random(mined.shape)
+        keys[mined | area] = np.inf
+        positions = np.argsort(keys, axis=1)[:, :moving.max(initial=0)]
+        placed = np.arange(positions.shape[1]) < moving[:, None]
+
+        mined &= ~area
+        mined[np.arange(len(games))[:, None], positions] |= placed
+        self.mined[games] = mined.reshape((-1, self.rows, self.cols))
+        self.calculate_nearby(games)
+
+    def before_first_action_to_open(
+            self,
+            games: np.ndarray,
+            rows: np.ndarray,
+            cols: np.ndarray
+    ):
+        """
+        Rearranging bombs under positions of the first open clicks
+        according to current start rule.
+        """
+
+        if self.start_rule == START_RULE.AS_IS or len(games) == 0:
+            return
+
+        clicked = np.zeros((len(games), self.rows, self.cols), np.bool)
+        clicked[np.arange(len(games)), rows, cols] = True
+
+        if self.start_rule == START_RULE.EMPTY_CELL:
+            # in case of too many bombs on the minefield
+            # to meet the start rule of empty_cell,
+            # the start rule of no_bomb is applied instead
+            covering_area = dilate(clicked)
+            fits = self.bombs <= self.rows * self.cols \
+                - covering_area.sum(axis=(1, 2))
+            clicked[fits] = covering_area[fits]
+
+        needed = (self.mined[games] & clicked).any(axis=(1, 2))
+        self.relocate_bombs(games[needed], clicked[needed])
+
+    # --- Action methods ------------------------------------------------------
+
+    def perform_actions(
+            self,
+            games: np.ndarray,
+            actions: np.ndarray,
+            rows: np.ndarray,
+            cols: np.ndarray
+    ) -> np.ndarray:
+        """
+        Performing actions (values of ACTION) on click positions (rows, cols)
+        of the games by their indices - at most one action per game.
+        Finished games are not affected.
+        Return states of all the games as values of GAME_STATE.
+        """
+
+        games, actions, rows, cols = \
+            np.broadcast_arrays(games, actions, rows, cols)
+        if len(np.unique(games)) != len(games):
+            raise ValueError("Only one action per game could be performed.")
+
+        # skipping finished games
+        in_play = (self.game_state[games] == GAME_STATE.NEW.value) \
+            | (self.game_state[games] == GAME_STATE.GO.value)
+        games, actions = games[in_play], actions[in_play]
+        rows, cols = rows[in_play], cols[in_play]
+
+        to_open = actions == ACTION.TO_OPEN.value
+        to_label = actions == ACTION.TO_LABEL.value
+        to_reveal = actions == ACTION.TO_REVEAL.value
+
+        # Step 1: starting new games on the first action to open
+        starting = to_open \
+            & (self.game_state[games] == GAME_STATE.NEW.value) \
+            & ~self.flagged[games, rows, cols]
+        self.before_first_action_to_open(
+            games[starting], rows[starting], cols[starting]
+        )
+        self.game_state[games[starting]] = GAME_STATE.GO.value
+
+        # Step 2: splitting actions by their actual effect
+        opened = self.opened[games, rows, cols]
+        flagged = self.flagged[games, rows, cols]
+        mined = self.mined[games, rows, cols]
+
+        labeling = (to_label | to_reveal) & ~opened
+        flagging_around = to_label & opened
+        revealing_around = (to_reveal | to_open) & opened
+        opening = to_open & ~opened & ~flagged
+
+        # Step 3: performing actions
+        self.to_label_cells(games[labeling], rows[labeling], cols[labeling])
+        self.to_flag_neighbours(
+            games[flagging_around],
+            rows[flagging_around],
+            cols[flagging_around]
+        )
+
+        detonating = opening & mined
+        self.game_state[games[detonating]] = GAME_STATE.LOST.value
+        opening &= ~mined
+
+        cells_to_open = self.to_open_neighbours(
+            games[revealing_around],
+            rows[revealing_around],
+            cols[revealing_around]
+        )
+        cells_to_open[games[opening], rows[opening], cols[opening]] = True
+        self.expand(cells_to_open)
+
+        self.check_games_won()
+        return self.game_state
+
+    # --- Checking game state methods -----------------------------------------
+
+    def check_games_won(self):
+        """Checking if the current states of the games are won."""
+
+        won = (self.game_state == GAME_STATE.GO.value) \
+            & (self.rows * self.cols - self.opened.sum(axis=(1, 2))
+               == self.bombs)
+        self.game_state[won] = GAME_STATE.WON.value
+
+        # game win postprocedure:
+        # marking all the remaining closed cells by flags
+        self.flagged[won] |= self.mined[won]
+        self.marked[won] = False
@@ -0,0 +1,316 @@
+# -----------------------------------------------------------------------------
+# "Minesweeper" tribute to original online variations of the game:
+# https://minesweeperonline.com
+# https://minesweeper.online
+# Copyright (c) Feb 2022 Oleksii Hurov
+# -----------------------------------------------------------------------------
+
+"""
+(V) Control level abstraction.
+Verification of the submitted scores by their replay logs,
+replayed headless by the pool of worker processes. Entry point.
+"""
+
+
+# System imports
+import sys
+from argparse import ArgumentParser
+from json import dumps as json_dumps, load as json_load
+from multiprocessing import Pool
+from os import cpu_count, path, walk
+from struct import error as StructError
+from time import perf_counter
+from typing import Iterator, Optional
+
+# External imports
+import numpy as np
+
+# Project imports
+from structures import START_RULE, GAME_STATE
+from logic import Logic
+from replay import RecordedGame, read_games, create_logic, replay_game
+
+
+# --- Verification ------------------------------------------------------------
+
+# extension of the replay logs searched in the folders
+REPLAY_EXTENSION = '.mrp'
+
+# number of game logics kept by the worker for reuse
+# (per parameters of the minefield)
+LOGICS_CACHED = 4
+
+# game logics of the worker process by parameters of the minefield
+logics: dict[tuple, Logic] = dict()
+
+# fields of the claimed score in the scores file:
+# time of the game and parameters of its minefield
+CLAIM_FIELDS = ['time_s', 'rows', 'cols', 'bombs', 'start_rule']
+
+# optional field of the claim: seed of the minefield issued by the verifier
+CLAIM_SEED = 'seed'
+
+
+def is_issued(recorded: RecordedGame, seed: int) -> bool:
+    """
+    Checking the recorded game is started from the issued seed:
+    both the seed and the state of random generator of the new game.
+    """
+
+    return recorded.game.SEED == seed and recorded.rng_state \
+        == np.random.default_rng(seed).bit_generator.state
+
+
+def find_logic(recorded: RecordedGame) -> Logic:
+    """
+    Finding game logic of the worker for parameters of the recorded game,
+    created once and reused then by the following games of the same ones.
+    """
+
+    game = recorded.game
+    key = (
+        recorded.storage, game.ROWS, game.COLS, game.BOMBS,
+        game.START_RULE, game.MARKS_PRESENT
+    )
+    logic = logics.pop(key, None)
+    if logic is None:
+        logic = create_logic(recorded.storage, game)
+        if len(logics) >= LOGICS_CACHED:
+            del logics[next(iter(logics))]  # least recently used one
+    logics[key] = logic
+    return logic
+
+
+def verify_log(task: tuple) -> dict:
+    """
+    Verifying replay log of the submitted score: replaying its games
+    and finding the best won one - with the time matching claimed one,
+    while all the games are of the claimed minefield.
+    Once the claim defines the issued seed, only the games started from it
+    are counted. Otherwise the seed is taken from the log as is, so the
+    minefield could be chosen by the player - only the consistency of
+    the log with the claim is verified then.
+    Return result of the verification.
+    """
+
+    log_path, claim, is_claimed, tolerance, max_cells = task
+    claimed = None if claim is None else claim['time_s']
+    result = {
+        'log': log_path,
+        'games': 0,
+        'won': 0,
+        'time_s': None,
+        'claimed_s': claimed,
+        'passed': False,
+        'reason': None
+    }
+
+    if is_claimed and claim is None:
+        result['reason'] = "no claimed score"
+        return result
+
+    try:
+        with open(log_path, 'rb') as log_file:
+            data = log_file.read()
+        for recorded in read_games(data):
+            result['games'] += 1
+            game = recorded.game
+            if game.ROWS * game.COLS > max_cells:
+                result['reason'] = "minefield is too big"
+                return result
+            if claim is not None and (
+                    game.ROWS, game.COLS, game.BOMBS, game.START_RULE.name
+            ) != (
+                    claim['rows'], claim['cols'], claim['bombs'],
+                    claim['start_rule']
+            ):
+                result['reason'] = "minefield does not match the claimed one"
+                return result
+
+            if claim is not None and CLAIM_SEED in claim \
+                    and not is_issued(recorded, claim[CLAIM_SEED]):
+                continue
+
+            summary = replay_game(recorded, logic=find_logic(recorded))
+            if summary['state'] != GAME_STATE.WON.name:
+                continue
+            if summary['performed'] != summary['actions']:
+                result['reason'] = "actions after the end of the game"
+                return result
+            result['won'] += 1
+            if result['time_s'] is None \
+                    or summary['time_s'] < result['time_s']:
+                result['time_s'] = summary['time_s']
+    except (OSError, ValueError, IndexError, KeyError, StructError) as error:
+        result['reason'] = f"broken replay log: {error}"
+        return result
+
+    if result['time_s'] is None:
+        result['reason'] = "no won games" \
+            if claim is None or CLAIM_SEED not in claim \
+            else "no won games of the issued seed"
+    elif claimed is not None and abs(result['time_s'] - claimed) > tolerance:
+        result['reason'] = "time does not match the claimed one"
+    else:
+        result['passed'] = True
+    return result
+
+
+# --- Replay Logs -------------------------------------------------------------
+
+def find_logs(sources: list[str]) -> Iterator[str]:
+    """
+    Finding replay logs by the sources: paths to the logs,
+    folders with them or '-' for the paths read from the standard input.
+    """
+
+    for source in sources:
+        if source == '-':
+            for line in sys.stdin:
+                if line.strip():
+                    yield line.strip()
+        elif path.isdir(source):
+            for folder, _, files in walk(source):
+                for name in sorted(files):
+                    if name.endswith(REPLAY_EXTENSION):
+                        yield path.join(folder, name)
+        else:
+            yield source
+
+
+def read_claims(scores_path: str) -> dict[str, dict]:
+    """
+    Reading claimed scores by path or name of the replay log:
+    time of the game in seconds and parameters of its minefield
+    (rows, cols, bombs and name of the start rule),
+    optionally with the seed of the minefield issued by the verifier.
+    """
+
+    with open(scores_path) as scores_file:
+        scores = json_load(scores_file)
+
+    for log_path, claim in scores.items():
+        if not isinstance(claim, dict) \
+                or any(field not in claim for field in CLAIM_FIELDS):
+            raise ValueError(
+                f"Claimed score of '{log_path}' has to define "
+                + ", ".join(CLAIM_FIELDS) + "."
+            )
+        if claim['start_rule'] not in START_RULE.__members__:
+            raise ValueError(
+                f"Unknown start rule of '{log_path}': {claim['start_rule']}."
+            )
+        if CLAIM_SEED in claim and not (
+                type(claim[CLAIM_SEED]) is int and claim[CLAIM_SEED] >= 0
+        ):
+            raise ValueError(
+                f"Issued seed of '{log_path}' has to be non-negative integer."
+            )
+    return scores
+
+
+def find_claim(
+        scores: Optional[dict[str, dict]],
+        log_path: str
+) -> Optional[dict]:
+    """Finding claimed score of the log by its path or name."""
+
+    if scores is None:
+        return None
+    if log_path in scores:
+        return scores[log_path]
+    return scores.get(path.basename(log_path))
+
+
+# --- Main Program ------------------------------------------------------------
+
+def main() -> int:
+    parser = ArgumentParser(description=(
+        "Verifying submitted scores by replaying their logs: "
+        "the game is won and in the claimed time."
+    ))
+    parser.add_argument(
+        'sources', nargs='+',
+        help="replay logs, folders with them "
+             "or '-' to read paths of the logs from the standard input"
+    )
+    parser.add_argument(
+        '--scores', default=None,
+        help="path to JSON file with claimed scores by path or name "
+             "of the replay log: time in seconds and the minefield, i.e. "
+             '{"time_s": 42.5, "rows": 16, "cols": 30, "bombs": 99, '
+             '"start_rule": "EMPTY_CELL"}, optionally with the "seed" '
+             "of the minefield issued to the player"
+    )
+    parser.add_argument(
+        '--tolerance', type=float, default=1.0,
+        help="allowed difference of the time from the claimed one, seconds"
+    )
+    parser.add_argument(
+        '--max-cells', type=int, default=1 << 20,
+        help="maximum number of cells of the replayed minefields"
+    )
+    parser.add_argument(
+        '--processes', type=int, default=cpu_count(),
+        help="number of worker processes"
+    )
+    parser.add_argument(
+        '--chunk', type=int, default=16,
+        help="number of replay logs per task of the worker"
+    )
+    parser.add_argument(
+        '--max-tasks', type=int, default=1000,
+        help="number of tasks before the worker process is renewed "
+             "(to keep its memory bounded)"
+    )
+    parser.add_argument(
+        '--output', default=None,
+        help="path to the file for the results in JSON lines format "
+             "(standard output by default)"
+    )
+    args = parser.parse_args()
+
+    scores = None
+    if args.scores is not None:
+        try:
+            scores = read_claims(args.scores)
+        except ValueError as error:
+            parser.error(str(error))
+
+    tasks = (
+        (log_path, find_claim(scores, log_path), scores is not None,
+         args.tolerance, args.max_cells)
+        for log_path in find_logs(args.sources)
+    )
+
+    output = sys.stdout if args.output is None else open(args.output, 'w')
+    started = perf_counter()
+    verified = passed = 0
+
+    with Pool(args.processes, maxtasksperchild=args.max_tasks) as pool:
+        for result in pool.imap_unordered(verify_log, tasks, args.chunk):
+            output.write(json_dumps(result) + '\n')
+            verified += 1
+            passed += result['passed']
+            if verified % 100 == 0:
+                print(
+                    f"\r{verified} logs, "
+                    f"{verified / (perf_counter() - started):.1f} logs/s",
+                    end='', file=sys.stderr, flush=True
+                )
+
+    if output is not sys.stdout:
+        output.close()
+
+    seconds = perf_counter() - started
+    print(
+        f"\rverified {verified} logs in {seconds:.1f} s "
+        f"({verified / max(seconds, 1e-9) * 60:.0f} logs/min): "
+        f"{passed} passed, {verified - passed} failed",
+        file=sys.stderr
+    )
+    return 0 if passed == verified else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())